@@ -2,10 +2,14 @@ import os
 import uuid
 import time
 import logging
-from typing import Dict, Any, Optional
-from flask import Flask, request, jsonify, render_template, session
+from collections import Counter
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from flask import Flask, Response, g, request, jsonify, render_template, session
 from dotenv import load_dotenv
+from metrics import CONTENT_TYPE, Histogram, Registry, instrument_bot
 from rps_main import RPSMain
+from session_store import BotPool, SessionLocks, SessionStore, create_session_store
+from traces import TraceWriter, encode_rounds
 
 load_dotenv()
 
@@ -14,7 +18,45 @@ load_dotenv()
 # ---------------------------------------------------------------------------
 SESSION_MAX = 500
 INACTIVE_TIME = 60 * 60  # 1 hour
-CLEANUP_INTERVAL = 60    # Only run cleanup once per 60 seconds
+CLEANUP_INTERVAL = 60    # SQLite backend: only sweep the table once per 60 seconds
+BOT_HISTORY_SIZE = 32    # Rounds of history each bot keeps (ring buffer)
+BOT_POOL_SIZE = 64       # Spare bots kept for new games (memory backend recycles evicted ones)
+LOCK_STRIPES = 64        # Per-session locks shared between users by hash
+PLAY_BATCH_MAX = 1000    # Most rounds accepted by one /play_batch request
+MOVES = ('rock', 'paper', 'scissors')
+MOVE_CODES = {move: code for code, move in enumerate(MOVES)}
+RESULTS = ('tie', 'win', 'loss')
+# ROUND_RESULTS[3 * player move + bot move]: index into RESULTS of the
+# player's result. Rounds are played on move codes; names and result
+# strings only appear in requests and responses.
+ROUND_RESULTS = (0, 2, 1,
+                 1, 0, 2,
+                 2, 1, 0)
+
+# Compact wire format, accepted by /play as a text/plain body and spoken
+# by the WebSocket channel (asgi.py): a move is one character of
+# WIRE_MOVES and the reply is "<bot move><result> <wins> <losses> <ties>",
+# e.g. "pl 0 1 0", with results from WIRE_RESULTS, from the player's side.
+WIRE_MOVES = 'rps'
+WIRE_RESULTS = 'twl'
+WIRE_CODES = {char: code for code, char in enumerate(WIRE_MOVES)}
+
+# 'memory' keeps sessions in this process (single worker only); 'sqlite'
+# shares them through a local file so gunicorn can run several workers.
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory')
+SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', 'sessions.db')
+
+# Timings and counters served on /metrics. Off by default: when off,
+# nothing is instrumented and /metrics answers 404.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', '0') == '1'
+
+# Answer the first rounds of a game from the table early_table.py builds
+# offline (RPSMain.EARLY_TABLE). Off by default.
+EARLY_TABLE_ENABLED = os.getenv('EARLY_TABLE_ENABLED', '0') == '1'
+
+# Directory for binary move traces (see traces.py), written in the
+# background. Off when unset.
+TRACE_DIR = os.getenv('TRACE_DIR', '')
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -33,12 +75,42 @@ if not app.secret_key:
 
 app.config['SESSION_PERMANENT'] = False
 
+# The page has no per-request content: render it once, at startup. The
+# WebSocket channel is only served by asgi.py, which renders its own.
+with app.app_context():
+    INDEX_HTML = render_template('index.html', websocket=False)
+
 # ---------------------------------------------------------------------------
-# In-memory state
+# Session state
 # ---------------------------------------------------------------------------
-game_states: Dict[str, Dict[str, Any]] = {}
-last_activity: Dict[str, float] = {}
-_last_cleanup_time: float = 0.0
+# A user's game is their bot, which also keeps their score (RPSMain.player_wins etc.)
+bot_pool = BotPool(BOT_POOL_SIZE, BOT_HISTORY_SIZE)
+
+# Open GameChannels per user, changed under that user's lock: their bots
+# stay bound to the channel when the session is evicted
+_channel_users: Counter = Counter()
+
+
+def _recycle_state(user_id: str, bot: RPSMain) -> None:
+    """Return an evicted session's bot to the pool, unless the game is still in use."""
+    with session_lock(user_id):
+        # A request that loaded the bot before the eviction has saved it back
+        if store.peek(user_id) is bot or _channel_users[user_id]:
+            return
+        _end_trace(user_id, bot)
+    bot_pool.release(bot)
+
+
+store: SessionStore = create_session_store(
+    SESSION_BACKEND, SESSION_MAX, INACTIVE_TIME,
+    db_path=SESSION_DB_PATH, cleanup_interval=CLEANUP_INTERVAL, on_evict=_recycle_state
+)
+# A user's state is only read and written while holding that user's lock.
+# Threads of one process are serialised; with several worker processes on
+# the SQLite backend, the last save of two racing requests wins.
+session_lock = SessionLocks(LOCK_STRIPES)
+
+tracer: Optional[TraceWriter] = TraceWriter(TRACE_DIR) if TRACE_DIR else None
 
 
 def _ensure_user_id() -> str:
@@ -48,48 +120,248 @@ def _ensure_user_id() -> str:
     return session['user_id']
 
 
-def _get_or_create_state(user_id: str) -> Dict[str, Any]:
-    """Return existing game state or initialise a fresh one."""
-    if user_id not in game_states:
-        game_states[user_id] = {
-            'wins': 0,
-            'losses': 0,
-            'ties': 0,
-            'bot': RPSMain()
-        }
-    return game_states[user_id]
+def _new_state() -> RPSMain:
+    return bot_pool.acquire()
+
+
+def _get_or_create_state(user_id: str) -> RPSMain:
+    """Return existing game state or initialise (and store) a fresh one."""
+    state = store.load(user_id)
+    if state is None:
+        state = _new_state()
+        store.save(user_id, state, time.time())
+    return state
+
+
+def _trace(user_id: str, user_codes: Sequence[int], bot_codes: Sequence[int]) -> None:
+    if tracer is not None:
+        tracer.record(user_id, encode_rounds(user_codes, bot_codes))
+
+
+def _end_trace(user_id: str, bot: RPSMain) -> None:
+    """Mark the end of a game that is reset or dropped, if it traced any rounds."""
+    if tracer is not None and bot.opponent_history:
+        tracer.end_game(user_id)
+
+
+def _play_round(bot: RPSMain, user_code: int) -> Tuple[int, int]:
+    """Play one round against the bot and update the score; returns the bot's move and the result."""
+    bot_code = bot.get_move_code()
+    result = ROUND_RESULTS[3 * user_code + bot_code]
+    if result == 1:
+        bot.player_wins += 1
+    elif result == 2:
+        bot.player_losses += 1
+    else:
+        bot.player_ties += 1
+    bot.update_codes(bot_code, user_code)
+    return bot_code, result
+
+
+def _score(bot: RPSMain) -> Dict[str, int]:
+    return {
+        'wins': bot.player_wins,
+        'losses': bot.player_losses,
+        'ties': bot.player_ties
+    }
 
 
 def _clean_old_sessions() -> None:
-    """Remove expired or excess sessions. Called automatically inside routes."""
-    global _last_cleanup_time
+    """Evict a few expired or excess sessions. Called automatically by the game actions."""
+    removed = store.cleanup(time.time())
+    if removed:
+        logger.debug("Evicted %d session(s). Stats: %s", removed, store.stats())
 
-    now = time.time()
-    if len(game_states) <= SESSION_MAX:
-        return
 
-    if now - _last_cleanup_time < CLEANUP_INTERVAL:
-        return
-    _last_cleanup_time = now
+# ---------------------------------------------------------------------------
+# Metrics
+# ---------------------------------------------------------------------------
+metrics = Registry()
+# Request handling time by endpoint; both front ends record into it
+request_time: Optional[Histogram] = None
+
+
+def _enable_metrics() -> None:
+    """Instrument the bot, requests and session cleanup (see metrics.py)."""
+    global _clean_old_sessions, request_time
+    instrument_bot(RPSMain, metrics)
+
+    request_time = metrics.histogram('rps_request_seconds', 'Request handling time.', ['endpoint'])
+    cleanup_time = metrics.gauge('rps_session_cleanup_seconds', 'Duration of the last session cleanup.')
+    metrics.gauge('rps_sessions', 'Sessions currently stored.', callback=lambda: len(store))
+    for stat in ('hits', 'misses', 'evictions'):
+        metrics.gauge(f'rps_session_store_{stat}', f'Session store {stat} so far.',
+                      callback=lambda stat=stat: store.stats()[stat])
+    metrics.gauge('rps_bot_pool_size', 'Spare bots in the pool.', callback=lambda: len(bot_pool))
+    for stat in ('created', 'reused'):
+        metrics.gauge(f'rps_bot_pool_{stat}', f'Bots {stat} for new games so far.',
+                      callback=lambda stat=stat: bot_pool.stats()[stat])
+
+    clean = _clean_old_sessions
+
+    def timed_clean() -> None:
+        start = time.perf_counter()
+        clean()
+        cleanup_time.set(time.perf_counter() - start)
+
+    _clean_old_sessions = timed_clean
+
+    @app.before_request
+    def start_timer() -> None:
+        g.request_start = time.perf_counter()
 
-    expired: list[str] = []
-    for user_id, last_time in list(last_activity.items()):
-        if now - last_time > INACTIVE_TIME:
-            expired.append(user_id)
+    @app.after_request
+    def record_time(response: Response) -> Response:
+        elapsed = time.perf_counter() - g.request_start
+        request_time.labels(request.endpoint or 'unknown').observe(elapsed)
+        return response
 
-    if len(game_states) - len(expired) > SESSION_MAX:
-        active_sessions = [(uid, t) for uid, t in last_activity.items() if uid not in expired]
-        active_sessions.sort(key=lambda x: x[1])
-        to_remove = len(game_states) - SESSION_MAX
-        for i in range(min(to_remove, len(active_sessions))):
-            expired.append(active_sessions[i][0])
 
-    for user_id in expired:
-        game_states.pop(user_id, None)
-        last_activity.pop(user_id, None)
+if METRICS_ENABLED:
+    _enable_metrics()
 
-    if expired:
-        logger.info("Cleaned up %d session(s). Remaining: %d", len(expired), len(game_states))
+if EARLY_TABLE_ENABLED:
+    RPSMain.EARLY_TABLE = True
+    if not RPSMain.warm_up():
+        logger.warning("early_table.bin was not built for RPSMain's settings; bots play the full vote.")
+
+
+# ---------------------------------------------------------------------------
+# Game actions, shared by the Flask routes and the ASGI front end (asgi.py)
+# ---------------------------------------------------------------------------
+def move_error(data: Any) -> Optional[str]:
+    """Return why a /play body is invalid, or None."""
+    if not isinstance(data, dict):
+        return 'Invalid JSON body'
+    if data.get('move') not in MOVES:
+        return 'Invalid move'
+    return None
+
+
+def batch_error(data: Any) -> Optional[str]:
+    """Return why a /play_batch body is invalid, or None."""
+    if not isinstance(data, dict):
+        return 'Invalid JSON body'
+    user_moves = data.get('moves')
+    if not isinstance(user_moves, list) or not user_moves:
+        return 'moves must be a non-empty list'
+    if len(user_moves) > PLAY_BATCH_MAX:
+        return f'At most {PLAY_BATCH_MAX} moves per batch'
+    if any(move not in MOVES for move in user_moves):
+        return 'Invalid move'
+    return None
+
+
+def open_game(user_id: str) -> None:
+    """Make sure the user has a game and mark it active."""
+    with session_lock(user_id):
+        _get_or_create_state(user_id)
+        store.touch(user_id, time.time())
+    _clean_old_sessions()
+
+
+def play_codes(user_id: str, user_codes: Sequence[int]) -> Tuple[List[int], List[int], Dict[str, int]]:
+    """Play move codes in order; returns the bot's move codes, the results (see ROUND_RESULTS) and the score."""
+    _clean_old_sessions()
+    bot_codes = []
+    results = []
+    with session_lock(user_id):
+        state = _get_or_create_state(user_id)
+        for user_code in user_codes:
+            bot_code, result = _play_round(state, user_code)
+            bot_codes.append(bot_code)
+            results.append(result)
+        store.save(user_id, state, time.time())
+        _trace(user_id, user_codes, bot_codes)
+        score = _score(state)
+    return bot_codes, results, score
+
+
+def play_moves(user_id: str, user_moves: List[str]) -> Dict[str, Any]:
+    """Play validated moves in order and return bot moves, results and score."""
+    bot_codes, results, score = play_codes(user_id, [MOVE_CODES[move] for move in user_moves])
+    return {
+        'bot_moves': [MOVES[code] for code in bot_codes],
+        'results': [RESULTS[result] for result in results],
+        'score': score
+    }
+
+
+def compact_reply(bot_code: int, result: int, score: Dict[str, int]) -> str:
+    """A round's reply in the compact wire format."""
+    return f"{WIRE_MOVES[bot_code]}{WIRE_RESULTS[result]} {score['wins']} {score['losses']} {score['ties']}"
+
+
+def play_compact(user_id: str, body: str) -> Tuple[int, str]:
+    """Play a compact-format /play body; returns the status code and the text reply."""
+    user_code = WIRE_CODES.get(body.strip())
+    if user_code is None:
+        return 400, 'e Invalid move'
+    bot_codes, results, score = play_codes(user_id, (user_code,))
+    return 200, compact_reply(bot_codes[0], results[0], score)
+
+
+def reset_game(user_id: str) -> Dict[str, Any]:
+    with session_lock(user_id):
+        bot = store.load(user_id)
+        if bot is None:
+            bot = _new_state()
+        else:
+            _end_trace(user_id, bot)
+            bot.reset()
+        store.save(user_id, bot, time.time())
+    return {
+        'status': 'reset',
+        'score': {'wins': 0, 'losses': 0, 'ties': 0}
+    }
+
+
+class GameChannel:
+    """
+    A user's game bound once for a long-lived connection (the WebSocket
+    channel in asgi.py), so each round skips the session lookup.
+
+    The game is still saved after every round, keeping the HTTP endpoints
+    usable as a fallback, but the channel owns the game while it is open:
+    with the SQLite backend, a reset sent over HTTP meanwhile can be
+    overwritten by the next round, and an evicted session comes back
+    with the channel's next round. ``close`` must be called when the
+    connection ends, so the bot can go back to the pool.
+    """
+
+    def __init__(self, user_id: str) -> None:
+        self.user_id = user_id
+        with session_lock(user_id):
+            self.state = _get_or_create_state(user_id)
+            store.touch(user_id, time.time())
+            _channel_users[user_id] += 1
+        _clean_old_sessions()
+
+    def play(self, user_code: int) -> Tuple[int, int, Dict[str, int]]:
+        """Play a move code; returns the bot's move code, the result (see ROUND_RESULTS) and the score."""
+        with session_lock(self.user_id):
+            bot_code, result = _play_round(self.state, user_code)
+            store.save(self.user_id, self.state, time.time())
+            _trace(self.user_id, (user_code,), (bot_code,))
+            return bot_code, result, _score(self.state)
+
+    def reset(self) -> None:
+        with session_lock(self.user_id):
+            _end_trace(self.user_id, self.state)
+            self.state.reset()
+            store.save(self.user_id, self.state, time.time())
+
+    def close(self) -> None:
+        with session_lock(self.user_id):
+            _channel_users[self.user_id] -= 1
+            if _channel_users[self.user_id]:
+                return
+            del _channel_users[self.user_id]
+            # Evicted while the channel was open: nothing else holds the bot
+            if store.load(self.user_id) is self.state:
+                return
+            _end_trace(self.user_id, self.state)
+        bot_pool.release(self.state)
 
 
 # ---------------------------------------------------------------------------
@@ -97,69 +369,64 @@ def _clean_old_sessions() -> None:
 # ---------------------------------------------------------------------------
 @app.route('/')
 def index() -> str:
-    user_id = _ensure_user_id()
-    _get_or_create_state(user_id)
-    last_activity[user_id] = time.time()
-    _clean_old_sessions()
-    return render_template('index.html')
+    open_game(_ensure_user_id())
+    return INDEX_HTML
 
 
 @app.route('/play', methods=['POST'])
 def play() -> Any:
+    """
+    Play one round: ``{"move": "rock"}``, or a text/plain body in the
+    compact wire format (see WIRE_MOVES), answered in kind.
+    """
     user_id = _ensure_user_id()
-    state = _get_or_create_state(user_id)
-    last_activity[user_id] = time.time()
-    _clean_old_sessions()
-
+    if request.mimetype == 'text/plain':
+        status, reply = play_compact(user_id, request.get_data(as_text=True))
+        return Response(reply, status, mimetype='text/plain')
     data: Optional[dict] = request.get_json(silent=True)
-    if not isinstance(data, dict):
-        logger.warning("Invalid JSON body from %s", user_id)
-        return jsonify({'error': 'Invalid JSON body'}), 400
-
-    user_move = data.get('move')
-    if user_move not in ['rock', 'paper', 'scissors']:
-        return jsonify({'error': 'Invalid move'}), 400
-
-    bot = state['bot']
-    bot_move = bot.get_move()
-
-    if user_move == bot_move:
-        result = 'tie'
-        state['ties'] += 1
-    elif (user_move == 'rock' and bot_move == 'scissors') or \
-         (user_move == 'paper' and bot_move == 'rock') or \
-         (user_move == 'scissors' and bot_move == 'paper'):
-        result = 'win'
-        state['wins'] += 1
-    else:
-        result = 'loss'
-        state['losses'] += 1
-
-    bot.update(bot_move, user_move)
+    error = move_error(data)
+    if error is not None:
+        if not isinstance(data, dict):
+            logger.warning("Invalid JSON body from %s", user_id)
+        return jsonify({'error': error}), 400
 
+    played = play_moves(user_id, [data['move']])
     return jsonify({
-        'bot_move': bot_move,
-        'result': result,
-        'score': {
-            'wins': state['wins'],
-            'losses': state['losses'],
-            'ties': state['ties']
-        }
+        'bot_move': played['bot_moves'][0],
+        'result': played['results'][0],
+        'score': played['score']
     })
 
 
+@app.route('/play_batch', methods=['POST'])
+def play_batch() -> Any:
+    """
+    Play several rounds in one request: ``{"moves": ["rock", ...]}``.
+
+    Rounds are played in order exactly as if each had been sent to /play,
+    and the state is saved once at the end.
+    """
+    user_id = _ensure_user_id()
+    data: Optional[dict] = request.get_json(silent=True)
+    error = batch_error(data)
+    if error is not None:
+        if not isinstance(data, dict):
+            logger.warning("Invalid JSON body from %s", user_id)
+        return jsonify({'error': error}), 400
+
+    return jsonify(play_moves(user_id, data['moves']))
+
+
 @app.route('/reset', methods=['POST'])
 def reset() -> Any:
-    user_id = _ensure_user_id()
-    game_states[user_id] = {
-        'wins': 0, 'losses': 0, 'ties': 0,
-        'bot': RPSMain()
-    }
-    last_activity[user_id] = time.time()
-    return jsonify({
-        'status': 'reset',
-        'score': {'wins': 0, 'losses': 0, 'ties': 0}
-    })
+    return jsonify(reset_game(_ensure_user_id()))
+
+
+@app.route('/metrics')
+def metrics_endpoint() -> Any:
+    if not METRICS_ENABLED:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
 
 
 @app.errorhandler(400)
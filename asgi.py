@@ -0,0 +1,241 @@
+"""
+ASGI front end for the game, serving many connections from one event loop.
+
+    uvicorn asgi:application --workers 1
+
+It exposes the same ``/``, ``/play``, ``/play_batch``, ``/reset`` and
+``/metrics`` endpoints as the Flask app and reads and writes the same signed session
+cookie, so clients can move between the two. The game actions are
+imported from app.py. On the memory backend they never block, so they
+run on the loop itself; on the SQLite backend, whose writes can wait on
+the database lock for seconds, they run in the loop's default thread
+pool. Either way a user's rounds are serialised by their session lock.
+
+``/ws`` is a WebSocket game channel. The game is bound when the socket
+opens, then every round is one small text frame each way, in the compact
+wire format /play also accepts (see app.WIRE_MOVES):
+
+    client: "r" | "p" | "s" | "reset"
+    server: "<bot move><result> <wins> <losses> <ties>", e.g. "pl 0 1 0"
+            (moves r/p/s, results w/l/t, from the player's side),
+            or "e <message>" for a frame it could not use.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from flask import render_template
+
+import app as app_module
+from app import (
+    WIRE_CODES, GameChannel, app, batch_error, compact_reply, move_error, open_game,
+    play_compact, play_moves, reset_game,
+)
+from metrics import CONTENT_TYPE
+from session_store import MemorySessionStore
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 64 * 1024
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Awaitable[Dict[str, Any]]]
+Send = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_serializer = app.session_interface.get_signing_serializer(app)
+_COOKIE_NAME = app.config['SESSION_COOKIE_NAME']
+
+# The page, telling the client that /ws is served here
+with app.app_context():
+    INDEX_BODY = render_template('index.html', websocket=True).encode()
+
+# rps_request_seconds labels, named after the Flask view functions
+_ENDPOINTS = {'/': 'index', '/play': 'play', '/play_batch': 'play_batch', '/reset': 'reset',
+              '/metrics': 'metrics_endpoint'}
+
+
+async def _run_game(action: Callable[..., Any], *args: Any) -> Any:
+    """Run a game action on the loop for the memory backend, else in a worker thread."""
+    if isinstance(app_module.store, MemorySessionStore):
+        return action(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, action, *args)
+
+
+def _cookie_user_id(scope: Scope) -> Optional[str]:
+    """Return the user_id from Flask's session cookie, if it is valid."""
+    for name, value in scope['headers']:
+        if name != b'cookie':
+            continue
+        for part in value.decode('latin-1').split(';'):
+            key, _, token = part.strip().partition('=')
+            if key != _COOKIE_NAME:
+                continue
+            try:
+                user_id = _serializer.loads(token)['user_id']
+            except Exception:
+                return None
+            return user_id if isinstance(user_id, str) else None
+    return None
+
+
+def _is_text(scope: Scope) -> bool:
+    """Whether the request body is text/plain (the compact wire format)."""
+    for name, value in scope['headers']:
+        if name == b'content-type':
+            return value.split(b';', 1)[0].strip().lower() == b'text/plain'
+    return False
+
+
+def _session_cookie(user_id: str) -> bytes:
+    token = _serializer.dumps({'user_id': user_id})
+    return f'{_COOKIE_NAME}={token}; HttpOnly; Path=/'.encode('latin-1')
+
+
+async def _read_body(receive: Receive) -> Optional[bytes]:
+    """Read the whole request body, or None if it is larger than MAX_BODY_BYTES."""
+    chunks: List[bytes] = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+async def _respond(send: Send, status: int, body: bytes, content_type: bytes,
+                   cookie: Optional[bytes]) -> None:
+    headers: List[Tuple[bytes, bytes]] = [
+        (b'content-type', content_type),
+        (b'content-length', str(len(body)).encode()),
+    ]
+    if cookie is not None:
+        headers.append((b'set-cookie', cookie))
+    await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+def _json(payload: Dict[str, Any]) -> bytes:
+    return json.dumps(payload, separators=(',', ':')).encode()
+
+
+async def _handle_http(scope: Scope, receive: Receive, send: Send) -> None:
+    if not app_module.METRICS_ENABLED:
+        await _dispatch_http(scope, receive, send)
+        return
+    start = time.perf_counter()
+    try:
+        await _dispatch_http(scope, receive, send)
+    finally:
+        elapsed = time.perf_counter() - start
+        app_module.request_time.labels(_ENDPOINTS.get(scope['path'], 'unknown')).observe(elapsed)
+
+
+async def _dispatch_http(scope: Scope, receive: Receive, send: Send) -> None:
+    if scope['path'] == '/metrics':
+        if app_module.METRICS_ENABLED:
+            await _respond(send, 200, app_module.metrics.render().encode(), CONTENT_TYPE.encode(), None)
+        else:
+            await _respond(send, 404, _json({'error': 'Metrics are disabled'}), b'application/json', None)
+        return
+
+    user_id = _cookie_user_id(scope)
+    cookie = None
+    if user_id is None:
+        user_id = str(uuid.uuid4())
+        cookie = _session_cookie(user_id)
+
+    method, path = scope['method'], scope['path']
+    if path == '/' and method in ('GET', 'HEAD'):
+        await _run_game(open_game, user_id)
+        await _respond(send, 200, INDEX_BODY, b'text/html; charset=utf-8', cookie)
+        return
+    if path not in ('/play', '/play_batch', '/reset'):
+        await _respond(send, 404, _json({'error': 'Not found'}), b'application/json', cookie)
+        return
+    if method != 'POST':
+        await _respond(send, 405, _json({'error': 'Method not allowed'}), b'application/json', cookie)
+        return
+
+    body = await _read_body(receive)
+    if path == '/play' and _is_text(scope):
+        status, reply = await _run_game(play_compact, user_id, (body or b'').decode('utf-8', 'replace'))
+        await _respond(send, status, reply.encode(), b'text/plain; charset=utf-8', cookie)
+        return
+    if path == '/reset':
+        status, payload = 200, await _run_game(reset_game, user_id)
+    else:
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+        error = (move_error if path == '/play' else batch_error)(data)
+        if error is not None:
+            status, payload = 400, {'error': error}
+        elif path == '/play':
+            played = await _run_game(play_moves, user_id, [data['move']])
+            status, payload = 200, {
+                'bot_move': played['bot_moves'][0],
+                'result': played['results'][0],
+                'score': played['score'],
+            }
+        else:
+            status, payload = 200, await _run_game(play_moves, user_id, data['moves'])
+    await _respond(send, status, _json(payload), b'application/json', cookie)
+
+
+async def _handle_websocket(scope: Scope, receive: Receive, send: Send) -> None:
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    user_id = _cookie_user_id(scope)
+    if scope['path'] != '/ws' or user_id is None:
+        # The cookie comes from loading the page; without it there is no game
+        await send({'type': 'websocket.close', 'code': 4001})
+        return
+    channel = await _run_game(GameChannel, user_id)
+    try:
+        await send({'type': 'websocket.accept'})
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                return
+            frame = message.get('text')
+            if frame in WIRE_CODES:
+                reply = compact_reply(*await _run_game(channel.play, WIRE_CODES[frame]))
+            elif frame == 'reset':
+                await _run_game(channel.reset)
+                reply = 'reset 0 0 0'
+            else:
+                reply = 'e Invalid move'
+            await send({'type': 'websocket.send', 'text': reply})
+    finally:
+        await _run_game(channel.close)
+
+
+async def application(scope: Scope, receive: Receive, send: Send) -> None:
+    if scope['type'] == 'websocket':
+        await _handle_websocket(scope, receive, send)
+    elif scope['type'] == 'http':
+        try:
+            await _handle_http(scope, receive, send)
+        except Exception:
+            logger.exception("Unhandled 500 error")
+            await _respond(send, 500, _json({'error': 'Internal server error'}),
+                           b'application/json', None)
+    elif scope['type'] == 'lifespan':
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
@@ -0,0 +1,96 @@
+"""
+End-to-end /play latency and throughput through Flask's test client,
+with many sessions interleaved and optionally several client threads, in
+JSON and in the compact text format, plus the per-round cost of
+/play_batch.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_app
+"""
+import logging
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from benchmarks.common import percentile
+
+logging.disable(logging.WARNING)
+
+from app import app  # noqa: E402  (after silencing the SECRET_KEY warning)
+
+MOVES = ('rock', 'paper', 'scissors')
+
+
+def _play_sessions(clients: list, rounds: int, seed: int, compact: bool = False) -> List[float]:
+    """Play ``rounds`` moves per client, round-robin, returning latencies."""
+    rng = random.Random(seed)
+    latencies = []
+    for _ in range(rounds):
+        for client in clients:
+            move = rng.choice(MOVES)
+            start = time.perf_counter()
+            if compact:
+                response = client.post('/play', data=move[0], content_type='text/plain')
+            else:
+                response = client.post('/play', json={'move': move})
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200
+    return latencies
+
+
+def bench_play(sessions: int, rounds: int, threads: int, compact: bool = False) -> Dict[str, float]:
+    clients = [app.test_client() for _ in range(sessions)]
+    for client in clients:
+        client.get('/')
+    groups = [clients[i::threads] for i in range(threads)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = pool.map(_play_sessions, groups, [rounds] * threads, range(threads), [compact] * threads)
+        latencies = sorted(l for group in results for l in group)
+    elapsed = time.perf_counter() - start
+
+    prefix = f"app.play{'.compact' if compact else ''}.t{threads}"
+    return {
+        f'{prefix}.requests_per_sec': len(latencies) / elapsed,
+        f'{prefix}.p50_us': percentile(latencies, 50) * 1e6,
+        f'{prefix}.p95_us': percentile(latencies, 95) * 1e6,
+        f'{prefix}.p99_us': percentile(latencies, 99) * 1e6,
+    }
+
+
+def bench_play_batch(sessions: int, batch_size: int) -> Dict[str, float]:
+    """Rounds per second when clients send ``batch_size`` moves per request."""
+    rng = random.Random(0)
+    clients = [app.test_client() for _ in range(sessions)]
+    for client in clients:
+        client.get('/')
+
+    start = time.perf_counter()
+    for client in clients:
+        moves = [rng.choice(MOVES) for _ in range(batch_size)]
+        response = client.post('/play_batch', json={'moves': moves})
+        assert response.status_code == 200
+    elapsed = time.perf_counter() - start
+
+    return {
+        f'app.play_batch.b{batch_size}.rounds_per_sec': sessions * batch_size / elapsed,
+        f'app.play_batch.b{batch_size}.per_round_us': elapsed / (sessions * batch_size) * 1e6,
+    }
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    sessions, rounds = (50, 5) if quick else (200, 20)
+    metrics = {}
+    for threads in (1, 8):
+        metrics.update(bench_play(sessions, rounds, threads))
+    metrics.update(bench_play(sessions, rounds, 1, compact=True))
+    metrics.update(bench_play_batch(sessions, 100))
+    return metrics
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f"{name:<42}{value:>14.2f}")
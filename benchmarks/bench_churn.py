@@ -0,0 +1,132 @@
+"""
+Session churn: players arriving, playing a few rounds, sometimes
+resetting, and being evicted, driven through the app's game actions
+(no HTTP) on the memory backend. Compares the bot pool against building
+every bot anew (a pool of size 0):
+
+- time per session;
+- garbage-collector pauses while the store fills and churns, timed
+  with gc.callbacks;
+- memory blocks each new game allocates, traced with tracemalloc, just
+  after a burst of expired sessions has filled the pool;
+- traced memory per stored session.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_churn
+"""
+import gc
+import logging
+import random
+import time
+import tracemalloc
+from typing import Dict, List
+
+logging.disable(logging.WARNING)
+
+import app as app_module  # noqa: E402  (after silencing the SECRET_KEY warning)
+from session_store import BotPool, MemorySessionStore  # noqa: E402
+
+MOVES = ('rock', 'paper', 'scissors')
+MAX_SESSIONS = 500
+NEW_GAMES = 32
+MODES = {'pooled': app_module.BOT_POOL_SIZE, 'unpooled': 0}
+
+
+class _GCTimer:
+    """gc.callbacks hook recording how long each collection takes."""
+
+    def __init__(self) -> None:
+        self.pauses: List[float] = []
+        self._start = 0.0
+
+    def __call__(self, phase: str, info: Dict[str, int]) -> None:
+        if phase == 'start':
+            self._start = time.perf_counter()
+        else:
+            self.pauses.append(time.perf_counter() - self._start)
+
+
+def churn(sessions: int, seed: int) -> None:
+    rng = random.Random(seed)
+    for i in range(sessions):
+        user_id = f'user-{seed}-{i}'
+        app_module.open_game(user_id)
+        app_module.play_moves(user_id, rng.choices(MOVES, k=rng.randint(1, 10)))
+        if rng.random() < 0.3:
+            app_module.reset_game(user_id)
+            app_module.play_moves(user_id, [rng.choice(MOVES)])
+
+
+def new_game_blocks(pool: BotPool) -> float:
+    """Traced blocks allocated per new game, once expired sessions have refilled the pool."""
+    expire = time.time() + 2 * app_module.INACTIVE_TIME
+    while app_module.store.cleanup(expire) and len(pool) < NEW_GAMES:
+        pass
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        states = [app_module._new_state() for _ in range(NEW_GAMES)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    del states
+    return blocks / NEW_GAMES
+
+
+def session_bytes() -> float:
+    """Traced memory per stored session (game state and store entry) after a few rounds each."""
+    app_module.bot_pool = BotPool(0, app_module.BOT_HISTORY_SIZE)
+    app_module.store = MemorySessionStore(MAX_SESSIONS, app_module.INACTIVE_TIME)
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        churn(MAX_SESSIONS, seed=3)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return (after - before) / MAX_SESSIONS
+
+
+def bench_mode(pool_size: int, sessions: int) -> Dict[str, float]:
+    pool = app_module.bot_pool = BotPool(pool_size, app_module.BOT_HISTORY_SIZE)
+    app_module.store = MemorySessionStore(MAX_SESSIONS, app_module.INACTIVE_TIME,
+                                          on_evict=app_module._recycle_state)
+    timer = _GCTimer()
+    gc.collect()
+    gc.callbacks.append(timer)
+    try:
+        churn(MAX_SESSIONS, seed=0)  # fill the store: every later session evicts one
+        start = time.perf_counter()
+        churn(sessions, seed=1)
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.callbacks.remove(timer)
+
+    return {
+        'session_us': elapsed / sessions * 1e6,
+        'gc_pause_ms': sum(timer.pauses) * 1e3,
+        'gc_max_pause_us': max(timer.pauses, default=0.0) * 1e6,
+        'gc_runs_count': len(timer.pauses),
+        'new_game_blocks_count': new_game_blocks(pool),
+    }
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    sessions = 1000 if quick else 5000
+    saved = app_module.store, app_module.bot_pool
+    metrics = {}
+    try:
+        for mode, pool_size in MODES.items():
+            for name, value in bench_mode(pool_size, sessions).items():
+                metrics[f'churn.{mode}.{name}'] = value
+        metrics['churn.session_bytes'] = session_bytes()
+    finally:
+        app_module.store, app_module.bot_pool = saved
+    return metrics
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f"{name:<48}{value:>14.2f}")
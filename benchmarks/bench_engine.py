@@ -0,0 +1,112 @@
+"""
+RPSMain engine benchmarks: round throughput across history lengths,
+through the move-name API and the move-code API, the cost of each
+strategy on its own, and memory per bot.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_engine
+"""
+import random
+import tracemalloc
+from typing import Dict, Optional
+
+from benchmarks.common import per_call_us
+from rps_main import RPSMain
+
+HISTORY_LENGTHS = (10, 100, 1000, 10_000)
+MEMORY_ROUNDS = (10, 100, 1000)
+STRATEGIES = ('markov', 'frequency', 'psychology', 'pattern', 'reaction')
+
+
+def played_bot(rounds: int, history_size: Optional[int] = None, seed: int = 0) -> RPSMain:
+    rng = random.Random(seed)
+    bot = RPSMain(history_size=history_size, seed=seed)
+    for _ in range(rounds):
+        bot.update(bot.get_move(), rng.choice(bot.moves))
+    return bot
+
+
+def bench_throughput(quick: bool = False) -> Dict[str, float]:
+    """get_move + update (and their move-code forms) rounds per second after N rounds of history."""
+    metrics = {}
+    number = 500 if quick else 5000
+    for rounds in HISTORY_LENGTHS:
+        for history_size in (None, 32):
+            bot = played_bot(rounds, history_size)
+            opponent = iter(random.Random(1).choices(bot.moves, k=number * 6))
+
+            def play_round() -> None:
+                bot.update(bot.get_move(), next(opponent))
+
+            codes = iter(random.Random(1).choices(range(3), k=number * 6))
+
+            def play_codes() -> None:
+                bot.update_codes(bot.get_move_code(), next(codes))
+
+            mode = 'ring' if history_size else 'list'
+            metrics[f'engine.round.{mode}.h{rounds}_per_sec'] = 1e6 / per_call_us(play_round, number)
+            metrics[f'engine.round.codes.{mode}.h{rounds}_per_sec'] = 1e6 / per_call_us(play_codes, number)
+    return metrics
+
+
+def bench_strategies(quick: bool = False) -> Dict[str, float]:
+    """Cost of each strategy method and of the full vote, in isolation."""
+    bot = played_bot(1000)
+    number = 2000 if quick else 20_000
+    metrics = {}
+    for name in STRATEGIES:
+        method = getattr(bot, f'_{name}_prediction')
+        metrics[f'engine.strategy.{name}_us'] = per_call_us(method, number)
+    metrics['engine.strategy.random_move_us'] = per_call_us(bot._random_move, number)
+    metrics['engine.strategy.random_choice_us'] = per_call_us(lambda: random.choice(bot.moves), number)
+    metrics['engine.strategy.vote_us'] = per_call_us(bot._make_prediction, number)
+    bot.lazy_voting = True
+    metrics['engine.strategy.lazy_vote_us'] = per_call_us(bot._make_prediction, number)
+
+    # Early game, answered from the lookup table and by a full vote
+    early = played_bot(RPSMain.PHASE_THRESHOLDS['mid'])
+    early.early_table = True
+    metrics['engine.strategy.early_table_vote_us'] = per_call_us(early._make_prediction, number)
+    early.early_table = False
+    metrics['engine.strategy.early_full_vote_us'] = per_call_us(early._make_prediction, number)
+
+    # Variable-order context model, only built by the rich profile
+    context_bot = RPSMain.profile('rich')()
+    rng = random.Random(0)
+    for _ in range(1000):
+        context_bot.update(context_bot.get_move(), rng.choice(context_bot.moves))
+    trie = context_bot.context_model
+    codes = iter(random.Random(1).choices(range(3), k=number * 6))
+    metrics['engine.strategy.context_us'] = per_call_us(context_bot._context_prediction, number)
+    metrics['engine.strategy.context_update_us'] = per_call_us(lambda: trie.update(next(codes)), number)
+    return metrics
+
+
+def bench_memory(quick: bool = False) -> Dict[str, float]:
+    """Traced memory per bot after N rounds, averaged over many bots."""
+    count = 20 if quick else 100
+    metrics = {}
+    for rounds in MEMORY_ROUNDS:
+        for history_size in (None, 32):
+            tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            bots = [played_bot(rounds, history_size, seed=i) for i in range(count)]
+            after = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            mode = 'ring' if history_size else 'list'
+            metrics[f'engine.memory.{mode}.r{rounds}_bytes'] = (after - before) / len(bots)
+    return metrics
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    metrics = {}
+    metrics.update(bench_throughput(quick))
+    metrics.update(bench_strategies(quick))
+    metrics.update(bench_memory(quick))
+    return metrics
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f"{name:<42}{value:>14.2f}")
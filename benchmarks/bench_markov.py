@@ -0,0 +1,79 @@
+"""
+Latency of get_move + update with the pure-Python Markov model versus
+the previous NumPy 3x3 matrix.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_markov
+"""
+import random
+from typing import Dict, Optional
+
+import numpy as np
+
+from benchmarks.common import per_call_us
+from rps_main import RPSMain
+
+
+class NumpyMarkovBot(RPSMain):
+    """RPSMain with the Markov model as it was before: a NumPy matrix."""
+
+    EARLY_TABLE = False
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        super().__init__(seed=seed)
+        self.transition_matrix = np.ones((3, 3)) / 3
+
+    def _markov_prediction(self) -> int:
+        if not self.opponent_history:
+            return self._random_move()
+        probs = self.transition_matrix[self.opponent_history[-1]]
+        return int(np.argmax(probs))
+
+    def _update_markov(self, prev_idx: int, curr_idx: int) -> None:
+        for i in range(3):
+            if i == curr_idx:
+                self.transition_matrix[prev_idx][i] += self.adapt_speed
+            else:
+                self.transition_matrix[prev_idx][i] *= (1 - self.adapt_speed / 2)
+        row_sum = sum(self.transition_matrix[prev_idx])
+        self.transition_matrix[prev_idx] = self.transition_matrix[prev_idx] / row_sum
+
+
+def warmed_bot(cls: type, rounds: int = 200) -> RPSMain:
+    rng = random.Random(1)
+    bot = cls(seed=1)
+    for _ in range(rounds):
+        bot.update(bot.get_move(), rng.choice(bot.moves))
+    return bot
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    number = 2000 if quick else 20_000
+    metrics = {}
+    for label, cls in (('numpy', NumpyMarkovBot), ('python', RPSMain)):
+        bot = warmed_bot(cls)
+        opponent = iter(random.Random(2).choices(bot.moves, k=number * 6))
+
+        def markov_only() -> None:
+            bot._markov_prediction()
+            bot._update_markov(0, 1)
+
+        def full_round() -> None:
+            bot.update(bot.get_move(), next(opponent))
+
+        metrics[f'markov.{label}.model_us'] = per_call_us(markov_only, number)
+        metrics[f'markov.{label}.round_us'] = per_call_us(full_round, number)
+    return metrics
+
+
+def main() -> None:
+    metrics = run()
+    print(f"{'model':<8}{'markov us':>12}{'round us':>12}")
+    for label in ('numpy', 'python'):
+        print(f"{label:<8}{metrics[f'markov.{label}.model_us']:>12.2f}"
+              f"{metrics[f'markov.{label}.round_us']:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
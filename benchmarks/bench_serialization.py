@@ -0,0 +1,61 @@
+"""
+Compare RPSMain.to_bytes/from_bytes against pickle.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_serialization
+"""
+import pickle
+import random
+from typing import Dict, Optional
+
+from benchmarks.common import per_call_us
+from rps_main import RPSMain
+
+ROUNDS = (10, 100, 10_000)
+
+
+def played_bot(rounds: int, history_size: Optional[int] = None) -> RPSMain:
+    rng = random.Random(rounds)
+    bot = RPSMain(history_size=history_size, seed=rounds)
+    for _ in range(rounds):
+        bot.update(bot.get_move(), rng.choice(bot.moves))
+    return bot
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    metrics = {}
+    for rounds in ROUNDS:
+        for history_size in (None, 32):
+            bot = played_bot(rounds, history_size)
+            mode = 'ring' if history_size else 'list'
+            number = 200 if rounds < 10_000 or history_size else 20
+            if quick:
+                number = max(1, number // 10)
+
+            for fmt, dump, load in (
+                ('pickle', lambda: pickle.dumps(bot, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads),
+                ('to_bytes', bot.to_bytes, RPSMain.from_bytes),
+            ):
+                blob = dump()
+                prefix = f'serialization.{fmt}.{mode}.r{rounds}'
+                metrics[f'{prefix}.size_bytes'] = len(blob)
+                metrics[f'{prefix}.dump_us'] = per_call_us(dump, number)
+                metrics[f'{prefix}.load_us'] = per_call_us(lambda: load(blob), number)
+    return metrics
+
+
+def main() -> None:
+    metrics = run()
+    print(f"{'bot':<18}{'format':<10}{'bytes':>9}{'dump us':>10}{'load us':>10}")
+    for rounds in ROUNDS:
+        for mode in ('list', 'ring'):
+            for fmt in ('pickle', 'to_bytes'):
+                prefix = f'serialization.{fmt}.{mode}.r{rounds}'
+                label = f"{rounds} rounds {mode}"
+                print(f"{label:<18}{fmt:<10}{metrics[prefix + '.size_bytes']:>9.0f}"
+                      f"{metrics[prefix + '.dump_us']:>10.1f}{metrics[prefix + '.load_us']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+"""
+Load test of the two serving setups over real sockets: one gunicorn
+sync worker running the Flask app against one uvicorn process running
+asgi.py. Both keep sessions in memory (SESSION_BACKEND=memory), so the
+comparison is sync against async serving rather than one session store
+against another. Many clients play concurrently, each with its own
+session, and every client keeps its connection open when the server
+allows it. A last measurement compares one client's round-trip time on
+uvicorn over HTTP /play and over the /ws WebSocket channel.
+
+Run from the repository root (needs gunicorn and uvicorn[standard] installed):
+
+    python -m benchmarks.bench_serving
+"""
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from benchmarks.common import percentile
+
+MOVES = ('rock', 'paper', 'scissors')
+# One process each: the memory backend keeps sessions per process
+SYNC_WORKERS = 1
+BACKEND = {'SESSION_BACKEND': 'memory'}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(command: List[str], env: Dict[str, str], port: int) -> subprocess.Popen:
+    server = subprocess.Popen(command, env={**os.environ, **env},
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError(f"server did not start: {' '.join(command)}")
+
+
+class _Client:
+    """Minimal HTTP/1.1 client that reconnects whenever the server closes."""
+
+    def __init__(self, port: int) -> None:
+        self.port = port
+        self.cookie: Optional[str] = None
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b'') -> Tuple[int, bytes]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection('127.0.0.1', self.port)
+        lines = [f'{method} {path} HTTP/1.1', 'Host: 127.0.0.1',
+                 f'Content-Length: {len(body)}', 'Content-Type: application/json']
+        if self.cookie:
+            lines.append(f'Cookie: {self.cookie}')
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+
+        head = await self.reader.readuntil(b'\r\n\r\n')
+        status_line, *header_lines = head.decode('latin-1').split('\r\n')
+        headers = {}
+        for line in header_lines:
+            if line:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+        payload = await self.reader.readexactly(int(headers.get('content-length', 0)))
+        if 'set-cookie' in headers:
+            self.cookie = headers['set-cookie'].split(';')[0]
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return int(status_line.split()[1]), payload
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+async def _load(port: int, clients: int, rounds: int) -> Tuple[float, List[float]]:
+    players = [_Client(port) for _ in range(clients)]
+    await asyncio.gather(*(player.request('GET', '/') for player in players))
+
+    async def play(player: _Client, seed: int) -> List[float]:
+        rng = random.Random(seed)
+        latencies = []
+        for _ in range(rounds):
+            body = b'{"move": "%s"}' % rng.choice(MOVES).encode()
+            start = time.perf_counter()
+            status, _ = await player.request('POST', '/play', body)
+            latencies.append(time.perf_counter() - start)
+            assert status == 200, status
+        return latencies
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(play(p, i) for i, p in enumerate(players)))
+    elapsed = time.perf_counter() - start
+    for player in players:
+        player.close()
+    return elapsed, sorted(l for group in results for l in group)
+
+
+async def _round_trips(port: int, rounds: int) -> Dict[str, float]:
+    import websockets
+
+    player = _Client(port)
+    await player.request('GET', '/')
+    http = []
+    for i in range(rounds):
+        body = b'{"move": "%s"}' % MOVES[i % 3].encode()
+        start = time.perf_counter()
+        await player.request('POST', '/play', body)
+        http.append(time.perf_counter() - start)
+    player.close()
+
+    ws = []
+    async with websockets.connect(f'ws://127.0.0.1:{port}/ws',
+                                  additional_headers={'Cookie': player.cookie}) as channel:
+        for i in range(rounds):
+            start = time.perf_counter()
+            await channel.send(MOVES[i % 3][0])
+            await channel.recv()
+            ws.append(time.perf_counter() - start)
+
+    http.sort()
+    ws.sort()
+    return {
+        'serving.round_trip.http.p50_us': percentile(http, 50) * 1e6,
+        'serving.round_trip.websocket.p50_us': percentile(ws, 50) * 1e6,
+    }
+
+
+def bench_server(name: str, command: List[str], env: Dict[str, str], port: int,
+                 clients: int, rounds: int, round_trips: bool = False) -> Dict[str, float]:
+    server = _start_server(command, env, port)
+    try:
+        elapsed, latencies = asyncio.run(_load(port, clients, rounds))
+        if round_trips:
+            extra = asyncio.run(_round_trips(port, clients * rounds))
+    finally:
+        server.terminate()
+        server.wait()
+    prefix = f'serving.{name}.c{clients}'
+    metrics = {
+        f'{prefix}.requests_per_sec': len(latencies) / elapsed,
+        f'{prefix}.p50_us': percentile(latencies, 50) * 1e6,
+        f'{prefix}.p99_us': percentile(latencies, 99) * 1e6,
+    }
+    if round_trips:
+        metrics.update(extra)
+    return metrics
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    clients, rounds = (16, 10) if quick else (64, 30)
+    metrics = {}
+    port = _free_port()
+    metrics.update(bench_server(
+        'gunicorn_sync',
+        [sys.executable, '-m', 'gunicorn', 'app:app', '--workers', str(SYNC_WORKERS),
+         '--bind', f'127.0.0.1:{port}', '--log-level', 'warning'],
+        BACKEND, port, clients, rounds,
+    ))
+    port = _free_port()
+    metrics.update(bench_server(
+        'uvicorn_asgi',
+        [sys.executable, '-m', 'uvicorn', 'asgi:application', '--port', str(port),
+         '--log-level', 'warning'],
+        BACKEND, port, clients, rounds, round_trips=True,
+    ))
+    return metrics
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f"{name:<48}{value:>14.2f}")
@@ -0,0 +1,96 @@
+"""
+Cold start: how long a fresh interpreter takes to import the app and
+answer its first requests, measured in child processes so nothing is
+already imported or cached. Import times come from ``python -X
+importtime``; BUDGET_MS holds the limits we hold startup to.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup      # exits 1 when over budget
+"""
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+# Cumulative import time of each module, in a fresh interpreter
+IMPORTS = ('rps_main', 'app', 'asgi')
+
+# Modules the serving path must not import
+FORBIDDEN = ('numpy', 'tournament')
+
+BUDGET_MS = {
+    'startup.import.rps_main_ms': 50,
+    'startup.import.app_ms': 400,
+    'startup.first_request_ms': 500,
+}
+
+_FIRST_REQUEST = """
+import time
+start = time.perf_counter()
+import app
+client = app.app.test_client()
+client.get('/')
+client.post('/play', json={'move': 'rock'})
+print((time.perf_counter() - start) * 1e3)
+"""
+
+_LOADED = """
+import sys
+import asgi
+print(' '.join(name for name in {forbidden!r} if name in sys.modules))
+"""
+
+_EARLY_TABLE = """
+import time
+from rps_main import RPSMain
+RPSMain.EARLY_TABLE = True
+start = time.perf_counter()
+assert RPSMain.warm_up()
+print((time.perf_counter() - start) * 1e3)
+"""
+
+
+def _python(args: List[str]) -> subprocess.CompletedProcess:
+    env = {**os.environ, 'SECRET_KEY': 'benchmark'}
+    return subprocess.run([sys.executable, *args], env=env, capture_output=True, text=True, check=True)
+
+
+def import_ms(module: str) -> float:
+    """Cumulative import time of ``module`` from ``-X importtime``, in ms."""
+    stderr = _python(['-X', 'importtime', '-c', f'import {module}']).stderr
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and line.rsplit('|', 1)[1].strip() == module:
+            return int(line.split('|')[1]) / 1e3
+    raise RuntimeError(f"no import time reported for {module}")
+
+
+def loaded_modules() -> List[str]:
+    """The FORBIDDEN modules that importing the serving code pulls in."""
+    return _python(['-c', _LOADED.format(forbidden=FORBIDDEN)]).stdout.split()
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    repeat = 3 if quick else 7
+    metrics = {}
+    for module in IMPORTS:
+        metrics[f'startup.import.{module}_ms'] = min(import_ms(module) for _ in range(repeat))
+    metrics['startup.first_request_ms'] = min(
+        float(_python(['-c', _FIRST_REQUEST]).stdout) for _ in range(repeat))
+    metrics['startup.early_table_ms'] = float(_python(['-c', _EARLY_TABLE]).stdout)
+    return metrics
+
+
+def over_budget(metrics: Dict[str, float]) -> List[str]:
+    return [f"{name}: {metrics[name]:.1f} ms > {limit} ms"
+            for name, limit in BUDGET_MS.items() if metrics.get(name, 0) > limit]
+
+
+if __name__ == '__main__':
+    results = run()
+    for name, value in results.items():
+        print(f"{name:<48}{value:>14.2f}")
+    problems = over_budget(results) + [f"{name} imported at startup" for name in loaded_modules()]
+    for problem in problems:
+        print(f"OVER BUDGET {problem}")
+    sys.exit(1 if problems else 0)
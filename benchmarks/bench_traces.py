@@ -0,0 +1,55 @@
+"""
+Trace recording and replay: what TraceWriter.record adds to a request,
+and how fast recorded rounds replay, in one process and on a pool.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_traces
+"""
+import os
+import random
+import tempfile
+import time
+from typing import Dict
+
+from benchmarks.common import per_call_us
+from traces import TraceWriter, encode_rounds, replay
+
+SESSIONS = 200
+
+
+def write_traces(directory: str, rounds: int, seed: int = 0) -> None:
+    """Record ``rounds`` rounds spread over SESSIONS sessions, in request-sized pieces."""
+    rng = random.Random(seed)
+    writer = TraceWriter(directory, flush_interval=60)
+    users = [f'user-{i}' for i in range(SESSIONS)]
+    played = 0
+    while played < rounds:
+        size = min(rng.choice((1, 1, 1, 10)), rounds - played)
+        writer.record(rng.choice(users), encode_rounds(rng.choices(range(3), k=size),
+                                                       rng.choices(range(3), k=size)))
+        played += size
+    writer.close()
+
+
+def run(quick: bool = False) -> Dict[str, float]:
+    rounds = 20_000 if quick else 200_000
+    metrics = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = TraceWriter(os.path.join(tmp, 'record'), flush_interval=60)
+        one_round = encode_rounds([0], [1])
+        metrics['traces.record_round_us'] = per_call_us(lambda: writer.record('user', one_round), 20_000)
+        writer.close()
+
+        write_traces(tmp, rounds)
+        for workers in sorted({1, os.cpu_count() or 1}):
+            start = time.perf_counter()
+            summary = replay([tmp], workers=workers)
+            elapsed = time.perf_counter() - start
+            metrics[f'traces.replay.w{workers}.rounds_per_sec'] = summary['rounds'] / elapsed
+    return metrics
+
+
+if __name__ == '__main__':
+    for name, value in run().items():
+        print(f"{name:<48}{value:>14.2f}")
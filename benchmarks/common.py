@@ -0,0 +1,73 @@
+"""Shared helpers for the benchmark scripts."""
+import json
+import os
+import platform
+import subprocess
+import time
+import timeit
+from typing import Any, Callable, Dict, List
+
+# Metric name suffixes that tell compare() which direction is better
+LOWER_IS_BETTER = ('_us', '_ms', '_bytes', '_kb', '_count')
+HIGHER_IS_BETTER = ('_per_sec',)
+
+
+def per_call_us(func: Callable[[], Any], number: int, repeat: int = 5) -> float:
+    """Best-of-``repeat`` time per call in microseconds."""
+    return min(timeit.repeat(func, number=number, repeat=repeat)) / number * 1e6
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def write_results(metrics: Dict[str, float], path: str) -> None:
+    """Save metrics with enough context to tell runs apart."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    payload = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'platform': platform.platform(),
+        },
+        'metrics': metrics,
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2, sort_keys=True)
+
+
+def load_metrics(path: str) -> Dict[str, float]:
+    with open(path) as f:
+        return json.load(f)['metrics']
+
+
+def compare(current: Dict[str, float], baseline: Dict[str, float],
+            threshold: float) -> List[str]:
+    """
+    Return a description of every metric that got worse than the baseline
+    by more than ``threshold`` (a fraction, e.g. 0.2 for 20%).
+    """
+    regressions = []
+    for name, value in sorted(current.items()):
+        old = baseline.get(name)
+        if not old:
+            continue
+        change = (value - old) / old
+        if name.endswith(LOWER_IS_BETTER) and change > threshold:
+            regressions.append(f"{name}: {old:.4g} -> {value:.4g} (+{change:.0%})")
+        elif name.endswith(HIGHER_IS_BETTER) and change < -threshold:
+            regressions.append(f"{name}: {old:.4g} -> {value:.4g} ({change:.0%})")
+    return regressions
@@ -0,0 +1,62 @@
+"""
+Run the benchmark suite, save the results as JSON and optionally compare
+them with an earlier run.
+
+    python -m benchmarks.run                      # full run
+    python -m benchmarks.run --quick              # smaller, for CI smoke runs
+    python -m benchmarks.run --compare benchmarks/results/baseline.json
+"""
+import argparse
+import sys
+import time
+
+from benchmarks import (
+    bench_app, bench_churn, bench_engine, bench_markov, bench_serialization, bench_serving, bench_startup,
+    bench_traces,
+)
+from benchmarks.common import compare, load_metrics, write_results
+
+SUITES = {
+    'engine': bench_engine.run,
+    'markov': bench_markov.run,
+    'serialization': bench_serialization.run,
+    'app': bench_app.run,
+    'churn': bench_churn.run,
+    'serving': bench_serving.run,
+    'startup': bench_startup.run,
+    'traces': bench_traces.run,
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--quick', action='store_true', help='fewer iterations')
+    parser.add_argument('--only', choices=sorted(SUITES), action='append', help='run only these suites')
+    parser.add_argument('--output', help='JSON file to write (default: benchmarks/results/<time>.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.20,
+                        help='relative slowdown that counts as a regression (default 0.20)')
+    args = parser.parse_args()
+
+    metrics = {}
+    for name in args.only or SUITES:
+        print(f"Running {name} benchmarks...", file=sys.stderr)
+        metrics.update(SUITES[name](quick=args.quick))
+
+    for name, value in sorted(metrics.items()):
+        print(f"{name:<48}{value:>14.2f}")
+
+    output = args.output or time.strftime('benchmarks/results/%Y%m%d-%H%M%S.json')
+    write_results(metrics, output)
+    print(f"Saved results to {output}", file=sys.stderr)
+
+    if args.compare:
+        regressions = compare(metrics, load_metrics(args.compare), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+"""
+Offline builder of the early-game decision table (see RPSMain.EARLY_TABLE).
+
+The table answers a bot's first ``PHASE_THRESHOLDS['mid']`` rounds by
+lookup instead of a full vote. It is built here by playing out every
+history of that length, which takes seconds, and checked in as
+rps_main.EARLY_TABLE_PATH; bots only read it. Rebuild it after changing
+a strategy or a default setting of RPSMain, or the table no longer
+matches the class and bots play the full vote:
+
+    python early_table.py
+"""
+import argparse
+import sys
+import zlib
+from array import array
+from typing import Tuple
+
+from rps_main import (
+    EARLY_TABLE_PATH, _EARLY_HEADER, _EARLY_MAGIC, _EARLY_STRATEGIES, _NO_OUTCOME, RPSMain, early_table_key,
+)
+
+Tables = Tuple[array, array, array]
+
+
+def build(cls: type = RPSMain) -> Tables:
+    """
+    Decision tables for the early game of bot class ``cls``. Decisions
+    are stored as the voted move code plus the credited strategy's index
+    shifted left by two.
+
+    Histories are indexed by their (my move, opponent move) pairs, oldest
+    first, as base-9 digits; the histories of length n start at
+    ``(9 ** n - 1) // 8``. The tables are:
+
+    - ``predictions``: per history, every strategy's prediction as two
+      bits in _EARLY_STRATEGIES order, 3 meaning "random move" (psychology without
+      its streak rules, which depend on counters rather than the history);
+    - ``outcomes``: per history and streak prediction (a move code, or 3
+      for none), the decision, or _NO_OUTCOME when a random move takes part;
+    - ``votes``: per history length and the five predictions as base-3
+      digits, the decision of the weighted vote.
+    """
+    if cls.enabled_strategies() != _EARLY_STRATEGIES:
+        raise ValueError(f"The early table plays exactly {_EARLY_STRATEGIES}")
+    depth = cls.PHASE_THRESHOLDS['mid']
+    size = (9 ** (depth + 1) - 1) // 8
+    predictions = array('H', [0]) * size
+    outcomes = array('B', [_NO_OUTCOME]) * (4 * size)
+    votes = array('B', [0]) * (243 * (depth + 1))
+
+    def visit(parent: RPSMain, n: int, key: int) -> None:
+        for pair in range(9):
+            bot = parent._copy()
+            bot.update_codes(pair // 3, pair % 3)
+            if pair == 0 and key == 0:  # first history of this length
+                _fill_votes(bot, votes, 243 * n)
+            child = key * 9 + pair
+            _fill_entry(bot, (9 ** n - 1) // 8 + child, predictions, outcomes, votes, 243 * n)
+            if n < depth:
+                visit(bot, n + 1, child)
+
+    # Strategies report their random fallbacks as None instead of drawing
+    probe = type(f'{cls.__name__}Probe', (cls,), {'__slots__': (), '_random_move': lambda self: None})
+    visit(probe(), 1, 0)
+    return predictions, outcomes, votes
+
+
+def _fill_votes(bot: RPSMain, votes: array, base: int) -> None:
+    """Tally every combination of predictions with ``bot``'s current weights."""
+    weights = bot._strategy_weights()
+    for code in range(243):
+        ballot = {}
+        for i, strategy in enumerate(_EARLY_STRATEGIES):
+            ballot[strategy] = code // 3 ** (4 - i) % 3
+        best = bot._tally(ballot, weights)
+        votes[base + code] = best | bot.STRATEGY_ORDER.index(bot.last_strategy_used) << 2
+    # Keep strategy credit (and so the weights) out of the histories played next
+    bot.last_strategy_used = None
+
+
+def _fill_entry(bot: RPSMain, index: int, predictions: array, outcomes: array,
+                votes: array, base: int) -> None:
+    """Record ``bot``'s strategy predictions and draw-free decisions at ``index``."""
+    made = (
+        bot._markov_prediction(),
+        bot._frequency_prediction(),
+        bot._psychology_habit(),
+        bot._pattern_prediction(),
+        bot._reaction_prediction(),
+    )
+    codes = [3 if move is None else move for move in made]
+    packed = 0
+    for i, code in enumerate(codes):
+        packed |= code << 2 * i
+    predictions[index] = packed
+
+    for streak in range(4):
+        # Psychology is third in _EARLY_STRATEGIES
+        ballot = codes[:2] + [streak if streak < 3 else codes[2]] + codes[3:]
+        if 3 not in ballot:
+            code = 0
+            for digit in ballot:
+                code = code * 3 + digit
+            outcomes[4 * index + streak] = votes[base + code]
+
+
+def write(path: str, cls: type, tables: Tables) -> None:
+    """Save ``tables``, built for ``cls``, in the format rps_main reads."""
+    key = early_table_key(cls).encode()
+    payload = bytearray()
+    for table in tables:
+        if sys.byteorder == 'big':
+            table = array(table.typecode, table)
+            table.byteswap()
+        payload += table.tobytes()
+    with open(path, 'wb') as f:
+        f.write(_EARLY_HEADER.pack(_EARLY_MAGIC, len(key)))
+        f.write(key)
+        f.write(zlib.compress(bytes(payload), 9))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=EARLY_TABLE_PATH)
+    args = parser.parse_args()
+    write(args.output, RPSMain, build(RPSMain))
+    print(f"wrote {args.output}")
+
+
+if __name__ == '__main__':
+    main()
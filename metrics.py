@@ -0,0 +1,250 @@
+"""
+Minimal Prometheus-style metrics: counters, gauges and histograms with
+labels, rendered in the text exposition format for a /metrics endpoint.
+
+Instrumentation is opt-in. ``instrument_bot`` replaces a bot class's hot
+methods with timed wrappers, so when it is never called the bot runs its
+plain methods with no timers or lookups at all. Values are kept per
+process; with several workers, each one reports its own.
+"""
+import bisect
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Seconds; the bot's methods take microseconds, requests milliseconds
+DEFAULT_BUCKETS = (
+    5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0,
+)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str) -> Any:
+        """Return the child for one combination of label values (create it once, reuse it)."""
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}")
+        with self._lock:
+            child = self._children.get(values)
+            if child is None:
+                child = self._children[values] = self._new_child()
+            return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} {self.kind}',
+        ] + self._samples()
+
+
+class _Value:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self) -> List[str]:
+        return [
+            f'{self.name}_total{_format_labels(self.label_names, key)} {_format_value(child.value)}'
+            for key, child in sorted(self._children.items())
+        ]
+
+
+class Gauge(_Metric):
+    """Gauge set directly, or read from ``callback`` at scrape time."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 callback: Optional[Callable[[], float]] = None) -> None:
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def _samples(self) -> List[str]:
+        if self.callback is not None:
+            return [f'{self.name} {_format_value(self.callback())}']
+        return [
+            f'{self.name}{_format_labels(self.label_names, key)} {_format_value(child.value)}'
+            for key, child in sorted(self._children.items())
+        ]
+
+
+class _Buckets:
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.total += value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _Buckets:
+        return _Buckets(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, child in sorted(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), child.counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f'{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}')
+            labels = _format_labels(self.label_names, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(child.total)}')
+            lines.append(f'{self.name}_count{labels} {cumulative}')
+        return lines
+
+
+class Registry:
+    """A set of metrics rendered together."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _add(self, metric: _Metric) -> Any:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = (),
+              callback: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._add(Gauge(name, documentation, labels, callback))
+
+    def histogram(self, name: str, documentation: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def timed(histogram: Any) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator recording each call's duration in ``histogram`` (or a labelled child)."""
+    def decorate(func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def instrument_bot(cls: type, registry: Registry) -> None:
+    """
+    Time ``cls``'s get_move, update and each strategy, and count the
+    strategy credited on every update. Patches the class in place, once;
+    the move-code methods are the ones patched, so both APIs are timed.
+    """
+    if cls.__dict__.get('_instrumented'):
+        return
+    calls = registry.histogram('rps_bot_call_seconds', 'Bot get_move and update latency.', ['method'])
+    strategies = registry.histogram(
+        'rps_strategy_seconds', 'Strategy prediction time inside _make_prediction.', ['strategy'])
+    credited = registry.counter('rps_strategy_credited', 'Rounds credited to each strategy.', ['strategy'])
+
+    for name in cls.STRATEGY_ORDER:
+        method = f'_{name}_prediction'
+        setattr(cls, method, timed(strategies.labels(name))(getattr(cls, method)))
+    cls._early_prediction = timed(strategies.labels('early_table'))(cls._early_prediction)
+    cls.get_move_code = timed(calls.labels('get_move'))(cls.get_move_code)
+
+    update = cls.update_codes
+    update_time = calls.labels('update')
+    # Subclasses may register strategies of their own: label those on first credit
+    credit = {name: credited.labels(name) for name in cls.STRATEGY_ORDER}
+
+    @functools.wraps(update)
+    def counted_update(self: Any, my_code: int, opponent_code: int) -> None:
+        strategy = self.last_strategy_used
+        start = time.perf_counter()
+        update(self, my_code, opponent_code)
+        update_time.observe(time.perf_counter() - start)
+        if strategy is not None:
+            counter = credit.get(strategy)
+            if counter is None:
+                counter = credit[strategy] = credited.labels(strategy)
+            counter.inc()
+
+    cls.update_codes = counted_update
+    cls._instrumented = True
@@ -0,0 +1,320 @@
+"""
+Vectorized RPSMain for offline play: many games stepped together with
+NumPy. Kept apart from rps_main so that serving a single game never
+imports NumPy.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from rps_main import MoveRandom, RPSMain
+
+
+class RPSBatch:
+    """
+    Vectorized engine that plays ``n`` independent RPSMain games at once.
+
+    All per-game state lives in packed NumPy arrays (stacked transition
+    matrices, ring-buffer histories, pattern counts and strategy counters)
+    so each round costs a handful of array operations instead of ``n``
+    Python-level ``get_move``/``update`` calls.
+
+    Moves are encoded as 0/1/2 for rock/paper/scissors. Every game owns a
+    MoveRandom, so game ``i`` seeded with ``s`` plays exactly the same
+    moves as ``RPSMain(seed=s)``.
+    """
+
+    MOVES = ('rock', 'paper', 'scissors')
+    STRATEGIES = ('markov', 'frequency', 'psychology', 'pattern', 'reaction')
+    HISTORY_SIZE = 16                # Ring buffer length; must exceed RECENT_WINDOW
+    PATTERN_CONTEXTS = 9 + 27        # Order-2 and order-3 contexts
+
+    def __init__(self, n: int, seeds: Optional[List[int]] = None) -> None:
+        if RPSMain.RECENT_WINDOW >= self.HISTORY_SIZE:
+            raise ValueError("HISTORY_SIZE must exceed RPSMain.RECENT_WINDOW")
+        if RPSMain.PATTERN_ORDERS != (2, 3) or RPSMain.PATTERN_COUNT_LIMIT:
+            raise ValueError("RPSBatch only supports the default pattern memory")
+        if RPSMain.enabled_strategies() != self.STRATEGIES:
+            raise ValueError("RPSBatch only supports the production strategy profile")
+        if seeds is not None and len(seeds) != n:
+            raise ValueError("Expected one seed per game")
+
+        self.n = n
+        self.rngs = [MoveRandom(seed) for seed in seeds] if seeds is not None \
+            else [MoveRandom() for _ in range(n)]
+        self._rows = np.arange(n)
+
+        # Game history (ring buffers indexed by move number % HISTORY_SIZE)
+        self.moves_played = np.zeros(n, dtype=np.int64)
+        self.opponent_history = np.zeros((n, self.HISTORY_SIZE), dtype=np.int8)
+        self.my_history = np.zeros((n, self.HISTORY_SIZE), dtype=np.int8)
+        self.results_history = np.zeros((n, self.HISTORY_SIZE), dtype=np.int8)
+
+        # Markov model
+        self.transition_matrix = np.ones((n, 3, 3)) / 3
+
+        # Pattern memory: follow-up counts per context, plus the order in
+        # which each follow-up was first seen (used to break count ties the
+        # same way RPSMain._pattern_prediction does).
+        self.pattern_counts = np.zeros((n, self.PATTERN_CONTEXTS, 3), dtype=np.int32)
+        self.pattern_rank = np.full((n, self.PATTERN_CONTEXTS, 3), 3, dtype=np.int8)
+        self.pattern_seen = np.zeros((n, self.PATTERN_CONTEXTS), dtype=np.int8)
+
+        self.frequency_table = np.zeros((n, 3), dtype=np.int64)
+        self.opponent_repeats = np.zeros(n, dtype=np.int64)
+        self.opponent_losses = np.zeros(n, dtype=np.int64)
+        self.exploration_rate = RPSMain.EXPLORATION_RATE
+        self.adapt_speed = RPSMain.ADAPTATION_SPEED
+        self.confidence = np.zeros(n)
+
+        # Strategy performance tracking, columns follow STRATEGIES
+        self.strategy_successes = np.zeros((n, len(self.STRATEGIES)), dtype=np.int64)
+        self.strategy_attempts = np.zeros((n, len(self.STRATEGIES)), dtype=np.int64)
+        self.last_strategy_used = np.full(n, -1, dtype=np.int8)
+
+        self._decay_powers = np.array(
+            [RPSMain.FREQUENCY_DECAY ** k for k in range(RPSMain.RECENT_WINDOW)]
+        )
+        self._phase_weights = np.array([
+            [RPSMain.PHASE_WEIGHTS[phase][s] for s in self.STRATEGIES]
+            for phase in ('early', 'mid', 'late')
+        ])
+
+    @classmethod
+    def encode(cls, moves: List[str]) -> np.ndarray:
+        """Convert move names to an int8 code array."""
+        return np.array([cls.MOVES.index(m) for m in moves], dtype=np.int8)
+
+    @classmethod
+    def decode(cls, codes: np.ndarray) -> List[str]:
+        """Convert an array of move codes back to move names."""
+        return [cls.MOVES[int(c)] for c in codes]
+
+    def _recent(self, buffer: np.ndarray, k: int) -> np.ndarray:
+        """Return the k-th most recent entry of ``buffer`` for every game."""
+        return buffer[self._rows, (self.moves_played - k) % self.HISTORY_SIZE]
+
+    def get_moves(self) -> np.ndarray:
+        """
+        Select the next move for every game.
+
+        Mirrors RPSMain.get_move: a random move on the first round or when
+        exploring, otherwise the counter to the weighted-vote prediction.
+        """
+        mp = self.moves_played
+        self.confidence = np.minimum(
+            RPSMain.MAX_CONFIDENCE,
+            RPSMain.BASE_CONFIDENCE + RPSMain.CONFIDENCE_PER_MOVE * mp
+        )
+
+        predictions = np.empty((self.n, len(self.STRATEGIES)), dtype=np.int8)
+        needs_random = np.zeros((self.n, len(self.STRATEGIES)), dtype=bool)
+        new_losses, new_repeats = self._fill_predictions(predictions, needs_random)
+
+        # Random draws stay per game so every generator is consumed in the
+        # same order as RPSMain consumes its own.
+        moves = np.empty(self.n, dtype=np.int8)
+        predicting = np.zeros(self.n, dtype=bool)
+        has_history = mp > 0
+        random_columns = [np.flatnonzero(row) for row in needs_random]
+        for g, rng in enumerate(self.rngs):
+            if not has_history[g] or rng.random() < self.exploration_rate:
+                moves[g] = rng.move_code()
+                continue
+            predicting[g] = True
+            for s in random_columns[g]:
+                predictions[g, s] = rng.move_code()
+
+        if predicting.any():
+            rows = np.flatnonzero(predicting)
+            best, top_strategy = self._vote(predictions[rows], mp[rows],
+                                            self.strategy_attempts[rows],
+                                            self.strategy_successes[rows])
+            moves[rows] = (best + 1) % 3
+            self.last_strategy_used[rows] = top_strategy
+            # Psychology counters only move when the strategy actually ran
+            self.opponent_losses[rows] = new_losses[rows]
+            self.opponent_repeats[rows] = new_repeats[rows]
+
+        return moves
+
+    def _fill_predictions(self, predictions: np.ndarray,
+                          needs_random: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the deterministic prediction of every strategy for every
+        game. Entries whose strategy would fall back to a random move are
+        flagged in ``needs_random`` and filled in by the caller.
+
+        Returns the psychology counters as they would be after evaluating
+        ``_psychology_prediction``.
+        """
+        mp = self.moves_played
+        last_opp = self._recent(self.opponent_history, 1)
+        prev_opp = self._recent(self.opponent_history, 2)
+        last_mine = self._recent(self.my_history, 1)
+        last_result = self._recent(self.results_history, 1)
+
+        # Markov: argmax of the row for the opponent's last move
+        predictions[:, 0] = np.argmax(self.transition_matrix[self._rows, last_opp], axis=1)
+
+        # Frequency: exponentially decayed counts over the recent window,
+        # summed oldest first with ties going to the earliest-seen move.
+        window = np.minimum(mp, RPSMain.RECENT_WINDOW)
+        weighted = np.zeros((self.n, 3))
+        first_seen = np.full((self.n, 3), RPSMain.RECENT_WINDOW)
+        for age in range(RPSMain.RECENT_WINDOW - 1, -1, -1):
+            valid = age < window
+            move = self._recent(self.opponent_history, age + 1)
+            weighted[self._rows, move] += np.where(valid, self._decay_powers[age], 0.0)
+            order = RPSMain.RECENT_WINDOW - 1 - age
+            current = first_seen[self._rows, move]
+            first_seen[self._rows, move] = np.where(valid, np.minimum(current, order), current)
+        predictions[:, 1] = self._argmax_first(weighted, first_seen)
+
+        # Psychology: replicate the early-return chain and its counters
+        tilt = last_result == RPSMain.WIN_RESULT
+        new_losses = np.where(tilt, self.opponent_losses + 1, 0)
+        tilt_hit = tilt & (new_losses >= 2)
+        repeated = (mp >= 2) & (last_opp == prev_opp)
+        new_repeats = np.where(tilt_hit, self.opponent_repeats,
+                               np.where(repeated, self.opponent_repeats + 1, 0))
+        repeat_hit = ~tilt_hit & repeated & (new_repeats >= 2)
+        lost_hit = ~tilt_hit & ~repeat_hit & (last_result == RPSMain.LOSS_RESULT)
+        shift_hit = ~tilt_hit & ~repeat_hit & ~lost_hit & (mp >= 2) & tilt
+        psychology = np.where(tilt_hit, last_opp, (last_opp + 1) % 3)
+        psychology = np.where(lost_hit, (last_mine + 1) % 3, psychology)
+        predictions[:, 2] = psychology
+        needs_random[:, 2] = ~(tilt_hit | repeat_hit | lost_hit | shift_hit)
+
+        # Pattern: most common follow-up of the order-2, then order-3 context
+        third_opp = self._recent(self.opponent_history, 3)
+        ctx_2 = prev_opp * 3 + last_opp
+        ctx_3 = 9 + third_opp * 9 + prev_opp * 3 + last_opp
+        seen_2 = (mp >= 2) & (self.pattern_seen[self._rows, ctx_2] > 0)
+        seen_3 = ~seen_2 & (mp >= 3) & (self.pattern_seen[self._rows, ctx_3] > 0)
+        ctx = np.where(seen_2, ctx_2, ctx_3)
+        predictions[:, 3] = self._argmax_first(self.pattern_counts[self._rows, ctx],
+                                               self.pattern_rank[self._rows, ctx])
+        needs_random[:, 3] = ~(seen_2 | seen_3)
+
+        # Reaction: share of recent rounds where they beat our previous move
+        reaction_count = np.zeros(self.n, dtype=np.int64)
+        total_checked = np.zeros(self.n, dtype=np.int64)
+        for i in range(1, RPSMain.RECENT_WINDOW + 1):
+            valid = i < mp
+            our_prev = self._recent(self.my_history, i + 1)
+            their_next = self._recent(self.opponent_history, i)
+            reaction_count += valid & (their_next == (our_prev + 1) % 3)
+            total_checked += valid
+        ratio = reaction_count / np.maximum(total_checked, 1)
+        reacting = (mp >= 2) & (total_checked >= 3) & (ratio > 0.60)
+        predictions[:, 4] = (last_mine + 1) % 3
+        needs_random[:, 4] = ~reacting
+
+        return new_losses, new_repeats
+
+    @staticmethod
+    def _argmax_first(scores: np.ndarray, order: np.ndarray) -> np.ndarray:
+        """Row-wise argmax that breaks exact ties by the smallest ``order``."""
+        best = scores.max(axis=1, keepdims=True)
+        ranked = np.where(scores == best, order.astype(np.int64), np.iinfo(np.int64).max)
+        return np.argmin(ranked, axis=1)
+
+    def _vote(self, predictions: np.ndarray, moves_played: np.ndarray,
+              attempts: np.ndarray, successes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Weighted vote across strategies for a subset of games.
+
+        Returns the predicted opponent move and the index of the strategy
+        credited with it, matching RPSMain._make_prediction.
+        """
+        phase = np.where(moves_played <= RPSMain.PHASE_THRESHOLDS['early'], 0,
+                         np.where(moves_played <= RPSMain.PHASE_THRESHOLDS['mid'], 1, 2))
+        weights = self._phase_weights[phase]
+
+        adjust = attempts > RPSMain.MIN_STRATEGY_ATTEMPTS
+        success_rate = successes / np.maximum(attempts, 1)
+        weights = np.where(adjust, weights * (1 + success_rate), weights)
+
+        # Sum left to right, exactly like sum() over the weights dict
+        total_weight = weights[:, 0]
+        for s in range(1, weights.shape[1]):
+            total_weight = total_weight + weights[:, s]
+        positive = total_weight > 0
+        weights = np.where(positive[:, None],
+                           weights / np.where(positive, total_weight, 1.0)[:, None],
+                           weights)
+
+        rows = np.arange(len(predictions))
+        vote = np.zeros((len(predictions), 3))
+        first_vote = np.full((len(predictions), 3), weights.shape[1])
+        for s in range(weights.shape[1]):
+            pred = predictions[:, s]
+            vote[rows, pred] += weights[:, s]
+            first_vote[rows, pred] = np.minimum(first_vote[rows, pred], s)
+        best = self._argmax_first(vote, first_vote)
+
+        credited = np.where(predictions == best[:, None], weights, -1.0)
+        top_strategy = np.argmax(credited, axis=1)
+        return best, top_strategy
+
+    def update(self, my_moves: np.ndarray, opponent_moves: np.ndarray) -> None:
+        """
+        Record the result of a round for every game and update all
+        internal models.
+        """
+        my_moves = np.asarray(my_moves, dtype=np.int8)
+        opponent_moves = np.asarray(opponent_moves, dtype=np.int8)
+        rows = self._rows
+
+        slot = self.moves_played % self.HISTORY_SIZE
+        self.my_history[rows, slot] = my_moves
+        self.opponent_history[rows, slot] = opponent_moves
+        self.moves_played += 1
+        mp = self.moves_played
+
+        # Result from the bot's perspective
+        win = opponent_moves == (my_moves + 2) % 3
+        result = np.where(my_moves == opponent_moves, RPSMain.TIE_RESULT,
+                          np.where(win, RPSMain.WIN_RESULT, RPSMain.LOSS_RESULT))
+        self.results_history[rows, slot] = result
+
+        self.frequency_table[rows, opponent_moves] += 1
+
+        # Credit/blame the strategy that led to this move
+        credited = self.last_strategy_used >= 0
+        strategy = np.where(credited, self.last_strategy_used, 0)
+        self.strategy_attempts[rows, strategy] += credited
+        self.strategy_successes[rows, strategy] += credited & win
+
+        # Update Markov transition matrix
+        prev_opp = self._recent(self.opponent_history, 2)
+        updating = np.flatnonzero(mp > 1)
+        if len(updating):
+            prev_idx = prev_opp[updating]
+            row = self.transition_matrix[updating, prev_idx]
+            hit = np.arange(3) == opponent_moves[updating, None]
+            row = np.where(hit, row + self.adapt_speed, row * (1 - self.adapt_speed / 2))
+            row_sum = (row[:, 0] + row[:, 1]) + row[:, 2]
+            self.transition_matrix[updating, prev_idx] = row / row_sum[:, None]
+
+        # Update pattern memory
+        third_opp = self._recent(self.opponent_history, 3)
+        fourth_opp = self._recent(self.opponent_history, 4)
+        self._record_pattern(np.flatnonzero(mp >= 3),
+                             (third_opp * 3 + prev_opp), opponent_moves)
+        self._record_pattern(np.flatnonzero(mp >= 4),
+                             (9 + fourth_opp * 9 + third_opp * 3 + prev_opp), opponent_moves)
+
+    def _record_pattern(self, games: np.ndarray, contexts: np.ndarray,
+                        follows: np.ndarray) -> None:
+        """Count ``follows`` after ``contexts`` for the selected games."""
+        if not len(games):
+            return
+        ctx = contexts[games]
+        move = follows[games]
+        fresh = self.pattern_counts[games, ctx, move] == 0
+        self.pattern_rank[games, ctx, move] = np.where(
+            fresh, self.pattern_seen[games, ctx], self.pattern_rank[games, ctx, move])
+        self.pattern_seen[games, ctx] += fresh
+        self.pattern_counts[games, ctx, move] += 1
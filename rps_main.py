@@ -1,7 +1,628 @@
+import json
+import os
 import random
-import numpy as np
-from collections import defaultdict, Counter
-from typing import List, Dict, Tuple, Optional
+import struct
+import sys
+import zlib
+from array import array
+from collections import defaultdict
+from typing import Any, Callable, Iterator, List, Dict, NamedTuple, Sequence, Tuple, Optional, Union
+
+
+# Early-game decision tables (see RPSMain.EARLY_TABLE). early_table.py
+# builds them offline into EARLY_TABLE_PATH: magic, length of the key,
+# the key (see early_table_key), then the zlib-compressed tables.
+EARLY_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'early_table.bin')
+_EARLY_MAGIC = b'RPSE'
+_EARLY_HEADER = struct.Struct('<4sI')
+_EARLY_TABLES: Dict[type, Optional[Tuple[array, array, array]]] = {}
+_NO_OUTCOME = 0xFF
+# The strategies the early-game table plays, in STRATEGY_ORDER
+_EARLY_STRATEGIES = ('markov', 'frequency', 'psychology', 'pattern', 'reaction')
+
+
+def early_table_key(cls: type) -> str:
+    """The settings of bot class ``cls`` an early table depends on, as canonical JSON."""
+    settings = {}
+    for name in dir(cls):
+        if not name.isupper() or name.startswith('_') or name == 'EARLY_TABLE':
+            continue
+        try:
+            settings[name] = json.loads(json.dumps(getattr(cls, name)))
+        except TypeError:  # not a setting (e.g. STRATEGIES)
+            continue
+    return json.dumps(settings, sort_keys=True)
+
+
+def _early_table(cls: type) -> Optional[Tuple[array, array, array]]:
+    """
+    The early tables of bot class ``cls`` (see early_table.build), read
+    from EARLY_TABLE_PATH on first use, or None when the file holds no
+    table for the class's settings.
+    """
+    if cls not in _EARLY_TABLES:
+        _EARLY_TABLES[cls] = _read_early_table(EARLY_TABLE_PATH, early_table_key(cls))
+    return _EARLY_TABLES[cls]
+
+
+def _read_early_table(path: str, key: str) -> Optional[Tuple[array, array, array]]:
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return None
+    magic, length = _EARLY_HEADER.unpack_from(data, 0)
+    if magic != _EARLY_MAGIC:
+        raise ValueError(f"{path} is not an early-game table")
+    offset = _EARLY_HEADER.size
+    if data[offset:offset + length].decode() != key:
+        return None
+    payload = zlib.decompress(data[offset + length:])
+    depth = json.loads(key)['PHASE_THRESHOLDS']['mid']
+    size = (9 ** (depth + 1) - 1) // 8
+    tables = []
+    start = 0
+    for typecode, count in (('H', size), ('B', 4 * size), ('B', 243 * (depth + 1))):
+        table = array(typecode)
+        end = start + count * table.itemsize
+        table.frombytes(payload[start:end])
+        if sys.byteorder == 'big':
+            table.byteswap()
+        tables.append(table)
+        start = end
+    return tables[0], tables[1], tables[2]
+
+
+class MoveHistory:
+    """
+    Fixed-size ring buffer that keeps only the most recent entries of a
+    game history as int8 codes.
+
+    It reads like a list: ``len()`` is the lifetime number of entries,
+    negative indices and slices address the most recent ones, and
+    iteration yields whatever is still retained. Reading an entry that
+    has already been overwritten raises IndexError.
+    """
+
+    __slots__ = ('capacity', 'symbols', '_codes', '_buffer', '_count')
+
+    # symbols -> their codes, shared by every history over the same symbols
+    _SYMBOL_CODES: Dict[Tuple[Any, ...], Dict[Any, int]] = {}
+
+    def __init__(self, capacity: int, symbols: Optional[Sequence[Any]] = None) -> None:
+        self.capacity = capacity
+        # With symbols, entries are stored as their index into symbols;
+        # otherwise they must be small integers and are stored as-is.
+        self.symbols = tuple(symbols) if symbols is not None else None
+        self._codes = None
+        if self.symbols is not None:
+            codes = self._SYMBOL_CODES.get(self.symbols)
+            if codes is None:
+                codes = self._SYMBOL_CODES[self.symbols] = {s: i for i, s in enumerate(self.symbols)}
+            self._codes = codes
+        self._buffer = array('b', bytes(capacity))
+        self._count = 0
+
+    def append(self, value: Any) -> None:
+        code = self._codes[value] if self._codes is not None else value
+        self._buffer[self._count % self.capacity] = code
+        self._count += 1
+
+    def _get(self, index: int) -> Any:
+        if index < self._count - self.capacity or index >= self._count:
+            raise IndexError("history entry no longer retained")
+        code = self._buffer[index % self.capacity]
+        return self.symbols[code] if self.symbols is not None else code
+
+    def __getitem__(self, key: Union[int, slice]) -> Any:
+        if isinstance(key, slice):
+            return [self._get(i) for i in range(*key.indices(self._count))]
+        # _get inlined: the strategies read a few entries every round
+        count = self._count
+        if key < 0:
+            key += count
+            if key < 0:
+                raise IndexError("history index out of range")
+        if key < count - self.capacity or key >= count:
+            raise IndexError("history entry no longer retained")
+        code = self._buffer[key % self.capacity]
+        return code if self.symbols is None else self.symbols[code]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[Any]:
+        start = max(0, self._count - self.capacity)
+        return (self._get(i) for i in range(start, self._count))
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, tuple, MoveHistory)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"MoveHistory({list(self)!r}, total={self._count})"
+
+    def clear(self) -> None:
+        self._count = 0
+
+    def copy(self) -> 'MoveHistory':
+        clone = object.__new__(MoveHistory)
+        clone.capacity, clone.symbols, clone._codes = self.capacity, self.symbols, self._codes
+        clone._buffer = array('b', self._buffer)
+        clone._count = self._count
+        return clone
+
+    def codes(self) -> bytes:
+        """Return the retained entries as raw codes, oldest first."""
+        if self._count <= self.capacity:
+            return self._buffer[:self._count].tobytes()
+        split = self._count % self.capacity
+        return (self._buffer[split:] + self._buffer[:split]).tobytes()
+
+    def restore(self, codes: bytes, count: int) -> None:
+        """Refill from ``codes()`` output given the lifetime entry count."""
+        retained = array('b', codes)
+        self._count = count
+        if count <= self.capacity:
+            self._buffer[:len(retained)] = retained
+        else:
+            split = count % self.capacity
+            self._buffer[split:] = retained[:self.capacity - split]
+            self._buffer[:split] = retained[self.capacity - split:]
+
+
+class ContextTrie:
+    """
+    Variable-order model of a move sequence, in the style of PPM: a trie
+    of the contexts (most recent move first) seen so far, each node
+    counting the moves that followed its context.
+
+    Nodes live in two flat arrays, three slots per node: ``children``
+    holds the node reached by extending the context one move further
+    back (-1 when absent) and ``counts`` the follow-up counts. The root,
+    node 0, is the empty context. Moves are the 2-bit codes 0-2 and the
+    current context is kept packed into one int, most recent move in the
+    lowest bits, so both update and predict walk at most ``depth`` nodes.
+
+    Once ``max_nodes`` exist no new contexts are added, and a node's
+    counts are halved when one reaches ``count_limit`` so that stale
+    follow-ups fade out.
+    """
+
+    __slots__ = ('depth', 'max_nodes', 'count_limit', 'children', 'counts', 'context', 'length')
+
+    _HEADER = struct.Struct('<IQB')   # nodes in use, context, context length
+
+    def __init__(self, depth: int, max_nodes: int, count_limit: int) -> None:
+        if not 1 <= depth <= 32:
+            raise ValueError("Context depth must be between 1 and 32")
+        if max_nodes < 1 or not 1 < count_limit <= 0xFFFF:
+            raise ValueError("Context trie needs a node budget and a count limit below 65536")
+        self.depth = depth
+        self.max_nodes = max_nodes
+        self.count_limit = count_limit
+        self.children = array('i', [-1, -1, -1])
+        self.counts = array('H', [0, 0, 0])
+        self.context = 0
+        self.length = 0
+
+    def __len__(self) -> int:
+        """Number of nodes in use."""
+        return len(self.counts) // 3
+
+    def clear(self) -> None:
+        """Forget every context, keeping the arrays."""
+        del self.children[3:]
+        del self.counts[3:]
+        self.children[:] = array('i', [-1, -1, -1])
+        self.counts[:] = array('H', [0, 0, 0])
+        self.context = 0
+        self.length = 0
+
+    def update(self, code: int) -> None:
+        """Count ``code`` after every suffix of the current context, then append it."""
+        children, counts = self.children, self.counts
+        node = 0
+        context = self.context
+        for k in range(self.length + 1):
+            slot = 3 * node + code
+            counts[slot] += 1
+            if counts[slot] >= self.count_limit:
+                base = 3 * node
+                counts[base] //= 2
+                counts[base + 1] //= 2
+                counts[base + 2] //= 2
+            if k == self.length:
+                break
+            edge = 3 * node + (context & 3)
+            context >>= 2
+            child = children[edge]
+            if child < 0:
+                if len(self) >= self.max_nodes:
+                    break
+                child = children[edge] = len(self)
+                children.extend((-1, -1, -1))
+                counts.extend((0, 0, 0))
+            node = child
+
+        self.context = (self.context << 2 | code) & ((1 << 2 * self.depth) - 1)
+        if self.length < self.depth:
+            self.length += 1
+
+    def predict(self) -> int:
+        """
+        Most frequent follow-up of the longest known context that has
+        one (first maximum on a tie), or -1 before anything was counted.
+        """
+        children, counts = self.children, self.counts
+        best = -1
+        node = 0
+        context = self.context
+        for _ in range(self.length + 1):
+            base = 3 * node
+            c0, c1, c2 = counts[base], counts[base + 1], counts[base + 2]
+            if c0 or c1 or c2:
+                if c0 >= c1 and c0 >= c2:
+                    best = 0
+                else:
+                    best = 1 if c1 >= c2 else 2
+            node = children[base + (context & 3)]
+            context >>= 2
+            if node < 0:
+                break
+        return best
+
+    def copy(self) -> 'ContextTrie':
+        clone = object.__new__(ContextTrie)
+        clone.depth, clone.max_nodes, clone.count_limit = self.depth, self.max_nodes, self.count_limit
+        clone.children = array('i', self.children)
+        clone.counts = array('H', self.counts)
+        clone.context, clone.length = self.context, self.length
+        return clone
+
+    def to_bytes(self) -> bytes:
+        """Node count, packed context and the node arrays."""
+        slots = len(self.counts)
+        return b''.join((
+            self._HEADER.pack(len(self), self.context, self.length),
+            struct.pack(f'<{slots}i', *self.children),
+            struct.pack(f'<{slots}H', *self.counts),
+        ))
+
+    def restore(self, data: bytes, offset: int) -> int:
+        """Refill from ``to_bytes()`` output at ``offset``; returns the offset after it."""
+        nodes, context, length = self._HEADER.unpack_from(data, offset)
+        if nodes < 1 or nodes > self.max_nodes or length > self.depth:
+            raise ValueError("Context trie does not match CONTEXT_DEPTH and CONTEXT_NODES")
+        offset += self._HEADER.size
+        slots = 3 * nodes
+        self.children = array('i', struct.unpack_from(f'<{slots}i', data, offset))
+        offset += 4 * slots
+        self.counts = array('H', struct.unpack_from(f'<{slots}H', data, offset))
+        offset += 2 * slots
+        self.context, self.length = context, length
+        return offset
+
+# Maps random bytes to move codes; byte 255 is dropped so 0-254 split evenly
+_BYTE_TO_CODE = bytes(b % 3 for b in range(256))
+
+
+class MoveRandom:
+    """
+    A bot's own random source: a ``random.Random`` plus a batch of
+    pre-drawn move codes, so a random fallback costs an index into a
+    bytes object instead of a ``random.choice`` call.
+
+    Seeding it makes a bot's play reproducible, and bots never share a
+    generator, whichever thread they run on.
+    """
+
+    __slots__ = ('_seed', 'rng', '_codes', '_next')
+
+    BATCH = 64                       # Random bytes drawn per refill
+
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self.seed(seed)
+
+    def seed(self, seed: Optional[int] = None) -> None:
+        """Restart the sequence from ``seed`` (fresh entropy when None)."""
+        self._seed = seed
+        # Created on the first draw: seeding costs more than a whole round
+        self.rng = None
+        self._codes = b''
+        self._next = 0
+
+    def _generator(self) -> random.Random:
+        if self.rng is None:
+            self.rng = random.Random(self._seed)
+        return self.rng
+
+    def random(self) -> float:
+        return (self.rng or self._generator()).random()
+
+    def move_code(self) -> int:
+        """A uniformly random move code, 0-2."""
+        if self._next >= len(self._codes):
+            rng = self._generator()
+            codes = b''
+            while not codes:
+                codes = rng.randbytes(self.BATCH).translate(_BYTE_TO_CODE, b'\xff')
+            self._codes = codes
+            self._next = 0
+        code = self._codes[self._next]
+        self._next += 1
+        return code
+
+    def copy(self) -> 'MoveRandom':
+        clone = object.__new__(MoveRandom)
+        clone._seed, clone._codes, clone._next = self._seed, self._codes, self._next
+        clone.rng = None
+        if self.rng is not None:
+            clone.rng = random.Random()
+            clone.rng.setstate(self.rng.getstate())
+        return clone
+
+
+class Strategy(NamedTuple):
+    """
+    Registry entry for one RPSMain predictor, implemented by the bot's
+    ``_<name>_prediction`` method, which returns a move code.
+
+    ``weights`` is its vote weight in each game phase. ``depth`` gives
+    the rounds of history it reads, as a function of the bot class since
+    it follows the class's tuning.
+
+    A strategy with a model of its own names the bot attributes holding
+    it in ``state`` and maintains them through hooks, each taking the
+    bot first: ``create`` sets them up on a new bot, ``update`` advances
+    them by a recorded round (my move code, opponent move code),
+    ``reset`` clears them in place for a new game (``create`` when
+    omitted), ``dump`` serializes them and ``load`` restores them from
+    ``dump`` output, or from the histories when given None (a blob of a
+    bot without the strategy, or no ``dump`` at all). A bot only keeps
+    the state of its enabled strategies; the attributes of the others
+    are None. A subclass registering a stateful strategy lists its
+    ``state`` in ``__slots__``.
+    """
+    name: str
+    weights: Dict[str, float]
+    depth: Callable[[type], int]
+    state: Tuple[str, ...] = ()
+    create: Optional[Callable[['RPSMain'], None]] = None
+    update: Optional[Callable[['RPSMain', int, int], None]] = None
+    reset: Optional[Callable[['RPSMain'], None]] = None
+    dump: Optional[Callable[['RPSMain'], bytes]] = None
+    load: Optional[Callable[['RPSMain', Optional[bytes]], None]] = None
+
+    @property
+    def incremental(self) -> bool:
+        """Whether every recorded round advances the strategy's model."""
+        return self.update is not None
+
+
+_PROFILE_CLASSES: Dict[Tuple[type, Tuple[str, ...]], type] = {}
+
+
+def phase_weights(strategies: Sequence[Strategy], names: Sequence[str]) -> Dict[str, Dict[str, float]]:
+    """PHASE_WEIGHTS enabling the registered ``strategies`` named in ``names``."""
+    unknown = set(names) - {strategy.name for strategy in strategies}
+    if unknown:
+        raise ValueError(f"Unknown strategies: {sorted(unknown)}")
+    return {
+        phase: {strategy.name: strategy.weights[phase] for strategy in strategies if strategy.name in names}
+        for phase in ('early', 'mid', 'late')
+    }
+
+
+# Mutable attribute types _copy copies, one level deep
+_COPIED = (list, dict, MoveHistory, ContextTrie, MoveRandom)
+
+class _StrategySetup(NamedTuple):
+    """The enabled strategies of a bot class and their hooks, shared by its bots."""
+    names: Tuple[str, ...]
+    enabled: Tuple[Strategy, ...]
+    predictors: Tuple[Tuple[str, str], ...]          # (name, predictor method name)
+    updaters: Tuple[Callable[..., None], ...]
+    unused_state: Tuple[str, ...]                    # state of the disabled strategies
+
+
+# Per-configuration values every bot of a class shares instead of holding
+# its own copy: (class, enabled strategies) -> their setup, and pattern
+# orders -> offsets of each order's contexts
+_STRATEGY_SETUPS: Dict[Tuple[type, Tuple[str, ...]], _StrategySetup] = {}
+_PATTERN_OFFSETS: Dict[Tuple[int, ...], Dict[int, int]] = {}
+_SLOT_NAMES: Dict[type, Tuple[str, ...]] = {}
+
+
+def _strategy_setup(cls: type) -> _StrategySetup:
+    names = cls.enabled_strategies()
+    key = (cls, names)
+    if key not in _STRATEGY_SETUPS:
+        enabled = tuple(strategy for strategy in cls.STRATEGIES if strategy.name in names)
+        _STRATEGY_SETUPS[key] = _StrategySetup(
+            names, enabled,
+            tuple((strategy.name, f'_{strategy.name}_prediction') for strategy in enabled),
+            tuple(strategy.update for strategy in enabled if strategy.update is not None),
+            tuple(attribute for strategy in cls.STRATEGIES if strategy.name not in names
+                  for attribute in strategy.state),
+        )
+    return _STRATEGY_SETUPS[key]
+
+
+def _pattern_offsets(orders: Tuple[int, ...]) -> Dict[int, int]:
+    """Read-only: shared by every bot with these PATTERN_ORDERS."""
+    if orders not in _PATTERN_OFFSETS:
+        offsets = {}
+        contexts = 0
+        for order in orders:
+            offsets[order] = contexts
+            contexts += 3 ** order
+        _PATTERN_OFFSETS[orders] = offsets
+    return _PATTERN_OFFSETS[orders]
+
+
+def _slot_names(cls: type) -> Tuple[str, ...]:
+    if cls not in _SLOT_NAMES:
+        _SLOT_NAMES[cls] = tuple(name for klass in reversed(cls.__mro__)
+                                 for name in klass.__dict__.get('__slots__', ())
+                                 if name not in ('__dict__', '__weakref__'))
+    return _SLOT_NAMES[cls]
+
+
+# Models of the built-in strategies, as their Strategy hooks
+
+def _markov_create(bot: 'RPSMain') -> None:
+    # 3x3 transition matrix as nine row-major floats. Plain floats beat
+    # NumPy dispatch at this size.
+    bot.transition_matrix = array('d', [1 / 3]) * 9
+
+
+def _markov_reset(bot: 'RPSMain') -> None:
+    bot.transition_matrix[:] = array('d', [1 / 3]) * 9
+
+
+def _markov_update(bot: 'RPSMain', my_code: int, opponent_code: int) -> None:
+    if len(bot.opponent_history) > 1:
+        bot._update_markov(bot.opponent_history[-2], opponent_code)
+
+
+def _markov_load(bot: 'RPSMain', data: Optional[bytes]) -> None:
+    if data is not None:
+        bot.transition_matrix = array('d', bot._MATRIX.unpack(data))
+
+
+def _frequency_create(bot: 'RPSMain') -> None:
+    # Recent-window aggregates: for each move, a bitmask of the rounds
+    # (bit k = k rounds ago) in which the opponent played it and its
+    # decayed score (the sum of FREQUENCY_DECAY ** k over those rounds)
+    bot.recent_masks = [0, 0, 0]
+    bot.recent_scores = [0.0, 0.0, 0.0]
+
+
+def _frequency_reset(bot: 'RPSMain') -> None:
+    bot.recent_masks[:] = (0, 0, 0)
+    bot.recent_scores[:] = (0.0, 0.0, 0.0)
+
+
+def _frequency_update(bot: 'RPSMain', my_code: int, opponent_code: int) -> None:
+    """Shift the recent window by the round just recorded."""
+    window = bot.RECENT_WINDOW
+    window_mask = (1 << window) - 1
+    masks = bot.recent_masks
+    scores = bot.recent_scores
+    decay = bot.FREQUENCY_DECAY
+    expired = -1
+    for i in range(3):
+        mask = masks[i] << 1
+        if mask >> window:
+            expired = i
+        masks[i] = mask & window_mask
+        scores[i] *= decay
+    masks[opponent_code] |= 1
+    scores[opponent_code] += 1.0
+    # The round leaving the window takes its (fully decayed) term along
+    if expired >= 0:
+        if masks[expired]:
+            scores[expired] -= decay ** window
+        else:
+            scores[expired] = 0.0
+
+
+def _frequency_load(bot: 'RPSMain', data: Optional[bytes]) -> None:
+    """Recompute the recent window from the opponent history."""
+    _frequency_reset(bot)
+    rounds = min(len(bot.opponent_history), bot.RECENT_WINDOW)
+    # Oldest first, as _frequency_update accumulates them
+    for age in range(rounds - 1, -1, -1):
+        code = bot.opponent_history[-1 - age]
+        bot.recent_masks[code] |= 1 << age
+        bot.recent_scores[code] += bot.FREQUENCY_DECAY ** age
+
+
+def _psychology_create(bot: 'RPSMain') -> None:
+    # Streak counters, advanced by _update_psychology_counters
+    bot.opponent_repeats = 0
+    bot.opponent_losses = 0
+
+
+def _psychology_dump(bot: 'RPSMain') -> bytes:
+    return bot._STREAKS.pack(bot.opponent_repeats, bot.opponent_losses)
+
+
+def _psychology_load(bot: 'RPSMain', data: Optional[bytes]) -> None:
+    if data is not None:
+        bot.opponent_repeats, bot.opponent_losses = bot._STREAKS.unpack(data)
+
+
+def _pattern_create(bot: 'RPSMain') -> None:
+    # A fixed index with three slots per context of every order in
+    # PATTERN_ORDERS. Each slot holds a follow-up move code (in the order
+    # first seen, -1 when unused) and how often it followed.
+    bot._pattern_offsets = _pattern_offsets(bot.PATTERN_ORDERS)
+    contexts = sum(3 ** order for order in bot._pattern_offsets)
+    bot.pattern_follows = array('b', [-1]) * (3 * contexts)
+    bot.pattern_counts = array('I', [0]) * (3 * contexts)
+
+
+def _pattern_reset(bot: 'RPSMain') -> None:
+    bot.pattern_follows[:] = array('b', [-1]) * len(bot.pattern_follows)
+    bot.pattern_counts[:] = array('I', [0]) * len(bot.pattern_counts)
+
+
+def _pattern_update(bot: 'RPSMain', my_code: int, opponent_code: int) -> None:
+    for order in bot._pattern_offsets:
+        if len(bot.opponent_history) <= order:
+            break
+        bot._record_follow(bot._pattern_base(order, 1), opponent_code)
+
+
+def _pattern_dump(bot: 'RPSMain') -> bytes:
+    slots = len(bot.pattern_counts)
+    return bot.pattern_follows.tobytes() + struct.pack(f'<{slots}I', *bot.pattern_counts)
+
+
+def _pattern_load(bot: 'RPSMain', data: Optional[bytes]) -> None:
+    if data is None:
+        return
+    slots = len(bot.pattern_counts)
+    if len(data) != 5 * slots:
+        raise ValueError("Pattern table does not match PATTERN_ORDERS")
+    bot.pattern_follows = array('b', data[:slots])
+    bot.pattern_counts = array('I', struct.unpack_from(f'<{slots}I', data, slots))
+
+
+def _reaction_create(bot: 'RPSMain') -> None:
+    # Bitmask of the recent rounds where the opponent beat our previous move
+    bot.reaction_hits = 0
+
+
+def _reaction_update(bot: 'RPSMain', my_code: int, opponent_code: int) -> None:
+    if len(bot.my_history) >= 2:
+        hit = opponent_code == (bot.my_history[-2] + 1) % 3
+        bot.reaction_hits = ((bot.reaction_hits << 1) | hit) & ((1 << bot.RECENT_WINDOW) - 1)
+
+
+def _reaction_load(bot: 'RPSMain', data: Optional[bytes]) -> None:
+    """Recompute the reaction hits from the histories."""
+    hits = 0
+    for age in range(min(len(bot.opponent_history) - 1, bot.RECENT_WINDOW)):
+        if bot.opponent_history[-1 - age] == (bot.my_history[-2 - age] + 1) % 3:
+            hits |= 1 << age
+    bot.reaction_hits = hits
+
+
+def _context_create(bot: 'RPSMain') -> None:
+    bot.context_model = ContextTrie(bot.CONTEXT_DEPTH, bot.CONTEXT_NODES, bot.CONTEXT_COUNT_LIMIT)
+
+
+def _context_load(bot: 'RPSMain', data: Optional[bytes]) -> None:
+    if data is not None:
+        bot.context_model.restore(data, 0)
+        return
+    # No trie stored: train it on the retained opponent history
+    for code in bot.opponent_history:
+        bot.context_model.update(code)
 
 
 class RPSMain:
@@ -10,13 +631,49 @@ class RPSMain:
     strategies and learns which ones work best against a given opponent.
     """
 
-    # Strategy weight profiles by game phase (moves played)
-    PHASE_WEIGHTS = {
-        'early':  {'markov': 0.12, 'frequency': 0.22, 'psychology': 0.38, 'pattern': 0.13, 'reaction': 0.15},
-        'mid':    {'markov': 0.25, 'frequency': 0.25, 'psychology': 0.25, 'pattern': 0.10, 'reaction': 0.15},
-        'late':   {'markov': 0.25, 'frequency': 0.15, 'psychology': 0.15, 'pattern': 0.25, 'reaction': 0.20},
+    # Strategy registry, in evaluation (and serialization) order. A strategy
+    # is enabled when PHASE_WEIGHTS weights it; disabled ones are neither
+    # evaluated nor keep state.
+    STRATEGIES = (
+        Strategy('markov', {'early': 0.12, 'mid': 0.25, 'late': 0.25},
+                 lambda cls: 2,
+                 state=('transition_matrix',), create=_markov_create, update=_markov_update,
+                 reset=_markov_reset, dump=lambda bot: bot._MATRIX.pack(*bot.transition_matrix),
+                 load=_markov_load),
+        Strategy('frequency', {'early': 0.22, 'mid': 0.25, 'late': 0.15},
+                 lambda cls: cls.RECENT_WINDOW,
+                 state=('recent_masks', 'recent_scores'), create=_frequency_create,
+                 update=_frequency_update, reset=_frequency_reset, load=_frequency_load),
+        Strategy('psychology', {'early': 0.38, 'mid': 0.25, 'late': 0.15},
+                 lambda cls: 2,
+                 state=('opponent_repeats', 'opponent_losses'), create=_psychology_create,
+                 dump=_psychology_dump, load=_psychology_load),
+        Strategy('pattern', {'early': 0.13, 'mid': 0.10, 'late': 0.25},
+                 lambda cls: max(cls.PATTERN_ORDERS) + 1,
+                 state=('_pattern_offsets', 'pattern_follows', 'pattern_counts'), create=_pattern_create,
+                 update=_pattern_update, reset=_pattern_reset, dump=_pattern_dump, load=_pattern_load),
+        Strategy('reaction', {'early': 0.15, 'mid': 0.15, 'late': 0.20},
+                 lambda cls: cls.RECENT_WINDOW + 1,
+                 state=('reaction_hits',), create=_reaction_create, update=_reaction_update,
+                 load=_reaction_load),
+        Strategy('context', {'early': 0.10, 'mid': 0.30, 'late': 0.40},
+                 lambda cls: 1,
+                 state=('context_model',), create=_context_create,
+                 update=lambda bot, my_code, opponent_code: bot.context_model.update(opponent_code),
+                 reset=lambda bot: bot.context_model.clear(), dump=lambda bot: bot.context_model.to_bytes(),
+                 load=_context_load),
+    )
+
+    # Named strategy sets (see profile): the cheaper one is served, the
+    # richer one adds the context trie for offline play and tuning
+    PROFILES = {
+        'production': ('markov', 'frequency', 'psychology', 'pattern', 'reaction'),
+        'rich': ('markov', 'frequency', 'psychology', 'pattern', 'reaction', 'context'),
     }
 
+    # Strategy weight profiles by game phase (moves played)
+    PHASE_WEIGHTS = phase_weights(STRATEGIES, PROFILES['production'])
+
     PHASE_THRESHOLDS = {
         'early': 2,
         'mid': 5,
@@ -29,58 +686,177 @@ class RPSMain:
     CONFIDENCE_PER_MOVE = 0.15       # Confidence increase per move played
     MAX_CONFIDENCE = 0.90            # Confidence ceiling
     MIN_STRATEGY_ATTEMPTS = 3        # Minimum tries before adjusting strategy weights
+    LAZY_VOTING = False              # Stop evaluating strategies once the vote is decided
+    EARLY_TABLE = False              # Answer the first PHASE_THRESHOLDS['mid'] rounds from early_table.bin
     RECENT_WINDOW = 10               # Moves considered for frequency analysis
-    MAX_PATTERN_MEMORY = 50          # Total distinct patterns to keep
-    TOP_PATTERNS_TO_KEEP = 10        # Patterns to retain when pruning
+    FREQUENCY_DECAY = 0.85           # Per-move weight decay in frequency analysis
+    PATTERN_ORDERS = (2, 3)          # Context lengths for pattern matching, checked in order
+    PATTERN_COUNT_LIMIT = 0          # Halve a context's counts when one reaches this (0 = never)
+    # Variable-order context model ('context' strategy)
+    CONTEXT_DEPTH = 8                # Longest context, in opponent moves
+    CONTEXT_NODES = 4096             # Trie node budget; no new contexts once reached
+    CONTEXT_COUNT_LIMIT = 255        # Halve a node's counts when one reaches this
     WIN_RESULT = 1
     TIE_RESULT = 0
     LOSS_RESULT = -1
 
-    def __init__(self) -> None:
-        self.moves = ['rock', 'paper', 'scissors']
-        self.move_idx = {'rock': 0, 'paper': 1, 'scissors': 2}
-        self.beats = {'rock': 'scissors', 'paper': 'rock', 'scissors': 'paper'}
-        self.loses_to = {'rock': 'paper', 'paper': 'scissors', 'scissors': 'rock'}
+    # Inside the bot moves are the codes 0/1/2 = rock/paper/scissors, so
+    # (code + 1) % 3 beats code; move names only appear in the public API.
+    # _RESULTS[3 * mine + theirs] is the result of playing mine.
+    _RESULTS = (TIE_RESULT, LOSS_RESULT, WIN_RESULT,
+                WIN_RESULT, TIE_RESULT, LOSS_RESULT,
+                LOSS_RESULT, WIN_RESULT, TIE_RESULT)
 
-        # Game history
-        self.opponent_history: List[str] = []
-        self.my_history: List[str] = []
-        self.results_history: List[int] = []
+    # Move names and their relations, shared by every bot
+    moves = ('rock', 'paper', 'scissors')
+    move_idx = {'rock': 0, 'paper': 1, 'scissors': 2}
+    beats = {'rock': 'scissors', 'paper': 'rock', 'scissors': 'paper'}
+    loses_to = {'rock': 'paper', 'paper': 'scissors', 'scissors': 'rock'}
 
-        # Markov model
-        self.transition_matrix = np.ones((3, 3)) / 3
+    # Binary state layout (see to_bytes)
+    STATE_VERSION = 4
+    STATE_MAGIC = b'RPS'
+    STRATEGY_ORDER = tuple(strategy.name for strategy in STRATEGIES)
+    # magic, version, history capacity (0 = unbounded), enabled strategies
+    # (bit i = STRATEGY_ORDER[i]), last strategy (-1 = none), exploration
+    # rate, adapt speed, confidence
+    _HEADER = struct.Struct('<3sBIIb3d')
+    _COUNTERS = struct.Struct(f'<3I{2 * len(STRATEGY_ORDER)}I')   # frequency table, attempts/successes
+    _HISTORY = struct.Struct('<II')              # lifetime count, stored entries
+    _SECTION = struct.Struct('<BI')              # strategy (STRATEGY_ORDER index), state size
+    _MATRIX = struct.Struct('<9d')               # markov state
+    _STREAKS = struct.Struct('<II')              # psychology state: repeats, losses
 
-        # Pattern memory: maps tuple of previous moves -> list of following moves
-        self.last_n_transitions: Dict[Tuple[str, ...], List[str]] = defaultdict(list)
+    # Hundreds of bots live in one worker: no per-instance __dict__
+    __slots__ = (
+        'rng', 'history_size', 'strategies', '_predictors', '_updaters',
+        'opponent_history', 'my_history', 'results_history', 'frequency_table',
+        'exploration_rate', 'adapt_speed', 'lazy_voting', 'early_table', 'confidence',
+        'strategy_successes', 'strategy_attempts', 'last_strategy_used',
+        'player_wins', 'player_losses', 'player_ties',
+    ) + tuple(attribute for strategy in STRATEGIES for attribute in strategy.state)
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        # A subclass registering its own strategies serializes their counters
+        # too, and plays the ones it adds with their registered weights
+        # unless it sets PHASE_WEIGHTS itself
+        if 'STRATEGIES' in cls.__dict__:
+            inherited = cls.STRATEGY_ORDER
+            cls.STRATEGY_ORDER = tuple(strategy.name for strategy in cls.STRATEGIES)
+            cls._COUNTERS = struct.Struct(f'<3I{2 * len(cls.STRATEGY_ORDER)}I')
+            if 'PHASE_WEIGHTS' not in cls.__dict__:
+                added = [strategy for strategy in cls.STRATEGIES if strategy.name not in inherited]
+                cls.PHASE_WEIGHTS = {
+                    phase: dict(weights, **{strategy.name: strategy.weights[phase] for strategy in added})
+                    for phase, weights in cls.PHASE_WEIGHTS.items()
+                }
+
+    @classmethod
+    def with_strategies(cls, *names: str) -> type:
+        """
+        Subclass of ``cls`` playing only the strategies in ``names``, with
+        their registered weights. Asking again for the same set returns the
+        same class, so its lookup tables are only built once.
+        """
+        weights = phase_weights(cls.STRATEGIES, names)
+        if weights == cls.PHASE_WEIGHTS:
+            return cls
+        key = (cls, tuple(weights['early']))
+        if key not in _PROFILE_CLASSES:
+            name = f"{cls.__name__}[{'+'.join(key[1])}]"
+            _PROFILE_CLASSES[key] = type(name, (cls,), {'__slots__': (), 'PHASE_WEIGHTS': weights})
+        return _PROFILE_CLASSES[key]
 
-        # Frequency tracking
-        self.frequency_table = Counter()
-        self.opponent_repeats = 0
-        self.opponent_losses = 0
+    @classmethod
+    def profile(cls, name: str) -> type:
+        """The class playing one of PROFILES, e.g. ``RPSMain.profile('rich')``."""
+        if name not in cls.PROFILES:
+            raise ValueError(f"Unknown strategy profile {name!r}")
+        return cls.with_strategies(*cls.PROFILES[name])
+
+    @classmethod
+    def enabled_strategies(cls) -> Tuple[str, ...]:
+        """Names of the strategies PHASE_WEIGHTS enables, in STRATEGY_ORDER."""
+        enabled = [set(weights) for weights in cls.PHASE_WEIGHTS.values()]
+        if any(names != enabled[0] for names in enabled):
+            raise ValueError("Every phase must weight the same strategies")
+        unknown = enabled[0] - set(cls.STRATEGY_ORDER)
+        if unknown:
+            raise ValueError(f"Unknown strategies in PHASE_WEIGHTS: {sorted(unknown)}")
+        return tuple(name for name in cls.STRATEGY_ORDER if name in enabled[0])
+
+    @classmethod
+    def history_depth(cls) -> int:
+        """Rounds of history the enabled strategies read; the smallest usable history_size."""
+        enabled = cls.enabled_strategies()
+        return max([1] + [s.depth(cls) for s in cls.STRATEGIES if s.name in enabled])
+
+    def __init__(self, history_size: Optional[int] = None, seed: Optional[int] = None) -> None:
+        """
+        ``history_size`` enables compact history mode: instead of growing
+        lists, the histories become MoveHistory ring buffers holding only
+        the last ``history_size`` rounds, so memory stays constant however
+        long the session runs.
+
+        ``seed`` seeds the bot's own generator (see MoveRandom); the same
+        seed and opponent moves replay the same game.
+        """
+        self.rng = MoveRandom(seed)
+        self.history_size = history_size
+        setup = _strategy_setup(type(self))
+        self.strategies, self._predictors, self._updaters = setup.names, setup.predictors, setup.updaters
+
+        # Game history, as move codes
+        self.opponent_history: Union[List[int], MoveHistory]
+        self.my_history: Union[List[int], MoveHistory]
+        self.results_history: Union[List[int], MoveHistory]
+        if history_size is None:
+            self.opponent_history = []
+            self.my_history = []
+            self.results_history = []
+        else:
+            if history_size < self.history_depth():
+                raise ValueError("history_size is shorter than the enabled strategies look back")
+            self.opponent_history = MoveHistory(history_size)
+            self.my_history = MoveHistory(history_size)
+            self.results_history = MoveHistory(history_size)
+
+        # The strategies' models (see STRATEGIES)
+        for strategy in setup.enabled:
+            if strategy.create is not None:
+                strategy.create(self)
+        for attribute in setup.unused_state:
+            setattr(self, attribute, None)
+
+        # Frequency tracking: how often the opponent played each move code
+        self.frequency_table = [0, 0, 0]
         self.exploration_rate = self.EXPLORATION_RATE
         self.adapt_speed = self.ADAPTATION_SPEED
+        self.lazy_voting = self.LAZY_VOTING
+        # The early-game table is built for exactly the _EARLY_STRATEGIES
+        self.early_table = self.EARLY_TABLE and self.strategies == _EARLY_STRATEGIES
         self.confidence = 0.0
 
         # Strategy performance tracking
-        self.strategy_successes = {
-            'markov': 0,
-            'frequency': 0,
-            'psychology': 0,
-            'pattern': 0,
-            'reaction': 0,
-        }
-        self.strategy_attempts = {
-            'markov': 0,
-            'frequency': 0,
-            'psychology': 0,
-            'pattern': 0,
-            'reaction': 0,
-        }
+        self.strategy_successes = dict.fromkeys(self.strategies, 0)
+        self.strategy_attempts = dict.fromkeys(self.strategies, 0)
         self.last_strategy_used: Optional[str] = None
 
+        # The opponent's score, from their side (unlike WIN_RESULT and
+        # results_history), kept by whoever runs the game (see app.py);
+        # not part of to_bytes
+        self.player_wins = 0
+        self.player_losses = 0
+        self.player_ties = 0
+
     def get_move(self) -> str:
+        """Select the bot's next move (see get_move_code)."""
+        return self.moves[self.get_move_code()]
+
+    def get_move_code(self) -> int:
         """
-        Select the bot's next move.
+        Select the bot's next move as a move code.
 
         With probability ``exploration_rate`` returns a random move to
         avoid being exploited. Otherwise predicts the opponent's next
@@ -93,28 +869,99 @@ class RPSMain:
         )
 
         if not self.opponent_history:
-            return random.choice(self.moves)
+            return self._random_move()
 
-        if random.random() < self.exploration_rate:
-            return random.choice(self.moves)
+        if self.rng.random() < self.exploration_rate:
+            return self._random_move()
 
-        predicted_move = self._make_prediction()
-        counter_move = self.loses_to[predicted_move]
-        return counter_move
+        return (self._make_prediction() + 1) % 3
 
-    def _make_prediction(self) -> str:
+    def _make_prediction(self) -> int:
         """
         Combine all strategies into a weighted vote and return the
         predicted opponent move.
         """
-        predictions = {
-            'markov': self._markov_prediction(),
-            'frequency': self._frequency_prediction(),
-            'psychology': self._psychology_prediction(),
-            'pattern': self._pattern_prediction(),
-            'reaction': self._reaction_prediction(),
-        }
+        moves_played = len(self.opponent_history)
+        # The table assumes the class settings and unadjusted phase weights;
+        # it has no entry for an empty history, where every strategy guesses
+        if self.early_table and 0 < moves_played <= self.PHASE_THRESHOLDS['mid'] \
+                and not self.lazy_voting and self.adapt_speed == self.ADAPTATION_SPEED \
+                and max(self.strategy_attempts.values()) <= self.MIN_STRATEGY_ATTEMPTS \
+                and _early_table(type(self)) is not None:
+            return self._early_prediction(moves_played)
+
+        weights = self._strategy_weights()
+        if self.lazy_voting:
+            return self._lazy_vote(weights)
+
+        predictions = {name: getattr(self, method)() for name, method in self._predictors}
+        return self._tally(predictions, weights)
+
+    def _early_prediction(self, moves_played: int) -> int:
+        """
+        _make_prediction for the early game, read from _early_table. Gives
+        the same move, credited strategy and random draws as a full vote.
+        """
+        predictions, outcomes, votes = _early_table(type(self))
+        key = 0
+        for my_code, opponent_code in zip(self.my_history, self.opponent_history):
+            key = key * 9 + 3 * my_code + opponent_code
+        index = (9 ** moves_played - 1) // 8 + key
+
+        streak = self._update_psychology_counters()
+        decision = outcomes[4 * index + (3 if streak is None else streak)]
+        if decision == _NO_OUTCOME:
+            # Some strategy falls back to a random move: draw in the usual
+            # order, then look the vote up
+            packed = predictions[index]
+            code = 0
+            for i in range(5):
+                digit = packed >> 2 * i & 3
+                if i == 2 and streak is not None:  # psychology
+                    digit = streak
+                elif digit == 3:
+                    digit = self._random_move()
+                code = code * 3 + digit
+            decision = votes[243 * moves_played + code]
+
+        self.last_strategy_used = self.STRATEGY_ORDER[decision >> 2]
+        return decision & 3
+
+    def _random_move(self) -> int:
+        return self.rng.move_code()
 
+    def seed(self, seed: Optional[int] = None) -> None:
+        """Reseed the bot's generator, e.g. after from_bytes, which does not keep it."""
+        self.rng.seed(seed)
+
+    def reset(self, seed: Optional[int] = None) -> None:
+        """
+        Start a new game in place. The bot then plays exactly like
+        ``type(self)(history_size, seed)``, but keeps its containers, so
+        a pooled bot can serve another game without reallocating.
+        """
+        self.rng.seed(seed)
+        self.opponent_history.clear()
+        self.my_history.clear()
+        self.results_history.clear()
+        for strategy in _strategy_setup(type(self)).enabled:
+            reset = strategy.reset or strategy.create
+            if reset is not None:
+                reset(self)
+        self.frequency_table[:] = (0, 0, 0)
+        self.exploration_rate = self.EXPLORATION_RATE
+        self.adapt_speed = self.ADAPTATION_SPEED
+        self.lazy_voting = self.LAZY_VOTING
+        self.early_table = self.EARLY_TABLE and self.strategies == _EARLY_STRATEGIES
+        self.confidence = 0.0
+        for name in self.strategy_successes:
+            self.strategy_successes[name] = 0
+            self.strategy_attempts[name] = 0
+        self.last_strategy_used = None
+        self.player_wins = self.player_losses = self.player_ties = 0
+
+    def _strategy_weights(self) -> Dict[str, float]:
+        """Phase weights adjusted by strategy performance, normalized to 1."""
         moves_played = len(self.opponent_history)
         if moves_played <= self.PHASE_THRESHOLDS['early']:
             weights = dict(self.PHASE_WEIGHTS['early'])
@@ -133,9 +980,15 @@ class RPSMain:
         total_weight = sum(weights.values())
         if total_weight > 0:
             weights = {k: v / total_weight for k, v in weights.items()}
+        return weights
 
+    def _tally(self, predictions: Dict[str, int], weights: Dict[str, float]) -> int:
+        """
+        Weighted vote over every strategy's prediction. Records the
+        strategy credited with the winning move and returns that move.
+        """
         # Weighted vote
-        vote: Dict[str, float] = defaultdict(float)
+        vote: Dict[int, float] = defaultdict(float)
         for strat, pred in predictions.items():
             vote[pred] += weights[strat]
 
@@ -153,36 +1006,84 @@ class RPSMain:
 
         return best_prediction
 
-    def _markov_prediction(self) -> str:
+    def _lazy_vote(self, weights: Dict[str, float]) -> int:
+        """
+        Weighted vote that evaluates strategies in descending weight order
+        and stops once the leading move can no longer be overtaken by the
+        weight still unevaluated.
+
+        The winner and the credited strategy are the same as a full vote
+        would give. Skipped strategies still apply their side effects, but
+        do not draw their random fallbacks.
+        """
+        order = sorted(weights, key=weights.get, reverse=True)
+        remaining = sum(weights.values())
+        predictions: Dict[str, int] = {}
+        vote: Dict[int, float] = defaultdict(float)
+        for strat in order:
+            pred = getattr(self, f'_{strat}_prediction')()
+            predictions[strat] = pred
+            vote[pred] += weights[strat]
+            remaining -= weights[strat]
+
+            leader, runner_up = 0.0, 0.0
+            for total in vote.values():
+                if total > leader:
+                    leader, runner_up = total, leader
+                elif total > runner_up:
+                    runner_up = total
+            # Small margin so float rounding can never flip the outcome
+            if leader > runner_up + remaining + 1e-9:
+                break
+        else:
+            # Everything was evaluated: tally in the usual order so ties
+            # and rounding resolve exactly like the full vote.
+            return self._tally({s: predictions[s] for s in weights}, weights)
+
+        if 'psychology' not in predictions and 'psychology' in weights:
+            self._update_psychology_counters()
+
+        best_prediction = max(vote, key=vote.get)
+        # Evaluation order is descending weight, so the first strategy that
+        # predicted the winner is the one a full vote would credit.
+        self.last_strategy_used = next(s for s in predictions if predictions[s] == best_prediction)
+        return best_prediction
+
+    def _markov_prediction(self) -> int:
         """Predict using a first-order Markov transition matrix."""
         if not self.opponent_history:
-            return random.choice(self.moves)
+            return self._random_move()
 
-        last_move = self.opponent_history[-1]
-        last_idx = self.move_idx[last_move]
-        probs = self.transition_matrix[last_idx]
-        predicted_idx = int(np.argmax(probs))
-        return self.moves[predicted_idx]
+        base = 3 * self.opponent_history[-1]
+        matrix = self.transition_matrix
+        p0, p1, p2 = matrix[base], matrix[base + 1], matrix[base + 2]
+        # First maximum wins, like argmax
+        if p0 >= p1 and p0 >= p2:
+            return 0
+        return 1 if p1 >= p2 else 2
 
-    def _frequency_prediction(self) -> str:
+    def _frequency_prediction(self) -> int:
         """
         Predict based on the opponent's most common recent move,
         weighting more recent moves higher via exponential decay.
         """
         if not self.opponent_history:
-            return random.choice(self.moves)
+            return self._random_move()
 
-        window = self.opponent_history[-self.RECENT_WINDOW:]
-        weighted = Counter()
-        decay = 0.85
-        for i, move in enumerate(window):
-            weight = decay ** (len(window) - 1 - i)
-            weighted[move] += weight
+        best = 0
+        best_score = -1.0
+        best_age = -1
+        for code, mask in enumerate(self.recent_masks):
+            if not mask:
+                continue
+            score = self.recent_scores[code]
+            # On a tie the move seen earliest in the window wins
+            age = mask.bit_length()
+            if score > best_score or (score == best_score and age > best_age):
+                best, best_score, best_age = code, score, age
+        return best
 
-        prediction = weighted.most_common(1)[0][0]
-        return prediction
-
-    def _psychology_prediction(self) -> str:
+    def _psychology_prediction(self) -> int:
         """
         Predict based on human psychological tendencies.
 
@@ -195,29 +1096,20 @@ class RPSMain:
           switch away from moves that lost.
         """
         if not self.opponent_history:
-            return random.choice(self.moves)
-
-        last_move = self.opponent_history[-1]
+            return self._random_move()
 
-        # Tilt detection: player lost last round(s)
-        if self.results_history and self.results_history[-1] == self.WIN_RESULT:
-            self.opponent_losses += 1
-            if self.opponent_losses >= 2:
-                return last_move
-        else:
-            self.opponent_losses = 0
+        streak_prediction = self._update_psychology_counters()
+        if streak_prediction is not None:
+            return streak_prediction
+        return self._psychology_habit()
 
-        # Repeat detection: player played same move 2+ times in a row
-        if len(self.opponent_history) >= 2 and last_move == self.opponent_history[-2]:
-            self.opponent_repeats += 1
-            if self.opponent_repeats >= 2:
-                return self.loses_to[last_move]
-        else:
-            self.opponent_repeats = 0
+    def _psychology_habit(self) -> int:
+        """The psychology heuristics that depend only on the history."""
+        last_move = self.opponent_history[-1]
 
         # Bot lost last round: player may stick with what beat us
         if self.results_history and self.results_history[-1] == self.LOSS_RESULT:
-            return self.loses_to[self.my_history[-1]]
+            return (self.my_history[-1] + 1) % 3
 
         # Win-stay lose-shift: if player won, they likely repeat; if they
         # lost, they shift to what would have beaten their last move.
@@ -230,35 +1122,83 @@ class RPSMain:
                 return last_move
             elif player_result == self.LOSS_RESULT:
                 # Player lost: likely shifts to what beats their last move
-                return self.loses_to[last_move]
+                return (last_move + 1) % 3
 
         # Fallback: random
-        return random.choice(self.moves)
+        return self._random_move()
 
-    def _pattern_prediction(self) -> str:
+    def _update_psychology_counters(self) -> Optional[int]:
+        """
+        Advance the tilt and repeat streak counters used by
+        _psychology_prediction and return the streak-based prediction, if
+        one fires.
+        """
+        last_move = self.opponent_history[-1]
+
+        # Tilt detection: player lost last round(s)
+        if self.results_history and self.results_history[-1] == self.WIN_RESULT:
+            self.opponent_losses += 1
+            if self.opponent_losses >= 2:
+                return last_move
+        else:
+            self.opponent_losses = 0
+
+        # Repeat detection: player played same move 2+ times in a row
+        if len(self.opponent_history) >= 2 and last_move == self.opponent_history[-2]:
+            self.opponent_repeats += 1
+            if self.opponent_repeats >= 2:
+                return (last_move + 1) % 3
+        else:
+            self.opponent_repeats = 0
+
+        return None
+
+    def _pattern_prediction(self) -> int:
         """
         Predict based on observed patterns in the opponent's move history.
 
-        Checks the last 2-move and 3-move sequences and picks the most
-        common follow-up move.
+        Checks the last 2-move and 3-move sequences (PATTERN_ORDERS) and
+        picks the most common follow-up move, ties going to the one seen
+        first.
         """
-        if len(self.opponent_history) < 2:
-            return random.choice(self.moves)
+        for order in self.PATTERN_ORDERS:
+            if len(self.opponent_history) < order:
+                break
+            base = self._pattern_base(order, 0)
+            best_count = 0
+            best = -1
+            for slot in range(base, base + 3):
+                if self.pattern_counts[slot] > best_count:
+                    best_count = self.pattern_counts[slot]
+                    best = self.pattern_follows[slot]
+            if best >= 0:
+                return best
 
-        pattern_2 = tuple(self.opponent_history[-2:])
-        follows_2 = Counter(self.last_n_transitions.get(pattern_2, []))
-        if follows_2:
-            return follows_2.most_common(1)[0][0]
+        return self._random_move()
 
-        if len(self.opponent_history) >= 3:
-            pattern_3 = tuple(self.opponent_history[-3:])
-            follows_3 = Counter(self.last_n_transitions.get(pattern_3, []))
-            if follows_3:
-                return follows_3.most_common(1)[0][0]
+    def _pattern_base(self, order: int, skip: int) -> int:
+        """
+        Index of the first pattern slot for the context made of the
+        ``order`` opponent moves that precede the last ``skip`` ones.
+        """
+        context = 0
+        for i in range(order + skip, skip, -1):
+            context = context * 3 + self.opponent_history[-i]
+        return 3 * (self._pattern_offsets[order] + context)
 
-        return random.choice(self.moves)
+    def pattern_follow_counts(self, pattern: Tuple[str, ...]) -> Dict[str, int]:
+        """Return how often each move followed ``pattern``, in first-seen order."""
+        context = 0
+        for move in pattern:
+            context = context * 3 + self.move_idx[move]
+        base = 3 * (self._pattern_offsets[len(pattern)] + context)
+        return {
+            self.moves[self.pattern_follows[slot]]: self.pattern_counts[slot]
+            for slot in range(base, base + 3)
+            if self.pattern_follows[slot] >= 0
+        }
 
-    def _reaction_prediction(self) -> str:
+    def _reaction_prediction(self) -> int:
         """
         Predict based on the opponent reacting to *our* previous moves.
 
@@ -266,44 +1206,48 @@ class RPSMain:
         This strategy detects that tendency and exploits it.
         """
         if len(self.my_history) < 2 or len(self.opponent_history) < 2:
-            return random.choice(self.moves)
-
-        # Count how often the opponent played the move that beats our previous move
-        reaction_count = 0
-        total_checked = 0
-        for i in range(1, min(len(self.opponent_history), self.RECENT_WINDOW + 1)):
-            our_prev = self.my_history[-(i + 1)]
-            their_next = self.opponent_history[-i]
-            if their_next == self.loses_to[our_prev]:
-                reaction_count += 1
-            total_checked += 1
+            return self._random_move()
+
+        # How often, over the recent window, the opponent played the move
+        # that beats our previous move (tracked by _reaction_update)
+        reaction_count = self.reaction_hits.bit_count()
+        total_checked = min(len(self.opponent_history) - 1, self.RECENT_WINDOW)
 
         # Only commit if there's a clear reaction pattern (>60% of recent moves)
         if total_checked >= 3 and reaction_count / total_checked > 0.60:
             # If they try to beat our last move, predict that counter
-            predicted = self.loses_to[self.my_history[-1]]
-            return predicted
+            return (self.my_history[-1] + 1) % 3
 
-        return random.choice(self.moves)
+        return self._random_move()
+
+    def _context_prediction(self) -> int:
+        """
+        Predict from the longest recent context of opponent moves (up to
+        CONTEXT_DEPTH) that has been seen before, like PPM. Catches
+        cycles longer than PATTERN_ORDERS reach.
+        """
+        code = self.context_model.predict()
+        if code < 0:
+            return self._random_move()
+        return code
 
     def update(self, my_move: str, opponent_move: str) -> None:
         """
         Record the result of a round and update all internal models.
         """
-        self.my_history.append(my_move)
-        self.opponent_history.append(opponent_move)
+        self.update_codes(self.move_idx[my_move], self.move_idx[opponent_move])
+
+    def update_codes(self, my_code: int, opponent_code: int) -> None:
+        """update() with both moves given as move codes."""
+        self.my_history.append(my_code)
+        self.opponent_history.append(opponent_code)
 
         # Determine result from bot's perspective
-        if my_move == opponent_move:
-            result = self.TIE_RESULT
-        elif self.beats[my_move] == opponent_move:
-            result = self.WIN_RESULT
-        else:
-            result = self.LOSS_RESULT
+        result = self._RESULTS[3 * my_code + opponent_code]
         self.results_history.append(result)
 
         # Update frequency table
-        self.frequency_table[opponent_move] += 1
+        self.frequency_table[opponent_code] += 1
 
         # Credit/blame the strategy that led to this move
         if self.last_strategy_used:
@@ -311,39 +1255,191 @@ class RPSMain:
             if result == self.WIN_RESULT:
                 self.strategy_successes[self.last_strategy_used] += 1
 
-        # Update Markov transition matrix
-        if len(self.opponent_history) > 1:
-            prev_idx = self.move_idx[self.opponent_history[-2]]
-            curr_idx = self.move_idx[opponent_move]
+        # Advance the strategies' models
+        for update in self._updaters:
+            update(self, my_code, opponent_code)
 
-            for i in range(3):
-                if i == curr_idx:
-                    self.transition_matrix[prev_idx][i] += self.adapt_speed
-                else:
-                    self.transition_matrix[prev_idx][i] *= (1 - self.adapt_speed / 2)
-
-            row_sum = sum(self.transition_matrix[prev_idx])
-            self.transition_matrix[prev_idx] = self.transition_matrix[prev_idx] / row_sum
-
-        # Update pattern memory
-        if len(self.opponent_history) >= 3:
-            pattern_2 = tuple(self.opponent_history[-3:-1])
-            self.last_n_transitions[pattern_2].append(opponent_move)
-
-        if len(self.opponent_history) >= 4:
-            pattern_3 = tuple(self.opponent_history[-4:-1])
-            self.last_n_transitions[pattern_3].append(opponent_move)
-
-        # Prune pattern memory if it grows too large
-        if len(self.last_n_transitions) > self.MAX_PATTERN_MEMORY:
-            self._prune_patterns()
-
-    def _prune_patterns(self) -> None:
-        """Keep only the most frequently matched patterns."""
-        pattern_counts = Counter({k: len(v) for k, v in self.last_n_transitions.items()})
-        # most_common() returns descending order; keep the top N
-        keep = pattern_counts.most_common(self.TOP_PATTERNS_TO_KEEP)
-        keep_keys = {k for k, _ in keep}
-        for key in list(self.last_n_transitions.keys()):
-            if key not in keep_keys:
-                del self.last_n_transitions[key]
+    def _update_markov(self, prev_idx: int, curr_idx: int) -> None:
+        """Reinforce the prev -> curr transition and renormalize its row."""
+        matrix = self.transition_matrix
+        base = 3 * prev_idx
+        decay = 1 - self.adapt_speed / 2
+        row = [matrix[base], matrix[base + 1], matrix[base + 2]]
+        for i in range(3):
+            if i == curr_idx:
+                row[i] += self.adapt_speed
+            else:
+                row[i] *= decay
+
+        row_sum = row[0] + row[1] + row[2]
+        matrix[base] = row[0] / row_sum
+        matrix[base + 1] = row[1] / row_sum
+        matrix[base + 2] = row[2] / row_sum
+
+    def _record_follow(self, base: int, code: int) -> None:
+        """Count move ``code`` in the context whose slots start at ``base``."""
+        for slot in range(base, base + 3):
+            if self.pattern_follows[slot] == code or self.pattern_follows[slot] < 0:
+                self.pattern_follows[slot] = code
+                self.pattern_counts[slot] += 1
+                break
+
+        # Decay: halving the whole context lets stale follow-ups fade out
+        if self.PATTERN_COUNT_LIMIT and self.pattern_counts[slot] >= self.PATTERN_COUNT_LIMIT:
+            for i in range(base, base + 3):
+                self.pattern_counts[i] //= 2
+
+    @classmethod
+    def warm_up(cls) -> bool:
+        """
+        Load the class's early-game table now rather than on the first
+        move. Returns whether bots of the class answer from the table:
+        False when EARLY_TABLE is off or early_table.bin was built for
+        other settings, in which case they play the full vote.
+        """
+        if not cls.EARLY_TABLE or cls.enabled_strategies() != _EARLY_STRATEGIES:
+            return False
+        return _early_table(cls) is not None
+
+    def _copy(self) -> 'RPSMain':
+        """
+        Independent copy of the bot, much cheaper than a to_bytes round
+        trip. Every attribute is immutable or a flat container of
+        immutables, so one level of copying is enough.
+        """
+        cls = type(self)
+        clone = object.__new__(cls)
+        attributes = [(name, getattr(self, name)) for name in _slot_names(cls)]
+        # Subclasses without __slots__ keep their own attributes in a __dict__
+        attributes += getattr(self, '__dict__', {}).items()
+        for name, value in attributes:
+            if isinstance(value, array):
+                value = value[:]
+            elif isinstance(value, _COPIED):
+                value = value.copy()
+            setattr(clone, name, value)
+        return clone
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize the full bot state into a compact, versioned binary blob.
+
+        Moves are stored as one-byte codes, followed by a section per
+        enabled strategy that dumps its model (see Strategy); from_bytes
+        restores a bot that plays identically.
+        """
+        if self.last_strategy_used is None:
+            last_strategy = -1
+        else:
+            last_strategy = self.STRATEGY_ORDER.index(self.last_strategy_used)
+        parts = [
+            self._HEADER.pack(
+                self.STATE_MAGIC, self.STATE_VERSION, self.history_size or 0,
+                sum(1 << self.STRATEGY_ORDER.index(name) for name in self.strategies), last_strategy,
+                self.exploration_rate, self.adapt_speed, self.confidence
+            ),
+            self._COUNTERS.pack(
+                *self.frequency_table,
+                *(self.strategy_attempts.get(s, 0) for s in self.STRATEGY_ORDER),
+                *(self.strategy_successes.get(s, 0) for s in self.STRATEGY_ORDER)
+            ),
+        ]
+
+        for history in (self.opponent_history, self.my_history):
+            codes = history.codes() if isinstance(history, MoveHistory) else bytes(history)
+            parts.append(self._HISTORY.pack(len(history), len(codes)))
+            parts.append(codes)
+        if isinstance(self.results_history, MoveHistory):
+            codes = self.results_history.codes()
+        else:
+            codes = array('b', self.results_history).tobytes()
+        parts.append(self._HISTORY.pack(len(self.results_history), len(codes)))
+        parts.append(codes)
+
+        sections = [strategy for strategy in _strategy_setup(type(self)).enabled if strategy.dump is not None]
+        parts.append(struct.pack('<B', len(sections)))
+        for strategy in sections:
+            state = strategy.dump(self)
+            parts.append(self._SECTION.pack(self.STRATEGY_ORDER.index(strategy.name), len(state)))
+            parts.append(state)
+        return b''.join(parts)
+
+    @classmethod
+    def _unpack_header(cls, data: bytes) -> Tuple[Any, ...]:
+        header = cls._HEADER.unpack_from(data, 0)
+        if header[0] != cls.STATE_MAGIC:
+            raise ValueError("Not an RPSMain state blob")
+        if header[1] != cls.STATE_VERSION:
+            raise ValueError(f"Unsupported RPSMain state version {header[1]} (expected {cls.STATE_VERSION})")
+        return header
+
+    @classmethod
+    def state_class(cls, data: bytes) -> type:
+        """
+        The class of ``cls``'s registry playing the strategies a to_bytes
+        blob was saved with (see with_strategies), to restore it with.
+        """
+        enabled = cls._unpack_header(data)[3]
+        return cls.with_strategies(*(name for i, name in enumerate(cls.STRATEGY_ORDER) if enabled >> i & 1))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, seed: Optional[int] = None) -> 'RPSMain':
+        """
+        Rebuild a bot from to_bytes output. The generator is not part of
+        the state: the bot gets a fresh one, seeded with ``seed``.
+
+        The bot plays the strategies of ``cls``, whichever the blob was
+        saved with; ``state_class(data).from_bytes(data)`` restores the
+        saved ones.
+        """
+        _, _, history_size, _, last_strategy, exploration_rate, adapt_speed, confidence = \
+            cls._unpack_header(data)
+        offset = cls._HEADER.size
+
+        bot = cls(history_size=history_size or None, seed=seed)
+        bot.last_strategy_used = cls.STRATEGY_ORDER[last_strategy] if last_strategy >= 0 else None
+        bot.exploration_rate = exploration_rate
+        bot.adapt_speed = adapt_speed
+        bot.confidence = confidence
+
+        counters = cls._COUNTERS.unpack_from(data, offset)
+        offset += cls._COUNTERS.size
+        bot.frequency_table[:] = counters[:3]
+        strategies = len(cls.STRATEGY_ORDER)
+        for i, strategy in enumerate(cls.STRATEGY_ORDER):
+            if strategy not in bot.strategy_attempts:
+                continue
+            bot.strategy_attempts[strategy] = counters[3 + i]
+            bot.strategy_successes[strategy] = counters[3 + strategies + i]
+
+        histories = []
+        for _ in range(3):
+            count, stored = cls._HISTORY.unpack_from(data, offset)
+            offset += cls._HISTORY.size
+            histories.append((count, data[offset:offset + stored]))
+            offset += stored
+        for (count, codes), history in zip(histories[:2], (bot.opponent_history, bot.my_history)):
+            if isinstance(history, MoveHistory):
+                history.restore(codes, count)
+            else:
+                history.extend(codes)
+        count, codes = histories[2]
+        if isinstance(bot.results_history, MoveHistory):
+            bot.results_history.restore(codes, count)
+        else:
+            bot.results_history.extend(array('b', codes))
+
+        # Strategy models; the blob may lack some (a bot without them) or
+        # hold others (the bot does not play them)
+        sections: Dict[str, bytes] = {}
+        (count,) = struct.unpack_from('<B', data, offset)
+        offset += 1
+        for _ in range(count):
+            index, size = cls._SECTION.unpack_from(data, offset)
+            offset += cls._SECTION.size
+            sections[cls.STRATEGY_ORDER[index]] = data[offset:offset + size]
+            offset += size
+        for strategy in _strategy_setup(cls).enabled:
+            if strategy.load is not None:
+                strategy.load(bot, sections.get(strategy.name))
+        return bot
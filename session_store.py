@@ -0,0 +1,426 @@
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from rps_main import RPSMain
+
+_SCORES = struct.Struct('<III')
+
+
+def dump_state(bot: RPSMain) -> bytes:
+    """Serialize a game: the bot's three scores followed by RPSMain.to_bytes."""
+    return _SCORES.pack(bot.player_wins, bot.player_losses, bot.player_ties) + bot.to_bytes()
+
+
+def load_state(blob: bytes) -> RPSMain:
+    """Inverse of dump_state, restoring the strategies the bot was saved with."""
+    state = blob[_SCORES.size:]
+    bot = RPSMain.state_class(state).from_bytes(state)
+    bot.player_wins, bot.player_losses, bot.player_ties = _SCORES.unpack_from(blob, 0)
+    return bot
+
+
+class SessionCache:
+    """
+    LRU map with idle expiry.
+
+    Entries are kept in last-access order, so the least recently used
+    entry (which is also the first to expire) is always at the front.
+    ``touch`` is O(1) and ``evict`` pops from the front in O(1) per entry,
+    doing at most ``budget`` evictions per call so the work is spread
+    across requests instead of happening in bursts.
+    """
+
+    def __init__(self, max_size: int, ttl: Optional[float] = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        # key -> [value, last access time]
+        self._entries: "OrderedDict[str, List[Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str, now: Optional[float] = None) -> Any:
+        """Return the value or None. With ``now``, expired entries miss."""
+        entry = self._entries.get(key)
+        if entry is not None and now is not None and self.ttl is not None \
+                and now - entry[1] > self.ttl:
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def peek(self, key: str) -> Any:
+        """Return the value or None, without counting a hit or miss or refreshing it."""
+        entry = self._entries.get(key)
+        return entry[0] if entry is not None else None
+
+    def put(self, key: str, value: Any, now: float) -> None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self._entries[key] = [value, now]
+        else:
+            entry[0] = value
+            entry[1] = now
+            self._entries.move_to_end(key)
+
+    def touch(self, key: str, now: float) -> bool:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        entry[1] = now
+        self._entries.move_to_end(key)
+        return True
+
+    def pop(self, key: str) -> Any:
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry is not None else None
+
+    def evict(self, now: float, budget: Optional[int] = None,
+              evicted: Optional[List[Tuple[str, Any]]] = None) -> int:
+        """
+        Drop expired entries, then the least recently used beyond
+        max_size, appending them to ``evicted`` when given.
+        """
+        removed = 0
+        entries = self._entries
+        while entries and (budget is None or removed < budget):
+            key, entry = next(iter(entries.items()))
+            if len(entries) > self.max_size:
+                self.evictions += 1
+            elif self.ttl is not None and now - entry[1] > self.ttl:
+                self.expirations += 1
+            else:
+                break
+            del entries[key]
+            removed += 1
+            if evicted is not None:
+                evicted.append((key, entry[0]))
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class BotPool:
+    """
+    Spare bots for new games, so that session churn reuses bots instead
+    of building and garbage-collecting them.
+
+    ``release`` keeps a finished game's bot while fewer than ``max_size``
+    are spare; ``acquire`` resets one in place (RPSMain.reset), so it
+    plays like a new bot with the class's current settings, or builds a
+    new one when the pool is empty. A released bot must no longer be
+    any session's game.
+    """
+
+    def __init__(self, max_size: int, history_size: Optional[int] = None,
+                 bot_class: type = RPSMain) -> None:
+        self.max_size = max_size
+        self.history_size = history_size
+        self.bot_class = bot_class
+        self._bots: List[RPSMain] = []
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self) -> RPSMain:
+        with self._lock:
+            bot = self._bots.pop() if self._bots else None
+            if bot is None:
+                self.created += 1
+            else:
+                self.reused += 1
+        if bot is None:
+            return self.bot_class(history_size=self.history_size)
+        bot.reset()
+        return bot
+
+    def release(self, bot: RPSMain) -> None:
+        # Bots of another shape (e.g. restored with a different class) are left to the GC
+        if type(bot) is not self.bot_class or bot.history_size != self.history_size:
+            return
+        with self._lock:
+            if len(self._bots) < self.max_size:
+                self._bots.append(bot)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'size': len(self._bots), 'created': self.created, 'reused': self.reused}
+
+    def __len__(self) -> int:
+        return len(self._bots)
+
+
+class SessionLocks:
+    """
+    Fixed pool of locks shared out by hashing the user id.
+
+    Requests for one user always take the same lock, so a game is
+    never mutated by two threads at once, while different users rarely
+    contend. The pool never grows, so nothing has to be cleaned up when
+    sessions are evicted.
+    """
+
+    def __init__(self, stripes: int = 64) -> None:
+        self._locks = [threading.Lock() for _ in range(stripes)]
+
+    def __call__(self, user_id: str) -> threading.Lock:
+        return self._locks[hash(user_id) % len(self._locks)]
+
+
+class SessionStore:
+    """
+    Backend that holds every player's game.
+
+    A game is the player's RPSMain, which also keeps the score. Routes
+    must call ``save`` after playing or resetting it so that backends
+    shared between processes see the change. Every method is safe to
+    call from several threads; serialising updates to one game
+    is up to the caller (see SessionLocks).
+    """
+
+    def load(self, user_id: str) -> Optional[RPSMain]:
+        raise NotImplementedError
+
+    def save(self, user_id: str, state: RPSMain, now: float) -> None:
+        raise NotImplementedError
+
+    def touch(self, user_id: str, now: float) -> None:
+        raise NotImplementedError
+
+    def cleanup(self, now: float) -> int:
+        """
+        Drop some expired sessions, then the least recently active ones
+        beyond the size limit. Cheap enough to call on every request.
+        """
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-process SessionCache. Only correct with a single worker process.
+
+    ``on_evict(user_id, bot)`` is called for every game that cleanup
+    drops, outside the store's lock, so the caller can recycle the bot;
+    ``peek`` tells whether the user's game is stored again without
+    counting as a lookup.
+    """
+
+    # Evictions per cleanup call; any value above one new session per
+    # request keeps the cache bounded.
+    EVICTION_BUDGET = 8
+
+    def __init__(self, max_sessions: int, inactive_time: float,
+                 on_evict: Optional[Callable[[str, RPSMain], None]] = None) -> None:
+        self.cache = SessionCache(max_sessions, inactive_time)
+        self.on_evict = on_evict
+        # Reordering the OrderedDict while another thread walks it is unsafe
+        self._lock = threading.Lock()
+
+    def load(self, user_id: str) -> Optional[RPSMain]:
+        with self._lock:
+            return self.cache.get(user_id)
+
+    def peek(self, user_id: str) -> Optional[RPSMain]:
+        """The stored game, if any, leaving the hit/miss counters alone."""
+        with self._lock:
+            return self.cache.peek(user_id)
+
+    def save(self, user_id: str, state: RPSMain, now: float) -> None:
+        with self._lock:
+            self.cache.put(user_id, state, now)
+
+    def touch(self, user_id: str, now: float) -> None:
+        with self._lock:
+            self.cache.touch(user_id, now)
+
+    def cleanup(self, now: float) -> int:
+        if self.on_evict is None:
+            with self._lock:
+                return self.cache.evict(now, self.EVICTION_BUDGET)
+        evicted: List[Tuple[str, Any]] = []
+        with self._lock:
+            self.cache.evict(now, self.EVICTION_BUDGET, evicted)
+        for user_id, state in evicted:
+            self.on_evict(user_id, state)
+        return len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return self.cache.stats()
+
+    def __len__(self) -> int:
+        return len(self.cache)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Session store in a local SQLite file that every worker process opens.
+
+    Each worker keeps its hot states in a small LRU cache keyed by the
+    row's revision, a random token rewritten on every save. A load only
+    fetches the blob when another worker has written a newer revision,
+    and ``save`` writes the state back and refreshes the cache.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS sessions (
+            user_id TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL,
+            last_activity REAL NOT NULL,
+            state BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS sessions_last_activity ON sessions (last_activity);
+    """
+
+    def __init__(self, path: str, max_sessions: int, inactive_time: float,
+                 cleanup_interval: float = 60.0, cache_size: int = 256) -> None:
+        self.path = path
+        self.max_sessions = max_sessions
+        self.inactive_time = inactive_time
+        self.cleanup_interval = cleanup_interval
+        self._last_cleanup = 0.0
+        self.evictions = 0
+        # user_id -> (revision, state)
+        self._cache = SessionCache(cache_size)
+        self._cache_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(self.SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _cached(self, user_id: str) -> Any:
+        with self._cache_lock:
+            entry = self._cache.get(user_id)
+            if entry is not None:
+                self._cache.touch(user_id, time.time())
+            return entry
+
+    def _remember(self, user_id: str, revision: int, state: RPSMain) -> None:
+        with self._cache_lock:
+            self._cache.put(user_id, (revision, state), time.time())
+            self._cache.evict(time.time())
+
+    def _forget(self, user_id: str) -> None:
+        with self._cache_lock:
+            self._cache.pop(user_id)
+
+    def load(self, user_id: str) -> Optional[RPSMain]:
+        cached = self._cached(user_id)
+        cached_revision = cached[0] if cached is not None else None
+        row = self._conn().execute(
+            'SELECT revision, CASE WHEN revision = ? THEN NULL ELSE state END '
+            'FROM sessions WHERE user_id = ?',
+            (cached_revision, user_id)
+        ).fetchone()
+        if row is None:
+            self._forget(user_id)
+            return None
+
+        revision, blob = row
+        if blob is None and cached is not None:
+            return cached[1]
+        state = load_state(blob)
+        self._remember(user_id, revision, state)
+        return state
+
+    def save(self, user_id: str, state: RPSMain, now: float) -> None:
+        revision = int.from_bytes(os.urandom(8), 'big') >> 1
+        self._conn().execute(
+            'INSERT INTO sessions (user_id, revision, last_activity, state) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT(user_id) DO UPDATE SET revision = excluded.revision, '
+            'last_activity = excluded.last_activity, state = excluded.state',
+            (user_id, revision, now, dump_state(state))
+        )
+        self._remember(user_id, revision, state)
+
+    def touch(self, user_id: str, now: float) -> None:
+        self._conn().execute(
+            'UPDATE sessions SET last_activity = ? WHERE user_id = ?', (now, user_id)
+        )
+
+    def cleanup(self, now: float) -> int:
+        # Both deletes walk the last_activity index, so they only touch the
+        # rows they remove; the interval keeps them off most requests.
+        if now - self._last_cleanup < self.cleanup_interval:
+            return 0
+        self._last_cleanup = now
+
+        conn = self._conn()
+        removed = conn.execute(
+            'DELETE FROM sessions WHERE last_activity < ?', (now - self.inactive_time,)
+        ).rowcount
+        excess = len(self) - self.max_sessions
+        if excess > 0:
+            removed += conn.execute(
+                'DELETE FROM sessions WHERE user_id IN '
+                '(SELECT user_id FROM sessions ORDER BY last_activity LIMIT ?)',
+                (excess,)
+            ).rowcount
+        self.evictions += removed
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        with self._cache_lock:
+            cache = self._cache.stats()
+        return {
+            'size': len(self),
+            'hits': cache['hits'],
+            'misses': cache['misses'],
+            'evictions': self.evictions,
+            'cached': cache['size'],
+        }
+
+    def __len__(self) -> int:
+        return self._conn().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+
+def create_session_store(backend: str, max_sessions: int, inactive_time: float,
+                         db_path: str = 'sessions.db', cleanup_interval: float = 60.0,
+                         on_evict: Optional[Callable[[str, RPSMain], None]] = None) -> SessionStore:
+    """
+    Build the session store named by ``backend`` ('memory' or 'sqlite').
+    ``on_evict`` only applies to the memory backend: SQLite sessions are
+    dropped as rows, with no live state to hand back.
+    """
+    if backend == 'memory':
+        return MemorySessionStore(max_sessions, inactive_time, on_evict)
+    if backend == 'sqlite':
+        return SQLiteSessionStore(db_path, max_sessions, inactive_time, cleanup_interval)
+    raise ValueError(f"Unknown session backend: {backend!r}")
@@ -0,0 +1,248 @@
+import subprocess
+import sys
+import threading
+from collections import Counter
+import pytest
+import app as app_module
+from metrics import Registry
+from rps_main import RPSMain
+from session_store import BotPool, MemorySessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def client(request, tmp_path, monkeypatch):
+    if request.param == 'memory':
+        store = MemorySessionStore(max_sessions=100, inactive_time=3600.0)
+    else:
+        store = SQLiteSessionStore(str(tmp_path / 'sessions.db'), max_sessions=100,
+                                   inactive_time=3600.0)
+    monkeypatch.setattr(app_module, 'store', store)
+    app_module.app.config['TESTING'] = True
+    return app_module.app.test_client()
+
+
+def _client_for(user_id):
+    client = app_module.app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+    return client
+
+
+class TestPlay:
+    def test_play_and_reset(self, client):
+        response = client.post('/play', json={'move': 'rock'})
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body['bot_move'] in ('rock', 'paper', 'scissors')
+        assert sum(body['score'].values()) == 1
+
+        assert client.post('/reset').get_json()['score'] == {'wins': 0, 'losses': 0, 'ties': 0}
+
+    def test_invalid_move(self, client):
+        assert client.post('/play', json={'move': 'lizard'}).status_code == 400
+
+    def test_index_page(self, client):
+        response = client.get('/')
+        assert response.status_code == 200
+        assert response.data.decode() == app_module.INDEX_HTML
+        # No WebSocket channel under the Flask app: the page goes straight to HTTP
+        assert 'const CHANNEL_SERVED = false;' in app_module.INDEX_HTML
+
+    def test_round_results(self):
+        for user, user_move in enumerate(app_module.MOVES):
+            for bot, bot_move in enumerate(app_module.MOVES):
+                result = app_module.RESULTS[app_module.ROUND_RESULTS[3 * user + bot]]
+                if user_move == bot_move:
+                    assert result == 'tie'
+                else:
+                    assert result == ('win' if RPSMain.beats[user_move] == bot_move else 'loss')
+
+
+class TestCompactPlay:
+    def test_text_body(self, client):
+        response = client.post('/play', data='s', content_type='text/plain')
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        move, *score = response.get_data(as_text=True).split()
+        assert move[0] in 'rps' and move[1] in 'wlt'
+        assert sum(map(int, score)) == 1
+
+        response = client.post('/play', data='scissors', content_type='text/plain')
+        assert response.status_code == 400
+        assert response.get_data(as_text=True) == 'e Invalid move'
+
+    def test_matches_json_rounds(self, client, monkeypatch):
+        moves = ['rock', 'paper', 'paper', 'scissors', 'rock'] * 4
+        monkeypatch.setattr(RPSMain, 'EXPLORATION_RATE', 0.0)
+        monkeypatch.setattr(RPSMain, '_random_move', lambda self: 0)
+
+        singles = [client.post('/play', json={'move': m}).get_json() for m in moves]
+        client.post('/reset')
+        compact = [client.post('/play', data=m[0], content_type='text/plain').get_data(as_text=True)
+                   for m in moves]
+
+        assert compact == [f"{s['bot_move'][0]}{s['result'][0]} {s['score']['wins']} "
+                           f"{s['score']['losses']} {s['score']['ties']}" for s in singles]
+
+
+class TestBotRecycling:
+    @pytest.fixture
+    def pool(self, monkeypatch):
+        store = MemorySessionStore(max_sessions=1, inactive_time=3600.0, on_evict=app_module._recycle_state)
+        pool = BotPool(max_size=4, history_size=app_module.BOT_HISTORY_SIZE)
+        monkeypatch.setattr(app_module, 'store', store)
+        monkeypatch.setattr(app_module, 'bot_pool', pool)
+        monkeypatch.setattr(app_module, '_channel_users', Counter())
+        return pool
+
+    def test_evicted_bot_serves_next_game(self, pool):
+        app_module.play_moves('a', ['rock'] * 5)
+        bot = app_module.store.load('a')
+        app_module.open_game('b')  # evicts a
+        assert len(pool) == 1
+        app_module.open_game('c')
+        assert app_module.store.load('c') is bot
+        assert len(bot.opponent_history) == 0
+        assert bot.player_wins + bot.player_losses + bot.player_ties == 0
+
+    def test_recycling_leaves_hit_ratio_alone(self, pool):
+        app_module.play_moves('a', ['rock'])
+        before = app_module.store.stats()
+        app_module.open_game('b')  # evicts a
+        after = app_module.store.stats()
+        assert len(pool) == 1
+        # open_game's own lookup of b is the only new miss
+        assert (after['hits'], after['misses']) == (before['hits'], before['misses'] + 1)
+
+    def test_reset_reuses_bot(self, pool):
+        app_module.play_moves('a', ['rock'] * 5)
+        bot = app_module.store.load('a')
+        assert app_module.reset_game('a')['score'] == {'wins': 0, 'losses': 0, 'ties': 0}
+        assert app_module.store.load('a') is bot
+        assert len(bot.opponent_history) == 0
+
+    def test_channel_keeps_game_after_eviction(self, pool):
+        channel = app_module.GameChannel('a')
+        channel.play(app_module.MOVE_CODES['rock'])
+        app_module.open_game('b')  # evicts a, but the channel still plays its bot
+        assert len(pool) == 0
+        _, _, score = channel.play(app_module.MOVE_CODES['rock'])
+        assert sum(score.values()) == 2
+        assert channel.state is app_module.store.load('a')
+        channel.close()
+
+    def test_closed_channel_releases_evicted_bot(self, pool):
+        channel = app_module.GameChannel('a')
+        channel.play(app_module.MOVE_CODES['rock'])
+        app_module.open_game('b')  # evicts a
+        channel.close()
+        assert len(pool) == 1
+
+    def test_closed_channel_leaves_stored_game(self, pool):
+        channel = app_module.GameChannel('a')
+        channel.close()
+        assert len(pool) == 0
+        assert app_module.store.load('a') is channel.state
+
+
+class TestStartup:
+    def test_does_not_import_numpy(self):
+        code = 'import sys, app; print("numpy" in sys.modules)'
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+        assert result.stdout.strip() == 'False'
+
+
+class TestMetricsEndpoint:
+    def test_disabled_by_default(self, client):
+        assert client.get('/metrics').status_code == 404
+
+    def test_renders_registry(self, client, monkeypatch):
+        registry = Registry()
+        registry.counter('rps_test_events', 'Test events.').inc()
+        monkeypatch.setattr(app_module, 'METRICS_ENABLED', True)
+        monkeypatch.setattr(app_module, 'metrics', registry)
+        response = client.get('/metrics')
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain')
+        assert b'rps_test_events_total 1.0' in response.data
+
+
+class TestPlayBatch:
+    def test_matches_single_rounds(self, client, monkeypatch):
+        moves = ['rock', 'paper', 'paper', 'scissors', 'rock'] * 6
+        monkeypatch.setattr(RPSMain, 'EXPLORATION_RATE', 0.0)
+        monkeypatch.setattr(RPSMain, '_random_move', lambda self: 0)
+
+        singles = [client.post('/play', json={'move': m}).get_json() for m in moves]
+        client.post('/reset')
+        batch = client.post('/play_batch', json={'moves': moves}).get_json()
+
+        assert batch['bot_moves'] == [s['bot_move'] for s in singles]
+        assert batch['results'] == [s['result'] for s in singles]
+        assert batch['score'] == singles[-1]['score']
+
+    @pytest.mark.parametrize('body', [
+        {'moves': []},
+        {'moves': 'rock'},
+        {'moves': ['rock', 'lizard']},
+        {'moves': ['rock'] * (app_module.PLAY_BATCH_MAX + 1)},
+    ])
+    def test_rejects_bad_batches(self, client, body):
+        assert client.post('/play_batch', json=body).status_code == 400
+        # Nothing from a rejected batch is played
+        assert sum(client.post('/play', json={'move': 'rock'}).get_json()['score'].values()) == 1
+
+
+class TestConcurrency:
+    THREADS = 8
+    ROUNDS = 25
+
+    def test_concurrent_plays_for_one_user(self, client):
+        errors = []
+        barrier = threading.Barrier(self.THREADS)
+
+        def worker(index):
+            player = _client_for('stress')
+            barrier.wait()
+            for i in range(self.ROUNDS):
+                move = ('rock', 'paper', 'scissors')[(index + i) % 3]
+                response = player.post('/play', json={'move': move})
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        total = self.THREADS * self.ROUNDS
+        bot = app_module.store.load('stress')
+        assert bot.player_wins + bot.player_losses + bot.player_ties == total
+        assert len(bot.opponent_history) == total
+        assert len(bot.my_history) == total
+        assert len(bot.results_history) == total
+        assert sum(bot.frequency_table) == total
+        assert len(list(bot.opponent_history)) == app_module.BOT_HISTORY_SIZE
+
+    def test_concurrent_users_with_eviction(self, monkeypatch):
+        store = MemorySessionStore(max_sessions=10, inactive_time=3600.0)
+        monkeypatch.setattr(app_module, 'store', store)
+        errors = []
+
+        def worker(index):
+            for i in range(self.ROUNDS):
+                player = _client_for(f'user-{index}-{i % 5}')
+                response = player.post('/play', json={'move': 'rock'})
+                if response.status_code != 200:
+                    errors.append(response.status_code)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert len(store) <= 10 + store.EVICTION_BUDGET
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import threading
+import pytest
+import app as app_module
+import asgi
+from metrics import Registry
+from rps_main import RPSMain
+from session_store import MemorySessionStore, SQLiteSessionStore
+
+
+@pytest.fixture(autouse=True)
+def store(monkeypatch):
+    store = MemorySessionStore(max_sessions=100, inactive_time=3600.0)
+    monkeypatch.setattr(app_module, 'store', store)
+    return store
+
+
+async def _request(method, path, payload=None, cookie=None, text=None):
+    if text is not None:
+        body, content_type = text.encode(), b'text/plain; charset=utf-8'
+    else:
+        body, content_type = json.dumps(payload).encode() if payload is not None else b'', b'application/json'
+    headers = [(b'content-type', content_type)]
+    if cookie is not None:
+        headers.append((b'cookie', cookie))
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': headers}
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {'type': 'http.disconnect'}
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.application(scope, receive, send)
+    start, response = sent
+    headers = dict(start['headers'])
+    return start['status'], headers, response['body']
+
+
+def _call(*args, **kwargs):
+    return asyncio.run(_request(*args, **kwargs))
+
+
+def _cookie(headers):
+    return headers[b'set-cookie'].split(b';')[0]
+
+
+class TestASGI:
+    def test_index_sets_cookie(self):
+        status, headers, body = _call('GET', '/')
+        assert status == 200
+        assert b'<html' in body.lower()
+        assert b'const CHANNEL_SERVED = true;' in body
+        assert _cookie(headers).startswith(app_module.app.config['SESSION_COOKIE_NAME'].encode())
+
+    def test_play_keeps_score_per_cookie(self):
+        _, headers, _ = _call('GET', '/')
+        cookie = _cookie(headers)
+        for _ in range(3):
+            status, headers, body = _call('POST', '/play', {'move': 'rock'}, cookie)
+            assert status == 200
+            assert b'set-cookie' not in headers
+        assert sum(json.loads(body)['score'].values()) == 3
+
+        _, _, body = _call('POST', '/play_batch', {'moves': ['paper'] * 4}, cookie)
+        assert sum(json.loads(body)['score'].values()) == 7
+
+        _, _, body = _call('POST', '/reset', None, cookie)
+        assert json.loads(body)['score'] == {'wins': 0, 'losses': 0, 'ties': 0}
+
+    def test_compact_play(self):
+        cookie = _cookie(_call('GET', '/')[1])
+        status, headers, body = _call('POST', '/play', cookie=cookie, text='p')
+        assert status == 200
+        assert headers[b'content-type'].startswith(b'text/plain')
+        move, *score = body.decode().split()
+        assert move[0] in 'rps' and move[1] in 'wlt'
+        assert sum(map(int, score)) == 1
+        assert _call('POST', '/play', cookie=cookie, text='paper')[::2] == (400, b'e Invalid move')
+
+    def test_records_request_time(self, monkeypatch):
+        registry = Registry()
+        request_time = registry.histogram('rps_request_seconds', 'Request handling time.', ['endpoint'])
+        monkeypatch.setattr(app_module, 'METRICS_ENABLED', True)
+        monkeypatch.setattr(app_module, 'metrics', registry)
+        monkeypatch.setattr(app_module, 'request_time', request_time)
+        cookie = _cookie(_call('GET', '/')[1])
+        _call('POST', '/play', {'move': 'rock'}, cookie)
+        _call('POST', '/play', cookie=cookie, text='r')
+        _call('GET', '/missing', cookie=cookie)
+
+        text = registry.render()
+        assert 'rps_request_seconds_count{endpoint="index"} 1' in text
+        assert 'rps_request_seconds_count{endpoint="play"} 2' in text
+        assert 'rps_request_seconds_count{endpoint="unknown"} 1' in text
+
+    def test_errors(self):
+        assert _call('POST', '/play', {'move': 'lizard'})[0] == 400
+        assert _call('POST', '/play_batch', {'moves': []})[0] == 400
+        assert _call('GET', '/play')[0] == 405
+        assert _call('GET', '/missing')[0] == 404
+
+    def test_cookie_shared_with_flask(self, store):
+        _, headers, _ = _call('GET', '/')
+        name, _, token = _cookie(headers).decode().partition('=')
+        _call('POST', '/play', {'move': 'rock'}, _cookie(headers))
+
+        client = app_module.app.test_client()
+        client.set_cookie(name, token)
+        score = client.post('/play', json={'move': 'rock'}).get_json()['score']
+        assert sum(score.values()) == 2
+
+    def test_concurrent_requests_for_one_user(self, store):
+        _, headers, _ = _call('GET', '/')
+        cookie = _cookie(headers)
+
+        async def burst():
+            await asyncio.gather(*(
+                _request('POST', '/play', {'move': 'scissors'}, cookie) for _ in range(50)
+            ))
+
+        asyncio.run(burst())
+        user_id = next(iter(store.cache._entries))
+        bot = store.load(user_id)
+        assert bot.player_wins + bot.player_losses + bot.player_ties == 50
+        assert len(bot.opponent_history) == 50
+
+    def test_sqlite_actions_leave_the_loop(self, monkeypatch, tmp_path):
+        store = SQLiteSessionStore(str(tmp_path / 'sessions.db'), max_sessions=100, inactive_time=3600.0)
+        monkeypatch.setattr(app_module, 'store', store)
+        saved_on = set()
+        save = store.save
+
+        def recording_save(*args):
+            saved_on.add(threading.get_ident())
+            save(*args)
+
+        monkeypatch.setattr(store, 'save', recording_save)
+        cookie = _cookie(_call('GET', '/')[1])
+
+        async def burst():
+            await asyncio.gather(*(
+                _request('POST', '/play', {'move': 'rock'}, cookie) for _ in range(20)
+            ))
+
+        asyncio.run(burst())
+        asyncio.run(_websocket(['r', 'reset', 'p'], cookie))
+        assert saved_on and threading.get_ident() not in saved_on
+        _, _, body = _call('POST', '/play', {'move': 'rock'}, cookie)
+        assert sum(json.loads(body)['score'].values()) == 2
+
+
+async def _websocket(frames, cookie):
+    headers = [(b'cookie', cookie)] if cookie is not None else []
+    scope = {'type': 'websocket', 'path': '/ws', 'headers': headers}
+    incoming = [{'type': 'websocket.connect'}]
+    incoming += [{'type': 'websocket.receive', 'text': frame} for frame in frames]
+    incoming.append({'type': 'websocket.disconnect', 'code': 1000})
+    sent = []
+
+    async def receive():
+        return incoming.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    await asgi.application(scope, receive, send)
+    return sent
+
+
+class TestWebSocket:
+    def test_rounds_over_channel(self):
+        _, headers, _ = _call('GET', '/')
+        cookie = _cookie(headers)
+        sent = asyncio.run(_websocket(['r', 'p', 's', 'x', 'reset', 'r'], cookie))
+
+        assert sent[0] == {'type': 'websocket.accept'}
+        replies = [message['text'] for message in sent[1:]]
+        for reply, played in zip(replies[:3], (1, 2, 3)):
+            code, *score = reply.split()
+            assert code[0] in 'rps' and code[1] in 'wlt'
+            assert sum(map(int, score)) == played
+        assert replies[3] == 'e Invalid move'
+        assert replies[4] == 'reset 0 0 0'
+        assert sum(map(int, replies[5].split()[1:])) == 1
+
+        # The HTTP endpoints see the rounds played over the channel
+        _, _, body = _call('POST', '/play', {'move': 'rock'}, cookie)
+        assert sum(json.loads(body)['score'].values()) == 2
+
+    def test_matches_http_rounds(self, monkeypatch):
+        monkeypatch.setattr(RPSMain, 'EXPLORATION_RATE', 0.0)
+        monkeypatch.setattr(RPSMain, '_random_move', lambda self: 0)
+        moves = ['rock', 'rock', 'paper', 'scissors', 'paper'] * 4
+        cookie = _cookie(_call('GET', '/')[1])
+        singles = [json.loads(_call('POST', '/play', {'move': m}, cookie)[2]) for m in moves]
+
+        _call('POST', '/reset', None, cookie)
+        sent = asyncio.run(_websocket([m[0] for m in moves], cookie))
+        replies = [message['text'].split()[0] for message in sent[1:]]
+        assert replies == [s['bot_move'][0] + s['result'][0] for s in singles]
+
+    def test_requires_session_cookie(self):
+        sent = asyncio.run(_websocket(['r'], None))
+        assert sent == [{'type': 'websocket.close', 'code': 4001}]
@@ -0,0 +1,78 @@
+from metrics import Registry, instrument_bot, timed
+from rps_main import RPSMain, Strategy
+
+
+class TestRegistry:
+    def test_counter_and_gauge(self):
+        registry = Registry()
+        hits = registry.counter('hits', 'Hits.', ['kind'])
+        hits.labels('a').inc()
+        hits.labels('a').inc(2)
+        registry.gauge('size', 'Size.', callback=lambda: 7)
+        text = registry.render()
+        assert '# TYPE hits counter' in text
+        assert 'hits_total{kind="a"} 3.0' in text
+        assert 'size 7' in text
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        latency = registry.histogram('latency_seconds', 'Latency.', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.5, 5.0):
+            latency.observe(value)
+        lines = registry.render().splitlines()
+        assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{le="1.0"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert 'latency_seconds_count 4' in lines
+
+    def test_timed(self):
+        registry = Registry()
+        latency = registry.histogram('call_seconds', 'Calls.')
+        assert timed(latency)(lambda x: x + 1)(1) == 2
+        assert 'call_seconds_count 1' in registry.render()
+
+
+class TestInstrumentBot:
+    def test_records_timings_and_credit(self):
+        class Bot(RPSMain):
+            EARLY_TABLE = False
+
+        registry = Registry()
+        instrument_bot(Bot, registry)
+        instrument_bot(Bot, registry)  # idempotent
+        bot = Bot(seed=0)
+        for _ in range(20):
+            bot.update(bot.get_move(), 'rock')
+
+        text = registry.render()
+        assert 'rps_bot_call_seconds_count{method="get_move"} 20' in text
+        assert 'rps_bot_call_seconds_count{method="update"} 20' in text
+        assert 'rps_strategy_seconds_count{strategy="markov"}' in text
+        credited = sum(float(line.split()[-1]) for line in text.splitlines()
+                       if line.startswith('rps_strategy_credited_total'))
+        assert credited == sum(bot.strategy_attempts.values())
+
+    def test_subclass_with_extra_strategy(self):
+        class Bot(RPSMain):
+            EARLY_TABLE = False
+
+        registry = Registry()
+        instrument_bot(Bot, registry)
+
+        class MirrorBot(Bot):
+            STRATEGIES = Bot.STRATEGIES + (Strategy('mirror', {'early': 1, 'mid': 1, 'late': 1}, lambda cls: 1),)
+
+            def _mirror_prediction(self):
+                return self.my_history[-1] if self.my_history else self._random_move()
+
+        bot = MirrorBot(seed=0)
+        for _ in range(30):
+            move = bot.get_move()
+            bot.update(move, move)
+        assert bot.strategy_attempts['mirror'] > 0
+        assert (f'rps_strategy_credited_total{{strategy="mirror"}} {bot.strategy_attempts["mirror"]}'
+                in registry.render())
+
+    def test_uninstrumented_class_is_untouched(self):
+        assert not hasattr(RPSMain.get_move_code, '__wrapped__')
+        assert not hasattr(RPSMain._markov_prediction, '__wrapped__')
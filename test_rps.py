@@ -1,6 +1,17 @@
 import random
+import struct
+from collections import Counter
+import numpy as np
 import pytest
-from rps_main import RPSMain
+from rps_batch import RPSBatch
+import early_table
+import rps_main
+from rps_main import RPSMain, ContextTrie, MoveHistory, MoveRandom, Strategy, _early_table
+
+
+# The default strategies plus the variable-order context model
+ContextRPSMain = RPSMain.profile('rich')
+CONTEXT_WEIGHTS = ContextRPSMain.PHASE_WEIGHTS
 
 
 class TestRPSMainBasics:
@@ -47,6 +58,89 @@ class TestRPSMainBasics:
         assert bot.last_strategy_used in bot.strategy_attempts
 
 
+class TestSeeding:
+    @staticmethod
+    def _game(bot, rounds=300):
+        opponent = random.Random(99)
+        moves = []
+        for _ in range(rounds):
+            move = bot.get_move()
+            moves.append(move)
+            bot.update(move, opponent.choice(bot.moves))
+        return moves, bot.to_bytes()
+
+    def test_same_seed_replays_game(self):
+        random.seed(1)
+        first = self._game(RPSMain(seed=42))
+        random.seed(2)  # the global generator plays no part
+        assert self._game(RPSMain(seed=42)) == first
+        assert self._game(RPSMain(seed=43)) != first
+
+    def test_reseed_and_copy_replay(self):
+        bot = RPSMain(seed=5)
+        self._game(bot, 20)
+        clone = bot._copy()
+        assert self._game(clone) == self._game(bot)
+        bot.seed(8)
+        restored = RPSMain.from_bytes(bot.to_bytes(), seed=8)
+        assert self._game(restored) == self._game(bot)
+
+    def test_move_codes_are_uniform(self):
+        rng = MoveRandom(0)
+        counts = Counter(rng.move_code() for _ in range(30_000))
+        assert set(counts) == {0, 1, 2}
+        assert all(9_500 < count < 10_500 for count in counts.values())
+
+
+class TestReset:
+    @pytest.mark.parametrize('bot_class', [RPSMain, ContextRPSMain])
+    @pytest.mark.parametrize('history_size', [None, 16])
+    def test_plays_like_a_new_bot(self, bot_class, history_size):
+        bot = bot_class(history_size=history_size, seed=1)
+        TestSeeding._game(bot)
+        bot.exploration_rate = 0.5
+        bot.reset(seed=7)
+        fresh = bot_class(history_size=history_size, seed=7)
+        assert bot.to_bytes() == fresh.to_bytes()
+        assert TestSeeding._game(bot) == TestSeeding._game(fresh)
+
+    def test_keeps_containers(self):
+        bot = RPSMain(history_size=16)
+        names = ('opponent_history', 'transition_matrix', 'pattern_counts', 'frequency_table',
+                 'strategy_attempts')
+        containers = [getattr(bot, name) for name in names]
+        TestSeeding._game(bot, rounds=20)
+        bot.reset()
+        assert all(getattr(bot, name) is container for name, container in zip(names, containers))
+
+
+class TestSlots:
+    @pytest.mark.parametrize('bot_class', [RPSMain, ContextRPSMain])
+    def test_no_instance_dict(self, bot_class):
+        bot = bot_class(history_size=16)
+        for obj in (bot, bot.rng, bot.opponent_history, bot.context_model or ContextTrie(2, 4, 8)):
+            assert not hasattr(obj, '__dict__')
+        with pytest.raises(AttributeError):
+            bot.typo = 1
+
+    def test_shares_constants(self):
+        a, b = RPSMain(history_size=16), RPSMain(history_size=16)
+        assert a.beats is b.beats is RPSMain.beats
+        assert a.move_idx is RPSMain.move_idx
+        assert a._predictors is b._predictors
+        assert a._pattern_offsets is b._pattern_offsets
+
+    def test_copy_of_unslotted_subclass(self):
+        class Annotated(RPSMain):
+            pass
+        bot = Annotated(seed=1)
+        bot.note = ['x']
+        TestSeeding._game(bot, rounds=5)
+        clone = bot._copy()
+        assert clone.note == bot.note and clone.note is not bot.note
+        assert clone.to_bytes() == bot.to_bytes()
+
+
 class TestStrategyTracking:
     def test_strategy_attempts_increment_on_win(self):
         bot = RPSMain()
@@ -93,6 +187,10 @@ class TestStrategyTracking:
                 assert bot.strategy_successes[bot.last_strategy_used] == prev_successes[bot.last_strategy_used]
 
 
+def _codes(*moves):
+    return [RPSMain.move_idx[move] for move in moves]
+
+
 class TestMarkovPrediction:
     def test_markov_predicts_based_on_transitions(self):
         bot = RPSMain()
@@ -102,12 +200,12 @@ class TestMarkovPrediction:
             bot.update('rock', 'paper')
 
         # After another rock, markov should predict paper
-        pred = bot._markov_prediction()
+        pred = bot.moves[bot._markov_prediction()]
         assert pred == 'paper'
 
     def test_markov_random_on_empty_history(self):
         bot = RPSMain()
-        pred = bot._markov_prediction()
+        pred = bot.moves[bot._markov_prediction()]
         assert pred in bot.moves
 
 
@@ -121,7 +219,7 @@ class TestFrequencyPrediction:
             bot.get_move()
             bot.update('rock', 'scissors')
 
-        pred = bot._frequency_prediction()
+        pred = bot.moves[bot._frequency_prediction()]
         # Paper should be most common
         assert pred == 'paper'
 
@@ -130,7 +228,7 @@ class TestFrequencyPrediction:
         # frequency_table is empty initially, but opponent_history is also empty
         # The method checks opponent_history indirectly via frequency_table
         # Actually frequency_table is populated by update, so on fresh bot it's empty
-        pred = bot._frequency_prediction()
+        pred = bot.moves[bot._frequency_prediction()]
         assert pred in bot.moves
 
     def test_frequency_weights_recent_moves(self):
@@ -144,44 +242,45 @@ class TestFrequencyPrediction:
             bot.get_move()
             bot.update('rock', 'paper')
 
-        pred = bot._frequency_prediction()
+        pred = bot.moves[bot._frequency_prediction()]
         assert pred == 'paper'
 
 
 class TestPsychologyPrediction:
     def test_tilt_detection_after_losses(self):
         bot = RPSMain()
-        bot.opponent_history = ['rock', 'rock']
+        bot.opponent_history = _codes('rock', 'rock')
         bot.results_history = [RPSMain.WIN_RESULT, RPSMain.WIN_RESULT]
         bot.opponent_losses = 2
-        pred = bot._psychology_prediction()
+        pred = bot.moves[bot._psychology_prediction()]
         assert pred == 'rock'
 
     def test_repeat_detection(self):
         bot = RPSMain()
-        bot.opponent_history = ['rock', 'rock', 'rock']
+        bot.opponent_history = _codes('rock', 'rock', 'rock')
         bot.opponent_repeats = 2
-        pred = bot._psychology_prediction()
+        pred = bot.moves[bot._psychology_prediction()]
         # After 2+ repeats, expect player to switch to what beats repeated move
         assert pred == bot.loses_to['rock']
 
     def test_win_stay(self):
         bot = RPSMain()
         # Player won last round (bot lost)
-        bot.opponent_history = ['paper']
-        bot.my_history = ['rock']
+        bot.opponent_history = _codes('paper')
+        bot.my_history = _codes('rock')
         bot.results_history = [RPSMain.LOSS_RESULT]
-        pred = bot._psychology_prediction()
+        pred = bot.moves[bot._psychology_prediction()]
         # Player should repeat what beat us
         assert pred == 'paper'
 
     def test_lose_shift(self):
-        bot = RPSMain()
-        # Player lost last round
-        bot.opponent_history = ['rock']
-        bot.my_history = ['paper']
-        bot.results_history = [RPSMain.WIN_RESULT]
-        pred = bot._psychology_prediction()
+        bot = RPSMain(seed=0)
+        # Player lost last round; win-stay lose-shift needs two rounds,
+        # with one round the bot would fall back to a random move
+        bot.opponent_history = _codes('scissors', 'rock')
+        bot.my_history = _codes('scissors', 'paper')
+        bot.results_history = [RPSMain.TIE_RESULT, RPSMain.WIN_RESULT]
+        pred = bot.moves[bot._psychology_prediction()]
         # Player should shift to what beats their last move
         assert pred == bot.loses_to['rock']
 
@@ -198,8 +297,8 @@ class TestPatternPrediction:
             bot.get_move()
             bot.update('rock', 'scissors')
 
-        bot.opponent_history = ['rock', 'paper']
-        pred = bot._pattern_prediction()
+        bot.opponent_history = _codes('rock', 'paper')
+        pred = bot.moves[bot._pattern_prediction()]
         assert pred == 'scissors'
 
     def test_pattern_3_fallback(self):
@@ -212,14 +311,14 @@ class TestPatternPrediction:
             bot.get_move()
             bot.update('rock', 'rock')
 
-        bot.opponent_history = ['rock', 'paper', 'scissors']
-        pred = bot._pattern_prediction()
+        bot.opponent_history = _codes('rock', 'paper', 'scissors')
+        pred = bot.moves[bot._pattern_prediction()]
         assert pred == 'rock'
 
     def test_pattern_random_on_short_history(self):
         bot = RPSMain()
-        bot.opponent_history = ['rock']
-        pred = bot._pattern_prediction()
+        bot.opponent_history = _codes('rock')
+        pred = bot.moves[bot._pattern_prediction()]
         assert pred in bot.moves
 
 
@@ -234,7 +333,7 @@ class TestReactionPrediction:
             bot.get_move()
             bot.update(m, t)
 
-        pred = bot._reaction_prediction()
+        pred = bot.moves[bot._reaction_prediction()]
         # Our last move was rock, so reaction predicts paper (what beats rock)
         assert pred == 'paper'
 
@@ -245,28 +344,97 @@ class TestReactionPrediction:
             bot.get_move()
             bot.update(random.choice(bot.moves), random.choice(bot.moves))
 
-        pred = bot._reaction_prediction()
+        pred = bot.moves[bot._reaction_prediction()]
         assert pred in bot.moves
 
     def test_reaction_random_on_short_history(self):
         bot = RPSMain()
-        pred = bot._reaction_prediction()
+        pred = bot.moves[bot._reaction_prediction()]
         assert pred in bot.moves
 
 
+class TestContextPrediction:
+    CYCLE = ['rock', 'rock', 'paper', 'scissors', 'paper', 'scissors', 'scissors', 'rock']
+
+    def test_disabled_by_default(self):
+        bot = RPSMain()
+        assert bot.context_model is None
+        bot.get_move()
+        bot.update('rock', 'rock')
+        assert 'context' not in bot._strategy_weights()
+
+    def test_predicts_long_cycle(self):
+        trie = ContextTrie(depth=8, max_nodes=4096, count_limit=255)
+        assert trie.predict() == -1
+        codes = [RPSMain().move_idx[m] for m in self.CYCLE]
+        for _ in range(3):
+            for code in codes:
+                trie.update(code)
+        for i in range(len(codes)):
+            assert trie.predict() == codes[i]
+            trie.update(codes[i])
+
+    def test_update_walks_at_most_depth_nodes(self):
+        trie = ContextTrie(depth=4, max_nodes=10_000, count_limit=255)
+        rng = random.Random(5)
+        for _ in range(500):
+            nodes = len(trie)
+            trie.update(rng.randrange(3))
+            assert len(trie) - nodes <= 4
+
+    def test_node_budget_is_bounded(self):
+        trie = ContextTrie(depth=8, max_nodes=50, count_limit=255)
+        rng = random.Random(5)
+        for _ in range(2000):
+            trie.update(rng.randrange(3))
+        assert len(trie) == 50
+        assert len(trie.children) == len(trie.counts) == 150
+        assert trie.predict() in (0, 1, 2)
+
+    def test_counts_are_halved(self):
+        trie = ContextTrie(depth=2, max_nodes=100, count_limit=8)
+        for _ in range(100):
+            trie.update(0)
+        assert max(trie.counts) < 8
+        assert trie.predict() == 0
+
+    def test_beats_long_cycle_and_gets_credit(self):
+        margins = {}
+        for cls in (RPSMain, ContextRPSMain):
+            bot = cls(seed=3)
+            margin = 0
+            for i in range(300):
+                move = bot.get_move()
+                theirs = self.CYCLE[i % len(self.CYCLE)]
+                if bot.beats[move] == theirs:
+                    margin += 1
+                elif bot.beats[theirs] == move:
+                    margin -= 1
+                bot.update(move, theirs)
+            margins[cls] = margin
+        assert bot.strategy_attempts['context'] > bot.strategy_attempts['pattern']
+        assert margins[ContextRPSMain] > margins[RPSMain] + 50
+
+    def test_rejects_partial_weights(self):
+        weights = dict(CONTEXT_WEIGHTS, early=RPSMain.PHASE_WEIGHTS['early'])
+        with pytest.raises(ValueError):
+            type('Partial', (RPSMain,), {'PHASE_WEIGHTS': weights})()
+
+
 class TestUpdateLogic:
     def test_markov_matrix_updates(self):
         bot = RPSMain()
-        initial = bot.transition_matrix.copy()
+        initial = list(bot.transition_matrix)
         bot.update('rock', 'paper')
         # Matrix shouldn't change on first update (no previous opponent move)
-        assert (bot.transition_matrix == initial).all()
+        assert list(bot.transition_matrix) == initial
 
         bot.update('rock', 'scissors')
         # Now matrix should have updated for transition paper -> scissors
         paper_idx = bot.move_idx['paper']
         scissors_idx = bot.move_idx['scissors']
-        assert bot.transition_matrix[paper_idx][scissors_idx] > initial[paper_idx][scissors_idx]
+        cell = paper_idx * 3 + scissors_idx
+        assert bot.transition_matrix[cell] > initial[cell]
 
     def test_pattern_memory_populated(self):
         bot = RPSMain()
@@ -275,28 +443,48 @@ class TestUpdateLogic:
             bot.update('rock', move)
 
         # Should have pattern (rock, paper) -> scissors
-        assert ('rock', 'paper') in bot.last_n_transitions
-        assert 'scissors' in bot.last_n_transitions[('rock', 'paper')]
+        assert bot.pattern_follow_counts(('rock', 'paper')) == {'scissors': 1}
+        assert bot.pattern_follow_counts(('rock', 'paper', 'scissors')) == {'rock': 1}
+        assert bot.pattern_follow_counts(('paper', 'rock')) == {}
 
-    def test_pattern_pruning(self):
+    def test_pattern_memory_is_fixed_size(self):
         bot = RPSMain()
-        # Fill with many distinct 4-move patterns
-        moves = bot.moves
-        for i in range(200):
-            bot.get_move()
-            seq = tuple(moves[(i // (3 ** j)) % 3] for j in range(4))
-            bot.last_n_transitions[seq].append(moves[(i + 2) % 3])
+        size = len(bot.pattern_counts)
+        assert size == 3 * (9 + 27)
+        for _ in range(500):
+            bot.update('rock', random.choice(bot.moves))
+        assert len(bot.pattern_counts) == size
+        assert sum(bot.pattern_counts) == (500 - 2) + (500 - 3)
+
+    def test_pattern_counts_decay(self):
+        class DecayingBot(RPSMain):
+            PATTERN_COUNT_LIMIT = 4
 
-        assert len(bot.last_n_transitions) > RPSMain.MAX_PATTERN_MEMORY
-        bot._prune_patterns()
-        assert len(bot.last_n_transitions) <= RPSMain.TOP_PATTERNS_TO_KEEP
+        bot = DecayingBot()
+        for move in ['rock', 'paper', 'scissors'] * 3 + ['rock', 'paper', 'rock']:
+            bot.update('rock', move)
+        # (rock, paper) was followed by scissors 3 times, then rock once
+        assert bot.pattern_follow_counts(('rock', 'paper')) == {'scissors': 3, 'rock': 1}
+        for move in ['paper', 'rock', 'paper', 'scissors']:
+            bot.update('rock', move)
+        # scissors reached the limit, so the whole context was halved
+        assert bot.pattern_follow_counts(('rock', 'paper')) == {'scissors': 2, 'rock': 1}
+
+    def test_higher_pattern_orders(self):
+        class DeepBot(RPSMain):
+            PATTERN_ORDERS = (2, 3, 4)
+
+        bot = DeepBot()
+        for move in ['rock', 'rock', 'paper', 'paper', 'scissors']:
+            bot.update('rock', move)
+        assert bot.pattern_follow_counts(('rock', 'rock', 'paper', 'paper')) == {'scissors': 1}
 
     def test_frequency_table_updated(self):
         bot = RPSMain()
         bot.update('rock', 'paper')
-        assert bot.frequency_table['paper'] == 1
+        assert bot.frequency_table[bot.move_idx['paper']] == 1
         bot.update('rock', 'paper')
-        assert bot.frequency_table['paper'] == 2
+        assert bot.frequency_table[bot.move_idx['paper']] == 2
 
 
 class TestResultCalculation:
@@ -320,7 +508,7 @@ class TestExploration:
     def test_exploration_rate(self):
         bot = RPSMain()
         bot.exploration_rate = 1.0  # Always explore
-        bot.opponent_history = ['rock']  # Force past first-move branch
+        bot.opponent_history = _codes('rock')  # Force past first-move branch
         moves = [bot.get_move() for _ in range(50)]
         assert all(m in bot.moves for m in moves)
 
@@ -339,7 +527,7 @@ class TestExploration:
 class TestPhaseWeights:
     def test_early_phase_weights(self):
         bot = RPSMain()
-        bot.opponent_history = ['rock']  # 1 move = early
+        bot.opponent_history = _codes('rock')  # 1 move = early
         bot.get_move()
         # Just verify it doesn't crash
         assert bot.last_strategy_used in bot.strategy_attempts or bot.last_strategy_used is None
@@ -361,5 +549,472 @@ class TestPhaseWeights:
         assert bot.last_strategy_used in bot.strategy_attempts
 
 
+def _reference_frequency_prediction(bot):
+    """_frequency_prediction as it was before the incremental bitmasks."""
+    window = bot.opponent_history[-bot.RECENT_WINDOW:]
+    weighted = Counter()
+    for i, move in enumerate(window):
+        weighted[move] += bot.FREQUENCY_DECAY ** (len(window) - 1 - i)
+    return weighted.most_common(1)[0][0]
+
+
+def _reference_reaction_signal(bot):
+    """(reaction_count, total_checked) from a full rescan of the window."""
+    reaction_count = 0
+    total_checked = 0
+    for i in range(1, min(len(bot.opponent_history), bot.RECENT_WINDOW + 1)):
+        if bot.opponent_history[-i] == (bot.my_history[-(i + 1)] + 1) % 3:
+            reaction_count += 1
+        total_checked += 1
+    return reaction_count, total_checked
+
+
+class MirrorRPSMain(RPSMain):
+    """Registers one extra strategy: the opponent repeats our last move."""
+
+    STRATEGIES = RPSMain.STRATEGIES + (
+        Strategy('mirror', {'early': 0.2, 'mid': 0.2, 'late': 0.2}, lambda cls: 1),
+    )
+
+    def _mirror_prediction(self):
+        if not self.my_history:
+            return self._random_move()
+        return self.my_history[-1]
+
+
+def _replies_load(bot, data):
+    if data is not None:
+        bot.replies = list(struct.unpack('<9I', data))
+        return
+    bot.replies = [0] * 9
+    for i in range(1, len(bot.opponent_history)):
+        bot.replies[3 * bot.my_history[i - 1] + bot.opponent_history[i]] += 1
+
+
+def _replies_update(bot, my_code, opponent_code):
+    if len(bot.my_history) >= 2:
+        bot.replies[3 * bot.my_history[-2] + opponent_code] += 1
+
+
+class RepliesRPSMain(RPSMain):
+    """Registers a stateful strategy: the opponent's usual reply to our last move."""
+
+    __slots__ = ('replies',)
+    STRATEGIES = RPSMain.STRATEGIES + (
+        Strategy('replies', {'early': 0.1, 'mid': 0.2, 'late': 0.3}, lambda cls: 2,
+                 state=('replies',), create=lambda bot: setattr(bot, 'replies', [0] * 9),
+                 update=_replies_update, dump=lambda bot: struct.pack('<9I', *bot.replies),
+                 load=_replies_load),
+    )
+
+    def _replies_prediction(self):
+        if not self.my_history:
+            return self._random_move()
+        base = 3 * self.my_history[-1]
+        counts = self.replies[base:base + 3]
+        return counts.index(max(counts))
+
+
+class TestStrategyRegistry:
+    def test_profiles(self):
+        assert RPSMain.profile('production') is RPSMain
+        assert RPSMain.enabled_strategies() == RPSMain.PROFILES['production']
+        rich = RPSMain.profile('rich')
+        assert rich is RPSMain.with_strategies(*RPSMain.PROFILES['rich'])
+        assert rich().strategies == RPSMain.STRATEGY_ORDER
+        with pytest.raises(ValueError):
+            RPSMain.profile('unknown')
+        with pytest.raises(ValueError):
+            RPSMain.with_strategies('markov', 'unknown')
+
+    def test_cheap_profile_keeps_only_its_state(self):
+        cheap = RPSMain.with_strategies('markov', 'psychology')
+        assert cheap.history_depth() == 2
+        bot = cheap(history_size=2)
+        for _ in range(40):
+            bot.update(bot.get_move(), random.choice(bot.moves))
+            assert bot.last_strategy_used in (None, 'markov', 'psychology')
+        assert set(bot.strategy_attempts) == {'markov', 'psychology'}
+        assert bot.pattern_counts is None
+        assert bot.recent_masks is None
+        assert bot.context_model is None
+
+        clone = cheap.from_bytes(bot.to_bytes())
+        assert clone.to_bytes() == bot.to_bytes()
+
+    def test_history_must_cover_enabled_strategies(self):
+        with pytest.raises(ValueError):
+            RPSMain(history_size=RPSMain.history_depth() - 1)
+        RPSMain(history_size=RPSMain.history_depth())
+
+    def test_registered_strategy_is_played_and_serialized(self):
+        assert MirrorRPSMain.STRATEGY_ORDER[-1] == 'mirror'
+        assert MirrorRPSMain.enabled_strategies() == RPSMain.enabled_strategies() + ('mirror',)
+        assert MirrorRPSMain.PHASE_WEIGHTS['late']['mirror'] == 0.2
+        bot = MirrorRPSMain(seed=4)
+        for _ in range(60):
+            move = bot.get_move()
+            bot.update(move, move)
+        assert bot.strategy_attempts['mirror'] > 0
+        clone = MirrorRPSMain.from_bytes(bot.to_bytes())
+        assert clone.strategy_attempts == bot.strategy_attempts
+        assert clone.to_bytes() == bot.to_bytes()
+
+
+    def test_registered_state_follows_the_hooks(self):
+        assert [s.name for s in RPSMain.STRATEGIES if not s.incremental] == ['psychology']
+        bot = RepliesRPSMain(seed=3)
+        for _ in range(80):
+            bot.update(bot.get_move(), bot.moves[(bot.my_history[-1] + 1) % 3] if bot.my_history else 'rock')
+        assert sum(bot.replies) == 79
+        assert bot.strategy_attempts['replies'] > 0
+
+        clone = RepliesRPSMain.from_bytes(bot.to_bytes())
+        assert clone.replies == bot.replies
+        assert clone.to_bytes() == bot.to_bytes()
+        # A blob of a bot without the strategy: rebuilt from the histories
+        without = RepliesRPSMain.with_strategies(*RPSMain.PROFILES['production'])(seed=3)
+        for my_move, opponent_move in zip(bot.my_history, bot.opponent_history):
+            without.update_codes(my_move, opponent_move)
+        assert without.replies is None
+        assert RepliesRPSMain.from_bytes(without.to_bytes()).replies == bot.replies
+
+        bot.reset()
+        assert bot.replies == [0] * 9
+
+    def test_disabled_strategy_state_is_not_kept(self):
+        bot = RepliesRPSMain.with_strategies('markov', 'frequency')()
+        bot.update('rock', 'paper')
+        assert bot.replies is None and bot.reaction_hits is None
+
+
+class TestIncrementalStatistics:
+    @pytest.mark.parametrize('seed', range(5))
+    def test_matches_full_rescan(self, seed):
+        rng = random.Random(seed)
+        bot = RPSMain()
+        bias = rng.choice(bot.moves)
+        for _ in range(400):
+            opponent_move = bias if rng.random() < 0.4 else rng.choice(bot.moves)
+            bot.update(rng.choice(bot.moves), opponent_move)
+
+            assert bot._frequency_prediction() == _reference_frequency_prediction(bot)
+            assert bot.reaction_hits.bit_count() == _reference_reaction_signal(bot)[0]
+
+    def test_large_window(self):
+        wide = type('WideRPSMain', (RPSMain,), {'__slots__': (), 'RECENT_WINDOW': 32})
+        rng = random.Random(7)
+        bot = wide()
+        for _ in range(300):
+            opponent_move = 'rock' if rng.random() < 0.4 else rng.choice(bot.moves)
+            bot.update(rng.choice(bot.moves), opponent_move)
+            assert bot._frequency_prediction() == _reference_frequency_prediction(bot)
+            assert bot.reaction_hits.bit_count() == _reference_reaction_signal(bot)[0]
+        assert bot.recent_masks[0] | bot.recent_masks[1] | bot.recent_masks[2] == (1 << 32) - 1
+
+    def test_rebuilt_after_restore(self):
+        bot = RPSMain(history_size=16)
+        for _ in range(100):
+            bot.update(random.choice(bot.moves), random.choice(bot.moves))
+        clone = RPSMain.from_bytes(bot.to_bytes())
+        assert clone.recent_masks == bot.recent_masks
+        assert clone.recent_scores == pytest.approx(bot.recent_scores)
+        assert clone.reaction_hits == bot.reaction_hits
+
+
+class TestLazyVoting:
+    def test_matches_full_vote(self, monkeypatch):
+        rng = random.Random(4)
+        bot = RPSMain()
+        # Make random fallbacks deterministic so both votes see the same ones
+        monkeypatch.setattr(RPSMain, '_random_move', lambda self: 0)
+        for _ in range(300):
+            full = RPSMain.from_bytes(bot.to_bytes())
+            lazy = RPSMain.from_bytes(bot.to_bytes())
+            lazy.lazy_voting = True
+            if bot.opponent_history:
+                assert lazy._make_prediction() == full._make_prediction()
+                assert lazy.last_strategy_used == full.last_strategy_used
+                assert lazy.opponent_losses == full.opponent_losses
+                assert lazy.opponent_repeats == full.opponent_repeats
+            bot.update(bot.moves[rng.randrange(3)], bot.moves[rng.choice([0, 0, 1, 2])])
+
+    def test_skips_undecidable_strategies(self, monkeypatch):
+        bot = RPSMain()
+        bot.lazy_voting = True
+        for _ in range(20):
+            bot.update('rock', 'paper')
+        called = []
+        for name in ('frequency', 'reaction'):
+            original = getattr(RPSMain, f'_{name}_prediction')
+            monkeypatch.setattr(RPSMain, f'_{name}_prediction',
+                                lambda self, original=original, name=name: called.append(name) or original(self))
+        assert bot._make_prediction() == bot.move_idx['paper']
+        assert len(called) < 2
+
+    def test_skipped_psychology_still_counts(self):
+        bot = RPSMain()
+        bot.lazy_voting = True
+        for _ in range(20):
+            bot.update('rock', 'paper')
+        repeats = bot.opponent_repeats
+        bot._make_prediction()
+        assert bot.opponent_repeats == repeats + 1
+
+
+class TestEarlyTable:
+    def _play(self, seed, use_table, rounds=12):
+        bot = RPSMain(history_size=16, seed=seed)
+        bot.early_table = use_table
+        opponent = random.Random(seed + 1)
+        trace = []
+        for _ in range(rounds):
+            move = bot.get_move()
+            bot.update(move, opponent.choice(bot.moves[:seed % 3 + 1]))
+            trace.append((move, bot.last_strategy_used, bot.opponent_losses, bot.opponent_repeats))
+        # Same number of random draws on both paths
+        trace.append([bot._random_move() for _ in range(MoveRandom.BATCH)])
+        return trace, bot.to_bytes()
+
+    def test_matches_full_vote(self):
+        for seed in range(200):
+            assert self._play(seed, True) == self._play(seed, False)
+
+    def test_every_history_is_covered(self):
+        predictions, outcomes, votes = _early_table(RPSMain)
+        depth = RPSMain.PHASE_THRESHOLDS['mid']
+        assert len(predictions) == (9 ** (depth + 1) - 1) // 8
+        assert len(outcomes) == 4 * len(predictions)
+
+    def test_checked_in_table_is_current(self):
+        # Rebuild with `python early_table.py` when this fails
+        assert early_table.build(RPSMain) == _early_table(RPSMain)
+
+    def test_round_trips_through_file(self, tmp_path):
+        path = str(tmp_path / 'table.bin')
+        tables = _early_table(RPSMain)
+        early_table.write(path, RPSMain, tables)
+        assert rps_main._read_early_table(path, rps_main.early_table_key(RPSMain)) == tables
+
+    @pytest.mark.parametrize('history_size', [None, 16])
+    def test_empty_history_plays_random_vote(self, history_size):
+        bot = RPSMain(history_size=history_size, seed=3)
+        bot.early_table = True
+        reference = RPSMain(history_size=history_size, seed=3)
+        assert bot._make_prediction() == reference._make_prediction()
+        assert bot.last_strategy_used == reference.last_strategy_used
+
+    def test_falls_back_once_weights_adapt(self, monkeypatch):
+        bot = RPSMain()
+        bot.early_table = True
+        for _ in range(3):
+            bot.update('rock', 'scissors')
+        bot.strategy_attempts['markov'] = RPSMain.MIN_STRATEGY_ATTEMPTS + 1
+        monkeypatch.setattr(RPSMain, '_early_prediction', lambda self, n: pytest.fail('table used'))
+        bot._make_prediction()
+
+    def test_off_by_default(self):
+        assert not RPSMain.warm_up()
+        assert not RPSMain().early_table
+        enabled = type('Enabled', (RPSMain,), {'__slots__': (), 'EARLY_TABLE': True})
+        assert enabled.warm_up()
+        assert enabled().early_table
+
+    def test_other_settings_play_full_vote(self, monkeypatch):
+        tuned = type('Tuned', (RPSMain,), {'__slots__': (), 'EARLY_TABLE': True, 'ADAPTATION_SPEED': 0.5})
+        assert not tuned.warm_up()
+        bot = tuned()
+        bot.update('rock', 'scissors')
+        monkeypatch.setattr(tuned, '_early_prediction', lambda self, n: pytest.fail('table used'))
+        bot._make_prediction()
+
+
+class TestCompactHistory:
+    def test_ring_buffer_is_bounded(self):
+        bot = RPSMain(history_size=16)
+        for _ in range(500):
+            bot.update(bot.get_move(), random.choice(bot.moves))
+        assert len(bot.opponent_history) == 500
+        assert len(bot.opponent_history._buffer) == 16
+        assert len(list(bot.opponent_history)) == 16
+        assert sum(bot.frequency_table) == 500
+
+    def test_list_like_view(self):
+        history = MoveHistory(4, ['rock', 'paper', 'scissors'])
+        for move in ['rock', 'paper', 'scissors', 'rock', 'paper']:
+            history.append(move)
+        assert history[-1] == 'paper'
+        assert history[-3:] == ['scissors', 'rock', 'paper']
+        assert history == ['paper', 'scissors', 'rock', 'paper']
+        with pytest.raises(IndexError):
+            history[0]
+
+    def test_same_game_as_list_mode(self):
+        opponent = [random.choice(['rock', 'paper', 'scissors']) for _ in range(200)]
+        played = []
+        for bot in (RPSMain(seed=7), RPSMain(history_size=12, seed=7)):
+            moves = []
+            for move in opponent:
+                bot_move = bot.get_move()
+                moves.append(bot_move)
+                bot.update(bot_move, move)
+            played.append(moves)
+        assert played[0] == played[1]
+
+    def test_rejects_window_smaller_than_strategies_need(self):
+        with pytest.raises(ValueError):
+            RPSMain(history_size=RPSMain.RECENT_WINDOW)
+
+
+class TestSerialization:
+    @staticmethod
+    def _played_bot(rounds, **kwargs):
+        bot = RPSMain(**kwargs)
+        for _ in range(rounds):
+            bot.update(bot.get_move(), random.choice(bot.moves))
+        return bot
+
+    @staticmethod
+    def _next_moves(bot, opponent, seed):
+        bot.seed(seed)
+        moves = []
+        for move in opponent:
+            bot_move = bot.get_move()
+            moves.append(bot_move)
+            bot.update(bot_move, move)
+        return moves
+
+    @pytest.mark.parametrize('history_size', [None, 16])
+    def test_round_trip_is_lossless(self, history_size):
+        bot = self._played_bot(150, history_size=history_size)
+        clone = RPSMain.from_bytes(bot.to_bytes())
+
+        assert list(clone.opponent_history) == list(bot.opponent_history)
+        assert list(clone.my_history) == list(bot.my_history)
+        assert list(clone.results_history) == list(bot.results_history)
+        assert len(clone.opponent_history) == len(bot.opponent_history)
+        assert clone.transition_matrix == bot.transition_matrix
+        assert clone.frequency_table == bot.frequency_table
+        assert clone.strategy_attempts == bot.strategy_attempts
+        assert clone.strategy_successes == bot.strategy_successes
+        assert clone.last_strategy_used == bot.last_strategy_used
+        assert clone.confidence == bot.confidence
+        assert clone.to_bytes() == bot.to_bytes()
+
+        opponent = [random.choice(bot.moves) for _ in range(50)]
+        assert self._next_moves(clone, opponent, 3) == self._next_moves(bot, opponent, 3)
+
+    def test_fresh_bot_round_trip(self):
+        bot = RPSMain()
+        clone = RPSMain.from_bytes(bot.to_bytes())
+        assert clone.opponent_history == []
+        assert clone.last_strategy_used is None
+
+    def test_context_round_trip(self):
+        bot = ContextRPSMain()
+        for _ in range(150):
+            bot.update(bot.get_move(), random.choice(bot.moves))
+        clone = ContextRPSMain.from_bytes(bot.to_bytes())
+        assert clone.context_model.counts == bot.context_model.counts
+        assert clone.to_bytes() == bot.to_bytes()
+
+        opponent = [random.choice(bot.moves) for _ in range(50)]
+        assert self._next_moves(clone, opponent, 3) == self._next_moves(bot, opponent, 3)
+
+    def test_context_trained_from_blob_without_trie(self):
+        bot = self._played_bot(100)
+        clone = ContextRPSMain.from_bytes(bot.to_bytes())
+        trained = ContextTrie(RPSMain.CONTEXT_DEPTH, RPSMain.CONTEXT_NODES, RPSMain.CONTEXT_COUNT_LIMIT)
+        for code in bot.opponent_history:
+            trained.update(code)
+        assert clone.context_model.to_bytes() == trained.to_bytes()
+
+    def test_large_history_size(self):
+        bot = self._played_bot(50, history_size=70_000)
+        clone = RPSMain.from_bytes(bot.to_bytes())
+        assert clone.history_size == 70_000
+        assert clone.to_bytes() == bot.to_bytes()
+
+    def test_records_its_strategies(self):
+        rich = ContextRPSMain(seed=2)
+        assert RPSMain.state_class(rich.to_bytes()) is ContextRPSMain
+        assert RPSMain.state_class(RPSMain().to_bytes()) is RPSMain
+        cheap = RPSMain.with_strategies('markov', 'psychology')
+        assert RPSMain.state_class(cheap().to_bytes()) is cheap
+
+    @pytest.mark.parametrize('version', [*range(1, RPSMain.STATE_VERSION), RPSMain.STATE_VERSION + 1])
+    def test_rejects_other_versions(self, version):
+        data = bytearray(RPSMain().to_bytes())
+        data[3] = version
+        with pytest.raises(ValueError, match='state version'):
+            RPSMain.from_bytes(bytes(data))
+
+    def test_rejects_foreign_data(self):
+        with pytest.raises(ValueError):
+            RPSMain.from_bytes(b'XYZ' + RPSMain().to_bytes()[3:])
+
+
+class TestRPSBatch:
+    @staticmethod
+    def _opponents(n, rounds):
+        moves = RPSBatch.MOVES
+        games = []
+        for i in range(n):
+            rng = random.Random(1000 + i)
+            if i % 3 == 0:
+                games.append([moves[r % 3] for r in range(rounds)])
+            elif i % 3 == 1:
+                games.append([rng.choices(moves, [5, 2, 1])[0] for _ in range(rounds)])
+            else:
+                games.append([rng.choice(moves) for _ in range(rounds)])
+        return games
+
+    def test_matches_scalar_move_for_move(self):
+        n, rounds = 12, 80
+        opponents = self._opponents(n, rounds)
+
+        scalar_moves = []
+        scalar_bots = []
+        for i in range(n):
+            bot = RPSMain(seed=i)
+            played = []
+            for r in range(rounds):
+                move = bot.get_move()
+                played.append(move)
+                bot.update(move, opponents[i][r])
+            scalar_moves.append(played)
+            scalar_bots.append(bot)
+
+        batch = RPSBatch(n, seeds=list(range(n)))
+        codes = np.array([RPSBatch.encode(o) for o in opponents])
+        batch_moves = [[] for _ in range(n)]
+        for r in range(rounds):
+            moves = batch.get_moves()
+            for i, move in enumerate(RPSBatch.decode(moves)):
+                batch_moves[i].append(move)
+            batch.update(moves, codes[:, r])
+
+        assert batch_moves == scalar_moves
+        for i, bot in enumerate(scalar_bots):
+            assert batch.transition_matrix[i].ravel().tolist() == list(bot.transition_matrix)
+            assert list(batch.strategy_attempts[i]) == [bot.strategy_attempts[s] for s in RPSBatch.STRATEGIES]
+            assert list(batch.strategy_successes[i]) == [bot.strategy_successes[s] for s in RPSBatch.STRATEGIES]
+            assert batch.opponent_losses[i] == bot.opponent_losses
+            assert batch.opponent_repeats[i] == bot.opponent_repeats
+
+    def test_encode_decode_roundtrip(self):
+        moves = ['rock', 'scissors', 'paper']
+        assert RPSBatch.decode(RPSBatch.encode(moves)) == moves
+
+    def test_rejects_seed_count_mismatch(self):
+        with pytest.raises(ValueError):
+            RPSBatch(3, seeds=[1, 2])
+
+    def test_rejects_context_strategy(self, monkeypatch):
+        monkeypatch.setattr(RPSMain, 'PHASE_WEIGHTS', CONTEXT_WEIGHTS)
+        with pytest.raises(ValueError):
+            RPSBatch(3)
+
+
 if __name__ == '__main__':
     pytest.main([__file__, '-v'])
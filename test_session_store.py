@@ -0,0 +1,178 @@
+import pytest
+from rps_main import RPSMain
+from session_store import (
+    BotPool, MemorySessionStore, SQLiteSessionStore, SessionCache, create_session_store, dump_state, load_state,
+)
+
+
+def _state():
+    return RPSMain(history_size=16)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemorySessionStore(max_sessions=3, inactive_time=8.5)
+    return SQLiteSessionStore(str(tmp_path / 'sessions.db'), max_sessions=3,
+                              inactive_time=8.5, cleanup_interval=0.0)
+
+
+class TestSessionStore:
+    def test_load_missing(self, store):
+        assert store.load('nobody') is None
+
+    def test_save_and_load(self, store):
+        state = _state()
+        state.update('rock', 'paper')
+        state.player_losses += 1
+        store.save('u1', state, 100.0)
+
+        loaded = store.load('u1')
+        assert (loaded.player_wins, loaded.player_losses, loaded.player_ties) == (0, 1, 0)
+        assert list(loaded.opponent_history) == [RPSMain.move_idx['paper']]
+        assert len(store) == 1
+
+    def test_cleanup_expired_then_oldest(self, store):
+        for i in range(5):
+            store.save(f'u{i}', _state(), float(i))
+        removed = store.cleanup(now=10.0)
+        # u0 and u1 are expired (or the oldest beyond the limit of 3)
+        assert removed == 2
+        assert store.load('u0') is None
+        assert store.load('u2') is not None
+        assert len(store) == 3
+
+    def test_touch_protects_from_eviction(self, store):
+        for i in range(4):
+            store.save(f'u{i}', _state(), 5.0 + i)
+        store.touch('u0', 9.0)
+        assert store.cleanup(now=10.0) == 1
+        assert store.load('u0') is not None
+        assert store.load('u1') is None
+
+    def test_stats(self, store):
+        store.save('u1', _state(), 1.0)
+        store.load('u1')
+        stats = store.stats()
+        assert stats['size'] == 1
+        assert stats['hits'] >= 1
+
+
+class TestSessionCache:
+    def test_lru_order(self):
+        cache = SessionCache(max_size=2)
+        cache.put('a', 1, 0.0)
+        cache.put('b', 2, 1.0)
+        cache.touch('a', 2.0)
+        cache.put('c', 3, 3.0)
+        assert cache.evict(now=3.0) == 1
+        assert 'b' not in cache
+        assert cache.get('a') == 1 and cache.get('c') == 3
+        assert cache.evictions == 1
+
+    def test_ttl_expiry(self):
+        cache = SessionCache(max_size=10, ttl=5.0)
+        cache.put('a', 1, 0.0)
+        cache.put('b', 2, 4.0)
+        assert cache.evict(now=6.0) == 1
+        assert cache.get('b', now=8.0) == 2
+        assert cache.get('b', now=10.0) is None
+        assert cache.expirations == 2
+        assert len(cache) == 0
+
+    def test_budget_limits_work_per_call(self):
+        cache = SessionCache(max_size=100, ttl=1.0)
+        for i in range(10):
+            cache.put(str(i), i, 0.0)
+        assert cache.evict(now=5.0, budget=4) == 4
+        assert len(cache) == 6
+        assert cache.evict(now=5.0) == 6
+
+    def test_counters(self):
+        cache = SessionCache(max_size=10)
+        cache.put('a', 1, 0.0)
+        cache.get('a')
+        cache.get('missing')
+        assert cache.stats() == {'size': 1, 'hits': 1, 'misses': 1,
+                                 'evictions': 0, 'expirations': 0}
+
+
+class TestBotPool:
+    def test_reuses_released_bots(self):
+        pool = BotPool(max_size=1, history_size=16)
+        bot = pool.acquire()
+        bot.update('rock', 'paper')
+        pool.release(bot)
+        pool.release(RPSMain(history_size=16))  # over max_size: dropped
+        assert pool.acquire() is bot
+        assert len(bot.opponent_history) == 0
+        assert pool.acquire() is not bot
+        assert pool.stats() == {'size': 0, 'created': 2, 'reused': 1}
+
+    def test_drops_bots_of_another_shape(self):
+        pool = BotPool(max_size=4, history_size=16)
+        pool.release(RPSMain())
+        pool.release(RPSMain.profile('rich')(history_size=16))
+        assert len(pool) == 0
+
+    def test_memory_store_hands_back_evicted_states(self):
+        evicted = []
+        store = MemorySessionStore(max_sessions=1, inactive_time=10.0,
+                                   on_evict=lambda user_id, state: evicted.append((user_id, state)))
+        first = _state()
+        store.save('a', first, 0.0)
+        store.save('b', _state(), 1.0)
+        assert store.cleanup(2.0) == 1
+        assert evicted == [('a', first)]
+
+
+class TestSQLiteSharing:
+    def test_workers_see_each_others_writes(self, tmp_path):
+        path = str(tmp_path / 'sessions.db')
+        worker_a = SQLiteSessionStore(path, max_sessions=10, inactive_time=60.0)
+        worker_b = SQLiteSessionStore(path, max_sessions=10, inactive_time=60.0)
+
+        state = _state()
+        worker_a.save('u1', state, 1.0)
+        assert worker_b.load('u1').player_wins == 0
+
+        state.player_wins = 3
+        worker_a.save('u1', state, 2.0)
+        assert worker_b.load('u1').player_wins == 3
+
+    def test_cache_hit_returns_same_object(self, tmp_path):
+        worker = SQLiteSessionStore(str(tmp_path / 'sessions.db'), max_sessions=10,
+                                    inactive_time=60.0)
+        state = _state()
+        worker.save('u1', state, 1.0)
+        assert worker.load('u1') is state
+
+    def test_cleanup_is_rate_limited(self, tmp_path):
+        worker = SQLiteSessionStore(str(tmp_path / 'sessions.db'), max_sessions=10,
+                                    inactive_time=1.0, cleanup_interval=60.0)
+        worker.save('u1', _state(), 0.0)
+        assert worker.cleanup(now=100.0) == 1
+        worker.save('u2', _state(), 100.0)
+        assert worker.cleanup(now=120.0) == 0
+        assert worker.cleanup(now=161.0) == 1
+
+
+    def test_keeps_the_strategy_profile(self, tmp_path):
+        path = str(tmp_path / 'sessions.db')
+        worker_a = SQLiteSessionStore(path, max_sessions=10, inactive_time=60.0)
+        worker_b = SQLiteSessionStore(path, max_sessions=10, inactive_time=60.0)
+        rich = RPSMain.profile('rich')
+        state = rich(history_size=16, seed=1)
+        for move in ['rock', 'paper', 'paper', 'scissors'] * 5:
+            state.update(state.get_move(), move)
+        worker_a.save('u1', state, 1.0)
+
+        loaded = worker_b.load('u1')
+        assert type(loaded) is rich
+        assert loaded.context_model.to_bytes() == state.context_model.to_bytes()
+        assert type(load_state(dump_state(_state()))) is RPSMain
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_session_store('redis', max_sessions=10, inactive_time=60.0)
@@ -0,0 +1,71 @@
+import random
+import pytest
+from tournament import (
+    ColumnWriter, Cycler, ReactiveCounterer, WinStayLoseShift, expand_grid, play_game, read_columns,
+    run_cell, run_tournament, summarize, tuned_bot_class, win_rate_interval,
+)
+
+
+class TestOpponents:
+    def test_cycler(self):
+        cycler = Cycler(random.Random(0), ['rock', 'paper'])
+        assert [cycler.move() for _ in range(4)] == [0, 1, 0, 1]
+
+    def test_reactive_counters_previous_bot_move(self):
+        player = ReactiveCounterer(random.Random(0), noise=0.0)
+        player.observe(0, 2)      # we played rock, the bot scissors
+        assert player.move() == 0
+
+    def test_win_stay_lose_shift(self):
+        player = WinStayLoseShift(random.Random(0), noise=0.0)
+        player.observe(0, 2)      # rock beat scissors: stay
+        assert player.move() == 0
+        player.observe(0, 1)      # rock lost to paper: shift to paper
+        assert player.move() == 1
+
+
+class TestHarness:
+    def test_grid_expansion(self):
+        grid = {'EXPLORATION_RATE': [0.1, 0.2], 'ADAPTATION_SPEED': [0.3]}
+        assert expand_grid(grid) == [
+            {'ADAPTATION_SPEED': 0.3, 'EXPLORATION_RATE': 0.1},
+            {'ADAPTATION_SPEED': 0.3, 'EXPLORATION_RATE': 0.2},
+        ]
+
+    def test_tuned_bot_class(self):
+        cls = tuned_bot_class({'EXPLORATION_RATE': 0.0})
+        assert cls().exploration_rate == 0.0
+        with pytest.raises(ValueError):
+            tuned_bot_class({'moves': []})
+
+    def test_games_are_reproducible(self):
+        cls = tuned_bot_class({})
+        assert play_game(cls, 'bias_rock', 50, 7) == play_game(cls, 'bias_rock', 50, 7)
+        task = (0, {'EXPLORATION_RATE': 0.05}, 'cycle_rps', 3, 40, 1)
+        assert run_cell(task) == run_cell(task)
+
+    def test_win_rate_interval(self):
+        mean, low, high = win_rate_interval([0.4, 0.5, 0.6])
+        assert mean == pytest.approx(0.5)
+        assert low < mean < high
+
+
+class TestColumnarResults:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / 'cols')
+        with ColumnWriter(path, {'a': 'I', 'b': 'd'}, {'note': 'x'}, batch_rows=2) as writer:
+            for i in range(5):
+                writer.append(a=i, b=i / 2)
+        columns, metadata = read_columns(path)
+        assert list(columns['a']) == [0, 1, 2, 3, 4]
+        assert list(columns['b']) == [0.0, 0.5, 1.0, 1.5, 2.0]
+        assert metadata == {'note': 'x'}
+
+    def test_tournament_end_to_end(self, tmp_path):
+        path = str(tmp_path / 'run')
+        run_tournament({'EXPLORATION_RATE': [0.0, 0.2]}, ['cycle_rps', 'random'],
+                       games=3, rounds=30, out=path, workers=2)
+        summary = summarize(path)
+        assert len(summary) == 4
+        assert all(row['games'] == 3 for row in summary)
+        assert all(0.0 <= row['win_rate'] <= 1.0 for row in summary)
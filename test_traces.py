@@ -0,0 +1,112 @@
+import os
+import time
+import pytest
+import app as app_module
+from session_store import BotPool, MemorySessionStore
+from traces import CHUNK, MAX_CHUNK_ROUNDS, TraceWriter, encode_rounds, replay, scan_games, trace_files
+
+
+def _read_games(directory):
+    (path,) = trace_files([str(directory)])
+    with open(path, 'rb') as f:
+        data = f.read()
+    return [b''.join(data[offset:offset + count] for offset, count in game)
+            for game in scan_games(path)]
+
+
+class TestTraceWriter:
+    def test_games_and_resets(self, tmp_path):
+        writer = TraceWriter(str(tmp_path), flush_interval=60)
+        writer.record('alice', encode_rounds([0, 1], [2, 2]))
+        writer.record('bob', encode_rounds([2], [0]))
+        writer.flush()
+        writer.record('alice', encode_rounds([1], [1]))
+        writer.end_game('alice')
+        writer.record('alice', encode_rounds([2], [1]))
+        writer.close()
+
+        assert _read_games(tmp_path) == [bytes([8, 9, 5]), bytes([2]), bytes([6])]
+        assert writer.rounds_written == 5
+
+    def test_long_games_span_chunks(self, tmp_path):
+        writer = TraceWriter(str(tmp_path), flush_interval=60)
+        rounds = bytes(i % 9 for i in range(MAX_CHUNK_ROUNDS + 10))
+        writer.record('alice', rounds)
+        writer.close()
+        assert _read_games(tmp_path) == [rounds]
+
+    def test_ignores_truncated_chunk(self, tmp_path):
+        writer = TraceWriter(str(tmp_path), flush_interval=60)
+        writer.record('alice', b'\x00' * 5)
+        writer.close()
+        with open(writer.path, 'ab') as f:
+            f.write(CHUNK.pack(b'k' * 16, 10) + b'\x00' * 3)
+        assert _read_games(tmp_path) == [b'\x00' * 5]
+
+    def test_background_flush(self, tmp_path):
+        writer = TraceWriter(str(tmp_path), flush_interval=60, max_pending=4)
+        writer.record('alice', b'\x00' * 4)  # reaches max_pending: written without close()
+        deadline = time.monotonic() + 5
+        while not trace_files([str(tmp_path)]) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        writer.close()
+        assert os.path.getsize(writer.path) == CHUNK.size + 4
+
+
+class TestAppTracing:
+    @pytest.fixture
+    def tracer(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(app_module, 'store', MemorySessionStore(max_sessions=100, inactive_time=3600.0))
+        tracer = TraceWriter(str(tmp_path), flush_interval=60)
+        monkeypatch.setattr(app_module, 'tracer', tracer)
+        return tracer
+
+    def test_records_rounds_and_replays(self, tracer, tmp_path):
+        client = app_module.app.test_client()
+        client.get('/')
+        moves = ['rock', 'paper', 'paper', 'scissors'] * 10
+        score = client.post('/play_batch', json={'moves': moves}).get_json()['score']
+        client.post('/reset')
+        last = client.post('/play', json={'move': 'rock'}).get_json()['score']
+        tracer.close()
+
+        games = _read_games(tmp_path)
+        assert [len(game) for game in games] == [40, 1]
+        assert [code & 3 for code in games[0]] == [app_module.MOVE_CODES[m] for m in moves]
+
+        summary = replay([str(tmp_path)], workers=1)
+        assert summary['games'] == 2 and summary['rounds'] == 41
+        assert summary['wins'] + summary['losses'] + summary['ties'] == 41
+        # Results are from the bot's side: the player's losses were its wins
+        assert round(summary['recorded_win_rate'] * 41) == score['losses'] + last['losses']
+
+    def test_marks_only_games_that_played(self, tracer, monkeypatch):
+        monkeypatch.setattr(app_module, 'store', MemorySessionStore(
+            max_sessions=1, inactive_time=3600.0, on_evict=app_module._recycle_state))
+        monkeypatch.setattr(app_module, 'bot_pool', BotPool(4, app_module.BOT_HISTORY_SIZE))
+        app_module.open_game('a')
+        app_module.reset_game('a')               # nothing played yet
+        app_module.play_moves('a', ['rock'] * 3)
+        app_module.open_game('b')                # evicts a, which played
+        app_module.play_moves('a', ['paper'])    # evicts b, which did not
+        tracer.close()
+
+        with open(tracer.path, 'rb') as f:
+            data = f.read()
+        chunks = []
+        offset = 0
+        while offset < len(data):
+            key, count = CHUNK.unpack_from(data, offset)
+            chunks.append(count)
+            offset += CHUNK.size + count
+        assert chunks == [3, 0, 1]
+
+    def test_replay_does_not_depend_on_workers(self, tracer, tmp_path):
+        for user in range(6):
+            client = app_module.app.test_client()
+            moves = [('rock', 'paper', 'scissors')[(i * (user + 1)) % 3] for i in range(30)]
+            client.post('/play_batch', json={'moves': moves})
+        tracer.close()
+
+        profile = {'PHASE_WEIGHTS': app_module.RPSMain.profile('rich').PHASE_WEIGHTS}
+        assert replay([str(tmp_path)], profile, workers=1) == replay([str(tmp_path)], profile, workers=2)
@@ -0,0 +1,340 @@
+"""
+Self-play tournament harness for tuning RPSMain's class constants.
+
+Every cell of the sweep is one parameter set against one scripted
+opponent. Cells run on a ProcessPoolExecutor, each seeded from the base
+seed and its own coordinates, so results do not depend on scheduling or
+worker count. Per-game results stream into a columnar directory (one raw
+binary file per column) and a summary with win-rate confidence intervals
+is printed at the end.
+
+    python tournament.py --games 40 --rounds 200 --out tournament_results
+    python tournament.py --grid '{"EXPLORATION_RATE": [0.05, 0.1, 0.2]}'
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from rps_main import RPSMain
+
+# Games are played on RPSMain's move codes: 0/1/2 = rock/paper/scissors,
+# (code + 1) % 3 beats code, and RPSMain._RESULTS[3 * mine + theirs] is
+# the result of playing mine
+MOVE_CODES = (0, 1, 2)
+_RESULTS = RPSMain._RESULTS
+
+# Parameters that can be swept: RPSMain class constants
+TUNABLE = (
+    'PHASE_WEIGHTS', 'EXPLORATION_RATE', 'ADAPTATION_SPEED', 'RECENT_WINDOW',
+    'PATTERN_ORDERS', 'PATTERN_COUNT_LIMIT', 'MIN_STRATEGY_ATTEMPTS', 'FREQUENCY_DECAY',
+    'CONTEXT_DEPTH', 'CONTEXT_NODES', 'CONTEXT_COUNT_LIMIT',
+)
+
+DEFAULT_GRID: Dict[str, List[Any]] = {
+    'EXPLORATION_RATE': [0.05, 0.10, 0.20],
+    'ADAPTATION_SPEED': [0.20, 0.30, 0.50],
+}
+
+
+# ---------------------------------------------------------------------------
+# Scripted opponents
+# ---------------------------------------------------------------------------
+class Opponent:
+    """
+    A scripted player, playing move codes. ``observe`` receives its own
+    move and the bot's.
+    """
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+
+    def move(self) -> int:
+        raise NotImplementedError
+
+    def observe(self, own_move: int, bot_move: int) -> None:
+        pass
+
+
+class Cycler(Opponent):
+    """Plays a fixed sequence of moves (given by name) over and over, with optional noise."""
+
+    def __init__(self, rng: random.Random, sequence: Sequence[str], noise: float = 0.0) -> None:
+        super().__init__(rng)
+        self.sequence = [RPSMain.move_idx[move] for move in sequence]
+        self.noise = noise
+        self.round = 0
+
+    def move(self) -> int:
+        planned = self.sequence[self.round % len(self.sequence)]
+        self.round += 1
+        return self.rng.choice(MOVE_CODES) if self.rng.random() < self.noise else planned
+
+
+class FrequencyBiaser(Opponent):
+    """Draws moves independently from a fixed, skewed distribution."""
+
+    def __init__(self, rng: random.Random, weights: Sequence[float]) -> None:
+        super().__init__(rng)
+        self.weights = weights
+
+    def move(self) -> int:
+        return self.rng.choices(MOVE_CODES, self.weights)[0]
+
+
+class WinStayLoseShift(Opponent):
+    """Repeats a winning move, otherwise switches to what beats it."""
+
+    def __init__(self, rng: random.Random, noise: float = 0.1) -> None:
+        super().__init__(rng)
+        self.noise = noise
+        self.next_move = rng.choice(MOVE_CODES)
+
+    def move(self) -> int:
+        return self.rng.choice(MOVE_CODES) if self.rng.random() < self.noise else self.next_move
+
+    def observe(self, own_move: int, bot_move: int) -> None:
+        won = _RESULTS[3 * own_move + bot_move] == RPSMain.WIN_RESULT
+        self.next_move = own_move if won else (own_move + 1) % 3
+
+
+class ReactiveCounterer(Opponent):
+    """Plays whatever beats the bot's previous move."""
+
+    def __init__(self, rng: random.Random, noise: float = 0.1) -> None:
+        super().__init__(rng)
+        self.noise = noise
+        self.next_move = rng.choice(MOVE_CODES)
+
+    def move(self) -> int:
+        return self.rng.choice(MOVE_CODES) if self.rng.random() < self.noise else self.next_move
+
+    def observe(self, own_move: int, bot_move: int) -> None:
+        self.next_move = (bot_move + 1) % 3
+
+
+class UniformRandom(Opponent):
+    """Unexploitable baseline."""
+
+    def move(self) -> int:
+        return self.rng.choice(MOVE_CODES)
+
+
+OPPONENTS = {
+    'cycle_rps': lambda rng: Cycler(rng, ['rock', 'paper', 'scissors']),
+    'cycle_rrp': lambda rng: Cycler(rng, ['rock', 'rock', 'paper'], noise=0.1),
+    'bias_rock': lambda rng: FrequencyBiaser(rng, [0.5, 0.25, 0.25]),
+    'bias_paper_strong': lambda rng: FrequencyBiaser(rng, [0.15, 0.7, 0.15]),
+    'win_stay_lose_shift': lambda rng: WinStayLoseShift(rng),
+    'reactive': lambda rng: ReactiveCounterer(rng),
+    'random': lambda rng: UniformRandom(rng),
+}
+
+
+# ---------------------------------------------------------------------------
+# Running games
+# ---------------------------------------------------------------------------
+def task_seed(base_seed: int, *coordinates: Any) -> int:
+    """Stable 63-bit seed derived from the base seed and task coordinates."""
+    text = ':'.join(str(c) for c in (base_seed,) + coordinates)
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), 'big') >> 1
+
+
+def tuned_bot_class(params: Dict[str, Any]) -> type:
+    """RPSMain subclass with the given class constants overridden."""
+    unknown = set(params) - set(TUNABLE)
+    if unknown:
+        raise ValueError(f"Not tunable: {sorted(unknown)}")
+    overrides = {k: tuple(v) if k == 'PATTERN_ORDERS' else v for k, v in params.items()}
+    # Play is identical with or without the early-game table, which only
+    # exists for the default settings: keep cells independent of it
+    overrides['EARLY_TABLE'] = False
+    return type('TunedRPSMain', (RPSMain,), {'__slots__': (), **overrides})
+
+
+def play_game(bot_class: type, opponent_name: str, rounds: int, seed: int) -> Tuple[int, int, int]:
+    """Play one game and return the bot's (wins, losses, ties)."""
+    bot = bot_class(seed=seed)
+    opponent = OPPONENTS[opponent_name](random.Random(seed ^ 0x5DEECE66D))
+    # Tallies indexed by the bot's result: tie, win, loss (LOSS_RESULT is -1)
+    tally = [0, 0, 0]
+    for _ in range(rounds):
+        bot_move = bot.get_move_code()
+        their_move = opponent.move()
+        tally[_RESULTS[3 * bot_move + their_move]] += 1
+        bot.update_codes(bot_move, their_move)
+        opponent.observe(their_move, bot_move)
+    ties, wins, losses = tally
+    return wins, losses, ties
+
+
+def run_cell(task: Tuple[int, Dict[str, Any], str, int, int, int]) -> Tuple[int, str, List[Tuple[int, int, int]]]:
+    """Worker entry point: play every game of one (params, opponent) cell."""
+    params_id, params, opponent_name, games, rounds, base_seed = task
+    bot_class = tuned_bot_class(params)
+    results = [
+        play_game(bot_class, opponent_name, rounds, task_seed(base_seed, params_id, opponent_name, game))
+        for game in range(games)
+    ]
+    return params_id, opponent_name, results
+
+
+def expand_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Cartesian product of the grid's value lists."""
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+# ---------------------------------------------------------------------------
+# Columnar results
+# ---------------------------------------------------------------------------
+class ColumnWriter:
+    """
+    Append-only columnar store: one raw file per column plus schema.json.
+
+    Columns are ``array`` typecodes, so a reader needs nothing beyond the
+    standard library (or ``numpy.fromfile``). Rows are flushed in batches.
+    """
+
+    def __init__(self, path: str, columns: Dict[str, str], metadata: Dict[str, Any],
+                 batch_rows: int = 4096) -> None:
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.columns = columns
+        self.batch_rows = batch_rows
+        self._pending = {name: array(code) for name, code in columns.items()}
+        self._files = {name: open(os.path.join(path, f'{name}.bin'), 'wb') for name in columns}
+        with open(os.path.join(path, 'schema.json'), 'w') as f:
+            json.dump({'columns': columns, 'metadata': metadata}, f, indent=2)
+
+    def append(self, **row: Any) -> None:
+        for name, value in row.items():
+            self._pending[name].append(value)
+        if len(self._pending[next(iter(self.columns))]) >= self.batch_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        for name, values in self._pending.items():
+            values.tofile(self._files[name])
+            self._files[name].flush()
+            del values[:]
+
+    def close(self) -> None:
+        self.flush()
+        for f in self._files.values():
+            f.close()
+
+    def __enter__(self) -> 'ColumnWriter':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def read_columns(path: str) -> Tuple[Dict[str, array], Dict[str, Any]]:
+    """Load every column written by ColumnWriter, plus the metadata."""
+    with open(os.path.join(path, 'schema.json')) as f:
+        schema = json.load(f)
+    columns = {}
+    for name, code in schema['columns'].items():
+        values = array(code)
+        with open(os.path.join(path, f'{name}.bin'), 'rb') as f:
+            values.frombytes(f.read())
+        columns[name] = values
+    return columns, schema['metadata']
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+def win_rate_interval(rates: Sequence[float], z: float = 1.96) -> Tuple[float, float, float]:
+    """Mean per-game win rate with a normal-approximation confidence interval."""
+    n = len(rates)
+    mean = sum(rates) / n
+    if n < 2:
+        return mean, mean, mean
+    variance = sum((r - mean) ** 2 for r in rates) / (n - 1)
+    half = z * math.sqrt(variance / n)
+    return mean, mean - half, mean + half
+
+
+def summarize(path: str) -> List[Dict[str, Any]]:
+    """Aggregate a results directory into one row per (params, opponent)."""
+    columns, metadata = read_columns(path)
+    rounds = metadata['rounds']
+    per_cell: Dict[Tuple[int, int], List[float]] = {}
+    for params_id, opponent_id, wins in zip(columns['params_id'], columns['opponent_id'], columns['wins']):
+        per_cell.setdefault((params_id, opponent_id), []).append(wins / rounds)
+
+    summary = []
+    for (params_id, opponent_id), rates in sorted(per_cell.items()):
+        mean, low, high = win_rate_interval(rates)
+        summary.append({
+            'params': metadata['params'][params_id],
+            'opponent': metadata['opponents'][opponent_id],
+            'games': len(rates),
+            'win_rate': mean,
+            'ci_low': low,
+            'ci_high': high,
+        })
+    return summary
+
+
+def run_tournament(grid: Dict[str, List[Any]], opponents: Sequence[str], games: int,
+                   rounds: int, out: str, seed: int = 0, workers: Optional[int] = None) -> str:
+    """Run every cell of the sweep and stream per-game rows into ``out``."""
+    param_sets = expand_grid(grid)
+    tasks = [
+        (params_id, params, name, games, rounds, seed)
+        for params_id, params in enumerate(param_sets)
+        for name in opponents
+    ]
+    opponent_ids = {name: i for i, name in enumerate(opponents)}
+    metadata = {
+        'params': param_sets, 'opponents': list(opponents),
+        'games': games, 'rounds': rounds, 'seed': seed,
+    }
+    columns = {'params_id': 'I', 'opponent_id': 'H', 'game': 'I', 'wins': 'I', 'losses': 'I', 'ties': 'I'}
+
+    with ColumnWriter(out, columns, metadata) as writer:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(tasks) // (4 * (workers or os.cpu_count() or 1)))
+            for params_id, name, results in pool.map(run_cell, tasks, chunksize=chunksize):
+                for game, (wins, losses, ties) in enumerate(results):
+                    writer.append(params_id=params_id, opponent_id=opponent_ids[name],
+                                  game=game, wins=wins, losses=losses, ties=ties)
+    return out
+
+
+def _iter_report(summary: List[Dict[str, Any]]) -> Iterator[str]:
+    yield f"{'opponent':<22}{'win rate':>9}{'95% CI':>17}  params"
+    for row in summary:
+        ci = f"[{row['ci_low']:.3f}, {row['ci_high']:.3f}]"
+        yield f"{row['opponent']:<22}{row['win_rate']:>9.3f}{ci:>17}  {json.dumps(row['params'])}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--grid', type=json.loads, default=DEFAULT_GRID,
+                        help='JSON object mapping RPSMain constants to lists of values')
+    parser.add_argument('--opponents', nargs='+', default=sorted(OPPONENTS), choices=sorted(OPPONENTS))
+    parser.add_argument('--games', type=int, default=40, help='games per cell')
+    parser.add_argument('--rounds', type=int, default=200, help='rounds per game')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: all cores)')
+    parser.add_argument('--out', default='tournament_results')
+    args = parser.parse_args()
+
+    run_tournament(args.grid, args.opponents, args.games, args.rounds, args.out, args.seed, args.workers)
+    for line in _iter_report(summarize(args.out)):
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
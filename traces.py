@@ -0,0 +1,309 @@
+"""
+Compact binary traces of played games, and an offline engine that
+replays the recorded player moves against any RPSMain configuration.
+
+A trace file is a sequence of chunks, each a session key, a round count
+and that many round bytes:
+
+    <16-byte session key><uint16 count><count bytes>
+
+Each round byte holds the player's move code in bits 0-1 and the bot's in
+bits 2-3 (0/1/2 = rock/paper/scissors). A chunk with a count of 0 marks a
+reset: the session's following rounds belong to a new game. The app
+writes one when a game that played rounds is reset or dropped by the
+memory session store (the SQLite store deletes expired rows without
+telling it). Session keys are hashes of the user ids, so traces carry no
+cookie values.
+
+The app records through TraceWriter when TRACE_DIR is set. Replaying
+feeds each recorded game's player moves to a fresh bot, so it measures
+how a configuration would have fared against the same moves; it cannot
+know how players would have reacted to different bot moves.
+
+    python traces.py traces/ --profile rich --workers 4
+    python traces.py traces/ --params '{"EXPLORATION_RATE": 0.05}'
+"""
+import argparse
+import atexit
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from rps_main import RPSMain
+
+logger = logging.getLogger(__name__)
+
+CHUNK = struct.Struct('<16sH')             # session key, rounds that follow
+MAX_CHUNK_ROUNDS = 0xFFFF
+TRACE_SUFFIX = '.rpstrace'
+
+# (offset, rounds) runs of round bytes in one file, in play order
+Game = List[Tuple[int, int]]
+
+
+def session_key(user_id: str) -> bytes:
+    return hashlib.blake2b(user_id.encode(), digest_size=16).digest()
+
+
+def encode_rounds(user_codes: Iterable[int], bot_codes: Iterable[int]) -> bytes:
+    return bytes(user | bot << 2 for user, bot in zip(user_codes, bot_codes))
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+class TraceWriter:
+    """
+    Buffered trace recorder. ``record`` and ``end_game`` only append to
+    memory under a lock; a background thread writes the buffer to disk
+    every ``flush_interval`` seconds, or sooner once ``max_pending`` bytes
+    are waiting, so requests never wait on the file.
+
+    Each process writes its own file in ``directory`` (created on the
+    first write), so several workers never share one.
+    """
+
+    def __init__(self, directory: str, flush_interval: float = 1.0,
+                 max_pending: int = 1 << 20) -> None:
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._file_lock = threading.Lock()  # keeps concurrent flushes in order
+        self._rounds: Dict[bytes, bytearray] = {}
+        self._chunks = bytearray()          # complete chunks, already in order
+        self._pending = 0
+        self._wake = threading.Event()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self._pid = 0
+        self.path: Optional[str] = None
+        self.rounds_written = 0
+
+    def record(self, user_id: str, rounds: bytes) -> None:
+        """Queue round bytes (see encode_rounds) played in ``user_id``'s game."""
+        key = session_key(user_id)
+        with self._lock:
+            self._start()
+            self._rounds.setdefault(key, bytearray()).extend(rounds)
+            self._pending += len(rounds)
+            if self._pending >= self.max_pending:
+                self._wake.set()
+
+    def end_game(self, user_id: str) -> None:
+        """Mark a reset: the user's next rounds start a new game."""
+        key = session_key(user_id)
+        with self._lock:
+            self._start()
+            rounds = self._rounds.pop(key, None)
+            if rounds:
+                self._append_chunks(key, rounds)
+            self._chunks += CHUNK.pack(key, 0)
+
+    def flush(self) -> None:
+        """Write everything queued so far."""
+        with self._file_lock:
+            with self._lock:
+                for key, rounds in self._rounds.items():
+                    self._append_chunks(key, rounds)
+                self._rounds = {}
+                data, self._chunks = bytes(self._chunks), bytearray()
+                self._pending = 0
+            if not data:
+                return
+            if self.path is None:
+                os.makedirs(self.directory, exist_ok=True)
+                name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}{TRACE_SUFFIX}"
+                self.path = os.path.join(self.directory, name)
+            with open(self.path, 'ab') as f:
+                f.write(data)
+
+    def close(self) -> None:
+        """Stop the background thread and write what is left."""
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join()
+        self.flush()
+
+    def _append_chunks(self, key: bytes, rounds: bytearray) -> None:
+        for start in range(0, len(rounds), MAX_CHUNK_ROUNDS):
+            part = rounds[start:start + MAX_CHUNK_ROUNDS]
+            self._chunks += CHUNK.pack(key, len(part))
+            self._chunks += part
+        self.rounds_written += len(rounds)
+
+    def _start(self) -> None:
+        # Started lazily, and again in a forked worker, whose copy of the
+        # parent's thread does not run
+        if self._pid == os.getpid() or self._closed:
+            return
+        self._pid = os.getpid()
+        self.path = None
+        self._thread = threading.Thread(target=self._run, name='trace-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except OSError:
+                logger.exception("Could not write trace file %s", self.path)
+
+
+# ---------------------------------------------------------------------------
+# Reading
+# ---------------------------------------------------------------------------
+def trace_files(paths: Sequence[str]) -> List[str]:
+    """Expand directories to the trace files they contain."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                if name.endswith(TRACE_SUFFIX)))
+        else:
+            files.append(path)
+    return files
+
+
+def scan_games(path: str) -> List[Game]:
+    """Index a trace file's games without reading their rounds."""
+    open_games: Dict[bytes, Game] = {}
+    games: List[Game] = []
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return games
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = 0
+            # A chunk cut short by a crash mid-write is ignored
+            while offset + CHUNK.size <= len(data):
+                key, count = CHUNK.unpack_from(data, offset)
+                offset += CHUNK.size
+                if offset + count > len(data):
+                    break
+                if count:
+                    game = open_games.get(key)
+                    if game is None:
+                        game = open_games[key] = []
+                        games.append(game)
+                    game.append((offset, count))
+                else:
+                    open_games.pop(key, None)
+                offset += count
+    return games
+
+
+# ---------------------------------------------------------------------------
+# Replay
+# ---------------------------------------------------------------------------
+# Index into a (wins, losses, ties) triple by (bot move - player move) % 3
+_OUTCOME = (2, 0, 1)
+
+
+def replay_games(task: Tuple[str, List[Tuple[int, Game]], Dict[str, Any], int]) -> List[int]:
+    """
+    Worker entry point: replay some games of one file. Returns the
+    replayed bot's wins, losses and ties, then the recorded bot's.
+    """
+    from tournament import task_seed, tuned_bot_class
+    path, games, params, base_seed = task
+    bot_class = tuned_bot_class(params)
+    name = os.path.basename(path)
+    totals = [0] * 6
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        for index, game in games:
+            bot = bot_class(seed=task_seed(base_seed, name, index))
+            for offset, count in game:
+                for byte in data[offset:offset + count]:
+                    user = byte & 3
+                    bot_code = bot.get_move_code()
+                    totals[_OUTCOME[(bot_code - user) % 3]] += 1
+                    totals[3 + _OUTCOME[((byte >> 2) - user) % 3]] += 1
+                    bot.update_codes(bot_code, user)
+    return totals
+
+
+def replay(paths: Sequence[str], params: Optional[Dict[str, Any]] = None,
+           workers: Optional[int] = None, seed: int = 0) -> Dict[str, Any]:
+    """
+    Replay every game in the trace files (or directories) ``paths`` with
+    an RPSMain tuned by ``params`` (see tournament.TUNABLE) and report the
+    win rates next to the recorded ones. Games are split into tasks of
+    similar round counts and spread over a process pool; results do not
+    depend on the worker count.
+    """
+    # Imported here: the app records traces but never replays them
+    from concurrent.futures import ProcessPoolExecutor
+    from tournament import tuned_bot_class
+    params = params or {}
+    tuned_bot_class(params)  # fail early on bad parameters
+    workers = workers or os.cpu_count() or 1
+    files = [(path, scan_games(path)) for path in trace_files(paths)]
+    total_rounds = sum(count for _, games in files for game in games for _, count in game)
+    task_rounds = max(1, total_rounds // (4 * workers))
+
+    tasks = []
+    for path, games in files:
+        batch: List[Tuple[int, Game]] = []
+        rounds = 0
+        for index, game in enumerate(games):
+            batch.append((index, game))
+            rounds += sum(count for _, count in game)
+            if rounds >= task_rounds:
+                tasks.append((path, batch, params, seed))
+                batch, rounds = [], 0
+        if batch:
+            tasks.append((path, batch, params, seed))
+
+    if workers == 1:
+        results = list(map(replay_games, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(replay_games, tasks))
+    totals = [sum(column) for column in zip([0] * 6, *results)]
+
+    rounds = sum(totals[:3])
+    return {
+        'files': len(files),
+        'games': sum(len(games) for _, games in files),
+        'rounds': rounds,
+        'wins': totals[0], 'losses': totals[1], 'ties': totals[2],
+        'win_rate': totals[0] / rounds if rounds else 0.0,
+        'recorded_win_rate': totals[3] / rounds if rounds else 0.0,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('paths', nargs='+', help='trace files or directories of them')
+    parser.add_argument('--params', type=json.loads, default={},
+                        help='JSON object of RPSMain constants (see tournament.TUNABLE)')
+    parser.add_argument('--profile', choices=sorted(RPSMain.PROFILES),
+                        help='strategy profile; sets PHASE_WEIGHTS')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: all cores)')
+    args = parser.parse_args()
+
+    params = dict(args.params)
+    if args.profile:
+        params['PHASE_WEIGHTS'] = RPSMain.profile(args.profile).PHASE_WEIGHTS
+    start = time.perf_counter()
+    summary = replay(args.paths, params, args.workers, args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"{summary['games']} games, {summary['rounds']} rounds from {summary['files']} file(s) "
+          f"in {elapsed:.1f}s")
+    print(f"win rate {summary['win_rate']:.3f} (recorded {summary['recorded_win_rate']:.3f}), "
+          f"losses {summary['losses']}, ties {summary['ties']}")
+
+
+if __name__ == '__main__':
+    main()